@@ -0,0 +1,97 @@
+"""
+Benchmarks of reading the stored model data and rendering the video frames
+"""
+
+import os
+import tempfile
+
+import h5py as hdf
+
+from microbenthos.model import save_snapshot
+
+from .common import CELLS, MICROBES, model_definition, started_simulation
+
+#: number of time points saved in the model data store
+TIME_POINTS = 50
+
+
+def write_store(fpath, cells, microbes):
+    """
+    Write a model data store with :data:`TIME_POINTS` snapshots of the evolution
+    """
+    definition = model_definition(cells=cells, microbes=microbes)
+    model, simulation, evolution = started_simulation(definition)
+    for _ in range(TIME_POINTS):
+        step, state = next(evolution)
+        save_snapshot(fpath, simulation.get_state(state=model.snapshot()))
+
+
+class _StoreBenchmark(object):
+    params = (list(CELLS), list(MICROBES))
+    param_names = ['cells', 'microbes']
+    timeout = 600
+
+    def setup_cache(self):
+        tmpdir = tempfile.mkdtemp()
+        paths = {}
+        for cells in CELLS:
+            for microbes in MICROBES:
+                fpath = os.path.join(tmpdir, 'store_{}_{}.h5'.format(cells, microbes))
+                write_store(fpath, cells, microbes)
+                paths[(cells, microbes)] = fpath
+        return paths
+
+    def setup(self, paths, cells, microbes):
+        self.store = hdf.File(paths[(cells, microbes)], 'r')
+
+    def teardown(self, paths, cells, microbes):
+        self.store.close()
+
+
+class HDFRead(_StoreBenchmark):
+    """
+    Reading the model data through :class:`~microbenthos.dataview.HDFModelData`
+    """
+
+    def time_open(self, paths, cells, microbes):
+        from microbenthos.dataview import HDFModelData
+        HDFModelData(store=self.store)
+
+    def time_read_all(self, paths, cells, microbes):
+        from microbenthos.dataview import HDFModelData
+        dm = HDFModelData(store=self.store)
+        for path in dm.eqn_vars | dm.eqn_processes | dm.microbe_features:
+            dm.get_data(path)
+
+    def time_read_frames(self, paths, cells, microbes):
+        from microbenthos.dataview import HDFModelData
+        dm = HDFModelData(store=self.store)
+        data_paths = sorted(dm.eqn_vars | dm.microbe_features)
+        for tidx in range(len(dm.times)):
+            for path in data_paths:
+                dm.get_data(path, tidx)
+
+
+class VideoFrames(_StoreBenchmark):
+    """
+    Rendering of the frames of the model plot, as for the video export
+    """
+
+    def setup(self, paths, cells, microbes):
+        super(VideoFrames, self).setup(paths, cells, microbes)
+        import matplotlib
+        matplotlib.use('Agg')
+        from microbenthos.dataview import HDFModelData, ModelPlotter
+        self.dm = HDFModelData(store=self.store)
+        self.plot = ModelPlotter(model=self.dm)
+
+    def teardown(self, paths, cells, microbes):
+        self.plot.close()
+        super(VideoFrames, self).teardown(paths, cells, microbes)
+
+    def time_frames(self, paths, cells, microbes):
+        # render the canvas as the video writer does when grabbing each frame
+        canvas = self.plot.fig.canvas
+        for tidx in range(len(self.dm.times)):
+            self.plot.update_artists(tidx=tidx)
+            canvas.draw()
@@ -0,0 +1,26 @@
+"""
+Benchmarks of the startup time of the package and the command line, each in a fresh
+interpreter
+"""
+
+import textwrap
+
+
+class Import(object):
+    timeout = 120
+
+    def timeraw_import_package(self):
+        return 'import microbenthos'
+
+    def timeraw_import_cli(self):
+        return 'import microbenthos.cli'
+
+    def timeraw_cli_help(self):
+        return textwrap.dedent("""
+            from click.testing import CliRunner
+            from microbenthos.cli import cli
+            CliRunner().invoke(cli, ['export', 'model', '--help'])
+            """)
+
+    def timeraw_import_model(self):
+        return 'from microbenthos import MicroBenthosModel, Simulation'
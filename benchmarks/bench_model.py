@@ -0,0 +1,87 @@
+"""
+Benchmarks of the model creation and the simulation steps
+"""
+
+import os
+import shutil
+import tempfile
+
+from microbenthos.model import save_snapshot
+
+from .common import CELLS, MICROBES, SOLVERS, TUTORIALS, create_model, model_definition, \
+    started_simulation
+
+
+class TutorialBuild(object):
+    """
+    Creation of the tutorial models from their definitions
+    """
+    params = list(TUTORIALS)
+    param_names = ['tutorial']
+    timeout = 300
+
+    def setup(self, tutorial):
+        self.definition = model_definition(tutorial)
+
+    def time_build(self, tutorial):
+        create_model(self.definition)
+
+
+class ModelBuild(object):
+    """
+    Creation of the model with microbes at different sizes
+    """
+    params = (list(CELLS), list(MICROBES))
+    param_names = ['cells', 'microbes']
+    timeout = 300
+
+    def setup(self, cells, microbes):
+        self.definition = model_definition(cells=cells, microbes=microbes)
+
+    def time_build(self, cells, microbes):
+        create_model(self.definition)
+
+
+class Step(object):
+    """
+    Time steps and single sweeps of the simulation with each fipy solver backend
+    """
+    params = (list(CELLS), list(MICROBES), list(SOLVERS))
+    param_names = ['cells', 'microbes', 'solver']
+    timeout = 600
+
+    def setup(self, cells, microbes, solver):
+        definition = model_definition(cells=cells, microbes=microbes)
+        self.model, self.simulation, self.evolution = started_simulation(definition, solver)
+
+    def time_step(self, cells, microbes, solver):
+        self.simulation.run_timestep()
+
+    def time_sweep(self, cells, microbes, solver):
+        self.model.full_eqn.sweep(solver=self.simulation._solver,
+                                  dt=float(self.simulation.simtime_step.numericValue))
+
+
+class Snapshot(object):
+    """
+    Creation and saving of the model snapshots
+    """
+    params = (list(CELLS), list(MICROBES))
+    param_names = ['cells', 'microbes']
+    timeout = 300
+
+    def setup(self, cells, microbes):
+        definition = model_definition(cells=cells, microbes=microbes)
+        self.model, self.simulation, self.evolution = started_simulation(definition)
+        self.state = self.model.snapshot()
+        self.tmpdir = tempfile.mkdtemp()
+        self.fpath = os.path.join(self.tmpdir, 'snapshots.h5')
+
+    def teardown(self, cells, microbes):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def time_snapshot(self, cells, microbes):
+        self.model.snapshot()
+
+    def time_save_snapshot(self, cells, microbes):
+        save_snapshot(self.fpath, self.state)
@@ -0,0 +1,132 @@
+"""
+Helpers to create the models of the benchmarks from the tutorial definitions, at different
+numbers of cells and microbial groups.
+"""
+
+import copy
+import importlib
+import os
+
+from microbenthos import MicroBenthosModel, Simulation
+from microbenthos.utils import yaml
+
+TUTORIALS_DIR = os.path.join(os.path.dirname(__file__), os.pardir, 'docs', 'tutorials')
+
+#: the tutorial definitions
+TUTORIALS = ('tut01_define', 'tut02_reactions', 'tut03_microbes')
+
+#: the tutorial with microbial groups, which are replicated to scale the model
+MICROBES_TUTORIAL = 'tut03_microbes'
+
+#: numbers of cells of the domain
+CELLS = (120, 480, 1920)
+
+#: numbers of microbial groups
+MICROBES = (1, 4)
+
+#: the fipy solver backends
+SOLVERS = Simulation.FIPY_SOLVERS
+
+
+def load_definition(tutorial):
+    """
+    Load the definition of a tutorial with the keys "model" and "simulation"
+    """
+    path = os.path.join(TUTORIALS_DIR, tutorial, 'definition_input.yml')
+    with open(path) as fp:
+        return yaml.load(fp)
+
+
+def replicate_microbes(model_def, count):
+    """
+    Replicate the microbial groups in the model definition `count` times in total. The sources
+    of the equations and the irradiance attenuation of the groups are replicated as well, so
+    that the replicas are coupled into the model like the originals.
+    """
+    microbes = model_def.get('microbes', {})
+    if count <= 1 or not microbes:
+        return model_def
+
+    replicas = {}
+    for name, mdef in microbes.items():
+        for idx in range(1, count):
+            rname = '{}{}'.format(name, idx)
+            rdef = replicas[rname] = copy.deepcopy(mdef)
+            rdef['init_params']['name'] = rname
+    microbes.update(replicas)
+
+    def replicated(entries):
+        out = list(entries)
+        for entry in entries:
+            for name in list(microbes):
+                prefix = 'microbes.{}.'.format(name)
+                if not entry[0].startswith(prefix) or name in replicas:
+                    continue
+                for idx in range(1, count):
+                    rprefix = 'microbes.{}{}.'.format(name, idx)
+                    out.append([rprefix + entry[0][len(prefix):]] + list(entry[1:]))
+        return out
+
+    for eqn in model_def.get('equations', {}).values():
+        eqn['sources'] = replicated(eqn.get('sources', []))
+
+    for env in model_def.get('environment', {}).values():
+        for channel in env.get('init_params', {}).get('channels', []) or []:
+            if 'k_mods' in channel:
+                channel['k_mods'] = replicated(channel['k_mods'])
+
+    return model_def
+
+
+def model_definition(tutorial = MICROBES_TUTORIAL, cells = None, microbes = 1):
+    """
+    Create the model definition of a tutorial with the given number of cells of the domain
+    and of microbial groups
+
+    Returns:
+        dict: with the keys "model" and "simulation"
+    """
+    definition = load_definition(tutorial)
+    model_def = definition['model']
+
+    if cells is not None:
+        params = model_def['domain']['init_params']
+        total = params['sediment_length'] + params['dbl_length']
+        params['cell_size'] = total / float(cells)
+
+    replicate_microbes(model_def, microbes)
+    return definition
+
+
+def create_model(definition):
+    return MicroBenthosModel.create_from(copy.deepcopy(definition['model']))
+
+
+def check_solver(name):
+    """
+    Raise NotImplementedError, which skips the benchmark in asv, if the solver backend is not
+    importable
+    """
+    try:
+        importlib.import_module('fipy.solvers.{}'.format(name))
+    except Exception:
+        raise NotImplementedError('fipy solver {!r} not available'.format(name))
+
+
+def started_simulation(definition, solver = 'scipy'):
+    """
+    Create the model and simulation of the definition, and start the evolution until the first
+    state is yielded
+
+    Returns:
+        tuple: `(model, simulation, evolution)`
+    """
+    check_solver(solver)
+    model = create_model(definition)
+    sim_def = copy.deepcopy(definition.get('simulation', {}))
+    sim_def['fipy_solver'] = solver
+    simulation = Simulation.create_from(sim_def)
+    simulation.model = model
+    evolution = simulation.evolution()
+    next(evolution)
+    return model, simulation, evolution
@@ -15,12 +15,6 @@ import warnings
 
 warnings.filterwarnings('ignore', category=FutureWarning)
 
-from .utils import *
-from .core import *
-from .model import *
-from .dataview import *
-from .exporters import *
-
 
 def setup_console_logging(name = None, level = 20):
     import logging
@@ -39,3 +33,15 @@ def setup_console_logging(name = None, level = 20):
 
     logger.addHandler(handler)
     logger.info('Set up console logging: {} level={}'.format(name, logger.getEffectiveLevel()))
+
+
+# the classes of the subpackages are imported on first access, so that importing the package
+# (as for the command line) does not load sympy, fipy, matplotlib, etc. This is done last, since
+# on python < 3.5 the module is replaced by a copy, which misses the names defined after it.
+from .utils.lazy_import import lazy_attributes
+from . import utils, core, model, dataview, exporters
+
+for _pkg in (utils, core, model, dataview, exporters):
+    lazy_attributes(__name__, dict(
+        (name, _pkg.__name__ + mod) for name, mod in _pkg.ATTRIBUTES.items()))
+del _pkg
@@ -261,13 +261,23 @@ def setup_completion(shell, show_code):
 @click.option('--resume', type=int,
               help='Resume simulation by restoring from stored data at time index',
               )
+@click.option('--spinup', type=click.Path(dir_okay=False, exists=True),
+              help='Start from the final state of a model data file of a run on a different '
+                   'mesh, such as a coarse spin-up',
+              )
+@click.option('--warm-start', type=click.Path(dir_okay=True),
+              help='Warm-start store to initialize the model from the nearest stored state, '
+                   'and to save the final state in',
+              )
 @click.option('-eqns', '--show-eqns', is_flag=True,
               help='Show equations that will be solved')
+@click.option('-q', '--quiet', is_flag=True,
+              help='Log only warnings and errors during the run, for the fastest evolution')
 @click.argument('model_file', type=click.File())
 def cli_simulate(model_file, output_dir, exporter, overwrite, compression,
                  confirm, progress,
                  simtime_total, simtime_lims, max_sweeps, max_residual, fipy_solver,
-                 plot, video, frames, budget, resume, show_eqns):
+                 plot, video, frames, budget, resume, spinup, warm_start, show_eqns, quiet):
     """
     Run simulation from definition file
     """
@@ -302,6 +312,8 @@ def cli_simulate(model_file, output_dir, exporter, overwrite, compression,
                               model=defs['model'],
                               simulation=defs['simulation'],
                               resume=resume,
+                              spinup=spinup,
+                              warm_start=warm_start,
                               overwrite=overwrite,
                               confirm=confirm,
                               progress=progress,
@@ -310,7 +322,8 @@ def cli_simulate(model_file, output_dir, exporter, overwrite, compression,
                               frames=frames,
                               budget=budget,
                               exporters=exporter,
-                              show_eqns=show_eqns)
+                              show_eqns=show_eqns,
+                              quiet=quiet)
 
     if not runner.get_data_exporters():
         click.secho('No data exporters defined. Adding with compression={}'.format(
@@ -321,6 +334,87 @@ def cli_simulate(model_file, output_dir, exporter, overwrite, compression,
     runner.run()
 
 
+@cli.group('sensitivity')
+def sensitivity():
+    """
+    Global sensitivity analysis of model parameters
+    """
+
+
+def _echo_indices(indices):
+    for output, params in sorted(indices.items()):
+        click.secho('Output: {}'.format(output), fg='green')
+        names = sorted(next(iter(params.values())).keys()) if params else []
+        click.echo('    {:<24}'.format('parameter') + ''.join('{:>12}'.format(n) for n in names))
+        for pname, values in sorted(params.items()):
+            click.echo('    {:<24}'.format(pname) +
+                       ''.join('{:>12.4g}'.format(values[n]) for n in names))
+
+
+@sensitivity.command('run')
+@click.option('-o', '--output-dir', type=click.Path(file_okay=False),
+              default=os.getcwd(),
+              help='Output directory for the study')
+@click.option('-j', '--processes', type=click.IntRange(1),
+              help='Number of worker processes (default: number of CPUs)')
+@click.option('-O', '--overwrite', is_flag=True,
+              help='Discard the runs of a different study in the output directory')
+@click.option('-sTime', '--simtime_total', callback=_simtime_total_callback,
+              help='Total simulation time of each run. Example: "10h"')
+@click.argument('model_file', type=click.File())
+@click.argument('study_file', type=click.File(), required=False)
+def sensitivity_run(model_file, study_file, output_dir, processes, overwrite, simtime_total):
+    """
+    Run a sensitivity study of a model definition.
+
+    The study is defined under the "sensitivity" key of the STUDY_FILE, or of the MODEL_FILE
+    if not given. The runs of the samples are cached in the output directory, so an
+    interrupted study is resumed by running it again.
+    """
+    from microbenthos.utils import yaml
+
+    click.echo('Loading model from {}'.format(model_file.name))
+    defs = yaml.load(model_file, Loader=yaml.Loader)
+    if study_file is not None:
+        click.echo('Loading study from {}'.format(study_file.name))
+        study = yaml.load(study_file, Loader=yaml.Loader).get('sensitivity')
+    else:
+        study = defs.get('sensitivity')
+
+    if not study:
+        raise click.BadParameter('No "sensitivity" definition found', param_hint='study_file')
+
+    simulation = defs.get('simulation') or {}
+    if simtime_total is not None:
+        simulation['simtime_total'] = simtime_total
+
+    from microbenthos.runners import SensitivityRunner
+    runner = SensitivityRunner(model=defs['model'],
+                               study=study,
+                               simulation=simulation,
+                               output_dir=output_dir,
+                               processes=processes,
+                               overwrite=overwrite)
+
+    click.secho('Starting sensitivity study in {}'.format(output_dir), fg='green')
+    indices = runner.run()
+    _echo_indices(indices)
+
+
+@sensitivity.command('analyze')
+@click.argument('output_dir', type=click.Path(file_okay=False, exists=True))
+def sensitivity_analyze(output_dir):
+    """
+    Compute the sensitivity indices from the completed runs of a study
+    """
+    from microbenthos.runners import SensitivityRunner
+    runner = SensitivityRunner.from_output_dir(output_dir)
+    indices = runner.analyze()
+    click.secho('Indices from {} of {} samples'.format(
+        len(runner.completed()), len(runner.samples)), fg='yellow')
+    _echo_indices(indices)
+
+
 @cli.group('export')
 def export():
     """
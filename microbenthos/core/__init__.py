@@ -1,7 +1,19 @@
-from .domain import SedimentDBLDomain
-from .entity import Entity, DomainEntity
-from .variable import ModelVariable
-from .expression import Expression
-from .irradiance import Irradiance, IrradianceChannel
-from .microbes import MicrobialGroup
-from .process import Process, ProcessEvent
+from ..utils.lazy_import import lazy_attributes
+
+#: the public attributes, imported from their modules on first access
+ATTRIBUTES = {
+    'SedimentDBLDomain': '.domain',
+    'Entity': '.entity',
+    'DomainEntity': '.entity',
+    'ModelVariable': '.variable',
+    'Expression': '.expression',
+    'Irradiance': '.irradiance',
+    'IrradianceChannel': '.irradiance',
+    'IrradianceSchedule': '.schedule',
+    'MicrobialGroup': '.microbes',
+    'Process': '.process',
+    'ProcessEvent': '.process',
+    'EventEngine': '.events',
+    }
+
+lazy_attributes(__name__, ATTRIBUTES)
@@ -11,12 +11,47 @@ from fipy.tools import numerix
 from ..utils.snapshotters import snapshot_var
 
 
+def graded_cell_sizes(first, length, ratio, largest = None):
+    """
+    Create the sizes of cells that grow geometrically to fill a length. The last cell is
+    adjusted so that the sizes sum up to `length`, and merged into the previous cell if it would
+    be less than half its size.
+
+    Args:
+        first (float): The size of the first cell
+        length (float): The length to fill, in the same units as `first`
+        ratio (float): The ratio of the sizes of successive cells (>= 1)
+        largest (None, float): The maximum size of a cell
+
+    Returns:
+        :class:`numpy.ndarray`: the cell sizes, which is empty if `length` is zero
+    """
+    sizes = []
+    total = 0.0
+    size = float(first)
+    while length - total > 1e-9 * length:
+        if largest is not None:
+            size = min(size, largest)
+        sizes.append(size)
+        total += size
+        size *= ratio
+
+    if sizes:
+        sizes[-1] = length - sum(sizes[:-1])
+        if len(sizes) > 1 and sizes[-1] < 0.5 * sizes[-2]:
+            last = sizes.pop()
+            sizes[-1] += last
+
+    return numerix.array(sizes, dtype=float)
+
+
 class SedimentDBLDomain(object):
     """
     Class that defines the model domain as a sediment column with a diffusive boundary layer.
     """
 
-    def __init__(self, cell_size = 0.1, sediment_length = 10, dbl_length = 1, porosity = 0.6):
+    def __init__(self, cell_size = 0.1, sediment_length = 10, dbl_length = 1, porosity = 0.6,
+                 grading_ratio = None, max_cell_size = None, cell_sizes = None):
         """
         Create a model domain that defines a sediment column and a diffusive boundary layer
         column on top of it. The mesh parameters should be supplied.
@@ -27,11 +62,27 @@ class SedimentDBLDomain(object):
         of the mesh, so that the model equations and parameters can all work on a common
         dimension system.
 
+        By default, the mesh is uniform with cells of `cell_size`. A graded mesh can be created
+        with a `grading_ratio`, in which case `cell_size` is the size of the cells adjacent to
+        the sediment surface, and the cells grow geometrically away from the surface into the
+        sediment and into the DBL, up to `max_cell_size`. Alternatively, the sizes of all the
+        cells can be given explicitly through `cell_sizes`.
+
         Args:
             cell_size (float, PhysicalField): The size of a cell (default: 100 micron)
             sediment_length (float): The length of the sediment column in mm (default: 10)
             dbl_length (float): The length of the DBL in mm (default: 1)
             porosity (float): The porosity value for the sediment column (default: 0.6)
+            grading_ratio (None, float): The ratio (>= 1) of the sizes of successive cells away
+                from the sediment surface. If None, then the mesh is uniform.
+            max_cell_size (None, float, PhysicalField): The largest cell size of a graded mesh
+            cell_sizes (None, list, PhysicalField): The sizes of the cells from the top of the
+                DBL to the bottom of the sediment. The sediment surface is placed at the cell
+                face closest to `dbl_length`. If given, the other mesh parameters are only used
+                to locate the surface.
+
+        Raises:
+            ValueError: if the grading parameters or `cell_sizes` are invalid
 
         """
         self.logger = logging.getLogger(__name__)
@@ -44,7 +95,8 @@ class SedimentDBLDomain(object):
 
         self.sediment_cells = self.DBL_cells = None
 
-        #: the mesh cell size as a PhysicalField
+        #: the mesh cell size as a PhysicalField. For graded meshes, this is the size of the
+        #: cells at the sediment surface.
         self.cell_size = PhysicalField(cell_size, 'mm')
         #: the sediment subdomain length as a PhysicalField
         self.sediment_length = PhysicalField(sediment_length, 'mm')
@@ -54,18 +106,79 @@ class SedimentDBLDomain(object):
         assert self.sediment_length.numericValue > 0, "Sediment length should be positive"
         assert self.DBL_length.numericValue >= 0, "DBL length should be positive or zero"
 
-        assert (self.sediment_length / self.cell_size) >= 10, \
-            "Sediment length {} too small for cell size {}".format(
-                self.sediment_length, self.cell_size
-                )
-
-        self.sediment_cells = int(self.sediment_length / self.cell_size)
-        self.DBL_cells = int(self.DBL_length / self.cell_size)
+        #: the ratio of successive cell sizes of a graded mesh, or None
+        self.grading_ratio = None
+        #: the largest cell size of a graded mesh as a PhysicalField, or None
+        self.max_cell_size = None
+
+        if cell_sizes is not None:
+            if isinstance(cell_sizes, PhysicalField):
+                sizes = cell_sizes.inUnitsOf('mm').value
+            else:
+                sizes = [PhysicalField(c, 'mm').inUnitsOf('mm').value for c in cell_sizes]
+            sizes = numerix.array(sizes, dtype=float)
+            if sizes.ndim != 1 or len(sizes) < 10 or numerix.any(sizes <= 0):
+                raise ValueError('cell_sizes should be at least 10 positive values, '
+                                 'not {}'.format(sizes))
+
+            faces = numerix.concatenate(([0.0], numerix.cumsum(sizes)))
+            dbl_cells = int(numerix.argmin(abs(faces - self.DBL_length.value)))
+            dbl_sizes, sed_sizes = sizes[:dbl_cells], sizes[dbl_cells:]
+            self.cell_size = PhysicalField(sizes.min(), 'mm')
+
+        elif grading_ratio is not None:
+            self.grading_ratio = float(grading_ratio)
+            if self.grading_ratio < 1:
+                raise ValueError('grading_ratio should be >= 1, not {}'.format(grading_ratio))
+
+            if max_cell_size is not None:
+                self.max_cell_size = PhysicalField(max_cell_size, 'mm')
+                if self.max_cell_size < self.cell_size:
+                    raise ValueError('max_cell_size {} should not be smaller than cell_size '
+                                     '{}'.format(self.max_cell_size, self.cell_size))
+
+            assert (self.sediment_length / self.cell_size) >= 10, \
+                "Sediment length {} too small for cell size {}".format(
+                    self.sediment_length, self.cell_size
+                    )
+
+            first = self.cell_size.value
+            largest = None
+            if self.max_cell_size is not None:
+                largest = float(self.max_cell_size.inUnitsOf('mm').value)
+            sed_sizes = graded_cell_sizes(first, self.sediment_length.value,
+                                          self.grading_ratio, largest)
+            dbl_sizes = graded_cell_sizes(first, self.DBL_length.value,
+                                          self.grading_ratio, largest)[::-1]
+
+        else:
+            assert (self.sediment_length / self.cell_size) >= 10, \
+                "Sediment length {} too small for cell size {}".format(
+                    self.sediment_length, self.cell_size
+                    )
+
+            first = self.cell_size.value
+            sed_sizes = numerix.ones(int(self.sediment_length / self.cell_size)) * first
+            dbl_sizes = numerix.ones(int(self.DBL_length / self.cell_size)) * first
+
+        #: the uniform flag is False if the cells have different sizes
+        self.uniform = cell_sizes is None and self.grading_ratio is None
+
+        self.sediment_cells = len(sed_sizes)
+        self.DBL_cells = len(dbl_sizes)
         #: total cells in the domain: sediment + DBL
         self.total_cells = self.sediment_cells + self.DBL_cells
 
-        self.sediment_length = self.sediment_cells * self.cell_size
-        self.DBL_length = self.sediment_interface = self.DBL_cells * self.cell_size
+        #: the sizes of the mesh cells from the top of the DBL as a PhysicalField
+        self.cell_sizes = PhysicalField(numerix.concatenate((dbl_sizes, sed_sizes)), 'mm')
+
+        if self.uniform:
+            self.sediment_length = self.sediment_cells * self.cell_size
+            self.DBL_length = self.sediment_interface = self.DBL_cells * self.cell_size
+        else:
+            self.sediment_length = PhysicalField(float(numerix.sum(sed_sizes)), 'mm')
+            self.DBL_length = self.sediment_interface = PhysicalField(
+                float(numerix.sum(dbl_sizes)), 'mm')
         self.total_length = self.sediment_length + self.DBL_length
 
         #: The coordinate index for the sediment surface
@@ -110,18 +223,26 @@ class SedimentDBLDomain(object):
 
     def create_mesh(self):
         """
-        Create the :mod:`fipy` mesh for the domain using :attr:`cell_size` and :attr:`total_cells`.
+        Create the :mod:`fipy` mesh for the domain using :attr:`cell_size` and :attr:`total_cells`,
+        or from :attr:`cell_sizes` if the mesh is not :attr:`.uniform`.
 
         The arrays :attr:`depths` and :attr:`distances` are created, which provide the
         coordinates and distances of the mesh cells.
         """
 
-        self.logger.info('Creating UniformGrid1D with {} sediment and {} DBL cells of {}'.format(
-            self.sediment_cells, self.DBL_cells, self.cell_size
-            ))
-        self.mesh = Grid1D(dx=self.cell_size.numericValue,
-                           nx=self.total_cells,
-                           )
+        if self.uniform:
+            self.logger.info('Creating UniformGrid1D with {} sediment and {} DBL cells of {}'.format(
+                self.sediment_cells, self.DBL_cells, self.cell_size
+                ))
+            self.mesh = Grid1D(dx=self.cell_size.numericValue,
+                               nx=self.total_cells,
+                               )
+        else:
+            self.logger.info('Creating NonUniformGrid1D with {} sediment and {} DBL cells of '
+                             '{} to {}'.format(self.sediment_cells, self.DBL_cells,
+                                               self.cell_sizes.value.min(),
+                                               self.cell_sizes.value.max()))
+            self.mesh = Grid1D(dx=self.cell_sizes.inUnitsOf('m').value)
         self.logger.debug('Created domain mesh: {}'.format(self.mesh))
 
         #: An array of the scaled cell distances of the mesh
@@ -133,7 +254,7 @@ class SedimentDBLDomain(object):
         #: An array of the cell center coordinates, with the 0 set at the sediment surface
         self.depths = Variable(Z, unit='m', name='depths')
 
-    def create_var(self, name, store = True, **kwargs):
+    def create_var(self, name, store = True, var_cls = None, **kwargs):
         """
         Create a variable on the mesh as a :class:`.CellVariable`.
 
@@ -147,6 +268,9 @@ class SedimentDBLDomain(object):
 
             store (bool): If True, then the created variable is stored in :attr:`.VARS`
 
+            var_cls (None, type): A subclass of :class:`.CellVariable` to create instead,
+                such as :class:`~microbenthos.core.lazy.LazyCellVariable`
+
             value (float, :class:`numpy.ndarray`, PhysicalField): value to set on the variable
 
             unit (str): The physical units for the variable
@@ -202,7 +326,8 @@ class SedimentDBLDomain(object):
             raise ValueError('Value {} could not be cast numerically'.format(value))
 
         self.logger.debug('Creating CellVariable {!r} with: {}'.format(name, kwargs))
-        var = CellVariable(mesh=self.mesh, name=name, value=value, **kwargs)
+        var_cls = var_cls or CellVariable
+        var = var_cls(mesh=self.mesh, name=name, value=value, **kwargs)
 
         self.logger.debug('Created variable {!r}: shape: {} unit: {}'.format(var,
                                                                              var.shape, var.unit))
@@ -287,7 +412,12 @@ class SedimentDBLDomain(object):
                 * `total_length`
                 * `sediment_porosity`
                 * `idx_surface`
+                * `grading_ratio` (only for graded meshes)
+                * `max_cell_size` (only for graded meshes with a maximum cell size)
 
+            * cell_sizes (only for non-uniform meshes):
+                * "data_static"
+                    * (:attr:`.cell_sizes`, `dict(unit="m")`)
 
         Returns:
             dict
@@ -305,9 +435,16 @@ class SedimentDBLDomain(object):
         meta['total_length'] = str(self.total_length)
         meta['sediment_porosity'] = self.sediment_porosity
         meta['idx_surface'] = self.idx_surface
+        if self.grading_ratio is not None:
+            meta['grading_ratio'] = self.grading_ratio
+        if self.max_cell_size is not None:
+            meta['max_cell_size'] = str(self.max_cell_size)
 
         state['depths'] = {'data_static': snapshot_var(self.depths, base=base)}
         state['distances'] = {'data_static': snapshot_var(self.distances, base=base)}
+        if not self.uniform:
+            cell_sizes = Variable(self.cell_sizes.inUnitsOf('m'), name='cell_sizes')
+            state['cell_sizes'] = {'data_static': snapshot_var(cell_sizes, base=base)}
 
         return state
 
@@ -141,7 +141,8 @@ class Entity(object):
         Args:
             clocktime (float, PhysicalField): The model clock time.
         """
-        self.logger.debug('Updating {} for clock {}'.format(self, clocktime))
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug('Updating {} for clock {}'.format(self, clocktime))
 
     def snapshot(self):
         """
@@ -0,0 +1,187 @@
+"""
+Module for the batched update of the :class:`~microbenthos.core.process.ProcessEvent` instances
+of a model
+"""
+
+import logging
+
+from fipy import PhysicalField, Variable
+from fipy.tools import numerix
+
+
+class EventEngine(object):
+    """
+    Updates the event times of all registered :class:`.ProcessEvent` instances together.
+
+    The event times of the events are stored as rows of a single array of shape ``(n_events,
+    n_cells)``, which the :attr:`.ProcessEvent.event_time` variables use as their storage. On
+    each clock update (:meth:`.update`), the conditions of the events are collected into a
+    boolean array of the same shape, and the event times are incremented and reset in-place.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+
+        #: the registered events
+        self.events = []
+        #: array of the event times in the units of each event time variable
+        self.times = None
+
+        self._rows = []
+        self._conditions = None
+        self._scales = numerix.zeros(0)
+        self._prev = numerix.zeros(0)
+
+    def __repr__(self):
+        return 'EventEngine({})'.format(len(self.events))
+
+    def __len__(self):
+        return len(self.events)
+
+    @staticmethod
+    def _seconds(clock):
+        if isinstance(clock, Variable):
+            clock = clock.value
+        if isinstance(clock, PhysicalField):
+            return float(clock.inUnitsOf('s').value)
+        return float(clock)
+
+    @staticmethod
+    def _storage(var):
+        value = var._value
+        if isinstance(value, PhysicalField):
+            return value.value
+        return value
+
+    def register(self, event, clock):
+        """
+        Register an event whose :attr:`~.ProcessEvent.event_time` has been created
+
+        Args:
+            event (:class:`.ProcessEvent`): the event which is set up
+            clock (float, PhysicalField, Variable): the model clock time at setup, in seconds if a
+                plain number
+
+        Raises:
+            ValueError: if the event time variable has a different shape than the other events
+        """
+        var = event.event_time
+        current = numerix.array(
+            numerix.broadcast_to(self._storage(var), var.shape), dtype=float)
+
+        if self.times is not None and current.shape != self.times.shape[1:]:
+            raise ValueError('Event {} shape {} does not match engine shape {}'.format(
+                event, current.shape, self.times.shape[1:]))
+
+        unit = var.unit
+        if unit.isDimensionless():
+            scale = 1.0
+        else:
+            scale = float(PhysicalField(1, 's').inUnitsOf(unit).value)
+
+        if self.times is None:
+            times = current[numerix.newaxis]
+        else:
+            times = numerix.concatenate((self.times, current[numerix.newaxis]))
+
+        self.events.append(event)
+        self.times = times
+        self._rows = list(self.times)
+        self._conditions = numerix.zeros(self.times.shape, dtype=bool)
+        self._scales = numerix.append(self._scales, scale)
+        self._prev = numerix.append(self._prev, self._seconds(clock))
+
+        for row, ev in zip(self._rows, self.events):
+            self._link(ev.event_time, row)
+
+        event.engine = self
+        self.logger.debug('Registered {} in {}'.format(event, self))
+
+    def unregister(self, event):
+        """
+        Remove an event from the engine, so that it updates its event time by itself again. The
+        event time variable keeps its current values in a new array.
+
+        Args:
+            event (:class:`.ProcessEvent`): a registered event
+
+        Raises:
+            ValueError: if the event is not registered
+        """
+        for idx, ev in enumerate(self.events):
+            if ev is event:
+                break
+        else:
+            raise ValueError('Event {} not registered in {}'.format(event, self))
+
+        var = event.event_time
+        self._link(var, self.times[idx].copy())
+        event._prev_clock = PhysicalField(self._prev[idx], 's')
+        event.engine = None
+
+        del self.events[idx]
+        self._scales = numerix.delete(self._scales, idx)
+        self._prev = numerix.delete(self._prev, idx)
+        if self.events:
+            self.times = numerix.delete(self.times, idx, axis=0)
+            self._rows = list(self.times)
+            self._conditions = numerix.zeros(self.times.shape, dtype=bool)
+            for row, ev in zip(self._rows, self.events):
+                self._link(ev.event_time, row)
+        else:
+            self.times = None
+            self._rows = []
+            self._conditions = None
+
+        self.logger.debug('Unregistered {} from {}'.format(event, self))
+
+    def _link(self, var, row):
+        """
+        Set the row of :attr:`.times` as the storage of the event time variable, carrying over
+        any value set on the variable directly
+        """
+        value = var._value
+        if isinstance(value, PhysicalField):
+            if value.value is not row:
+                row[...] = value.value
+                value.value = row
+        elif value is not row:
+            row[...] = value
+            var._value = row
+
+    def update(self, clock):
+        """
+        Update the event times of all the events for the clock time. Where the condition of an
+        event is True, its time is incremented by the time since the last update, and elsewhere
+        reset to zero.
+
+        Args:
+            clock (float, PhysicalField, Variable): the model clock time, in seconds if a plain number
+        """
+        if not self.events:
+            return
+
+        clock_s = self._seconds(clock)
+
+        conditions = self._conditions
+        for idx, event in enumerate(self.events):
+            conditions[idx] = event.condition.value
+
+        times = self.times
+        dts = (clock_s - self._prev) * self._scales
+        self._prev.fill(clock_s)
+
+        for row, event in zip(self._rows, self.events):
+            self._link(event.event_time, row)
+
+        numerix.add(times, dts[:, numerix.newaxis], out=times)
+        numerix.multiply(times, conditions, out=times)
+
+        for event in self.events:
+            event.event_time._markFresh()
+
+        if self.logger.isEnabledFor(logging.DEBUG):
+            for idx, event in enumerate(self.events):
+                self.logger.debug('{} condition true in {} of {} with max time: {}'.format(
+                    event, numerix.count_nonzero(conditions[idx]), conditions.shape[1],
+                    times[idx].max()))
@@ -1,8 +1,53 @@
 import logging
+import threading
 from collections import Mapping
+from contextlib import contextmanager
 
 import sympy as sp
 
+_local = threading.local()
+
+
+@contextmanager
+def formula_namespace(namespace):
+    """
+    Context manager to make the formulae in `namespace` available to the :class:`Expression`
+    instances created in the block. The namespace is local to the current thread, so models
+    with different formulae of the same name can be created in separate threads. Nested
+    namespaces take precedence over the outer ones.
+
+    Args:
+        namespace (dict): mapping of names to symbolic functions, such as
+            :attr:`.MicroBenthosModel.formulae`. It is read when each expression is created, so
+            entries added within the block are used by the later expressions.
+
+    Example:
+
+        .. code-block:: python
+
+            formulae = dict(square=sp.Lambda(sp.symbols('x'), 'x**2'))
+            with formula_namespace(formulae):
+                expr = Expression('square(y)')
+
+    """
+    stack = _local.__dict__.setdefault('namespaces', [])
+    stack.append(namespace)
+    try:
+        yield namespace
+    finally:
+        stack.pop()
+
+
+def active_namespace():
+    """
+    Returns:
+        dict: a copy of the formulae active in the current thread from :func:`formula_namespace`
+    """
+    namespace = {}
+    for entry in getattr(_local, 'namespaces', ()):
+        namespace.update(entry)
+    return namespace
+
 
 class Expression(object):
     """
@@ -19,8 +64,6 @@ class Expression(object):
         apply on processing unvalidated inputs as listed in the sympy docs.
 
     """
-    #: the namespace used for :meth:`sympy.sympify`
-    _sympy_ns = {}
 
     def __init__(self, formula = None, name = None, namespace = None,
                  derived = None,
@@ -35,7 +78,8 @@ class Expression(object):
             name (str): An identifier for the instance
 
             namespace (None, dict): A mapping of symbolic names to expressions to be added to the
-                :attr:`_sympy_ns`. The structure of the dictionary should be
+                :attr:`_sympy_ns`, which starts from the formulae of the enclosing
+                :func:`formula_namespace`. The structure of the dictionary should be
 
                 * name (str)
                     * vars (list) : symbols in the `expr` to be passed to
@@ -69,7 +113,7 @@ class Expression(object):
         self.name = name or 'unnamed'
 
         #: the namespace used for :func:`~sympy.core.sympify.sympify`
-        self._sympy_ns = self._sympy_ns.copy()
+        self._sympy_ns = active_namespace()
 
         namespace = namespace or {}
         for name, itemdef in namespace.items():
@@ -1,3 +1,5 @@
+import functools
+import itertools
 import logging
 
 from fipy import PhysicalField, Variable
@@ -5,6 +7,8 @@ from fipy.tools import numerix
 from scipy.stats import cosine
 
 from .entity import DomainEntity
+from .lazy import LazyCellVariable, LazyVariable
+from .schedule import IrradianceSchedule
 from ..utils.snapshotters import snapshot_var, restore_var
 
 
@@ -21,9 +25,24 @@ class Irradiance(DomainEntity):
     to run from midnight to midnight. The intensity in each channel is then represented as a
     fraction of the surface level (set at 100).
 
+    The surface level and the channel intensities are lazy variables. When the model clock is
+    updated, they are only marked stale, and recalculated when they are next read.
+
+    Instead of the cosinusoidal profile, the surface level can be looked up from an
+    :class:`.IrradianceSchedule` through `schedule`. This can be the cosine profile tabulated at
+    a given resolution, which is faster to look up, or a measured light time series.
+
+    In the `spectral` mode, the attenuation and intensities of all the channels are stored as
+    stacked arrays of shape ``(n_channels, n_cells)``, and updated together in vectorized
+    operations. This is useful to model many narrow wavebands as channels. The
+    :attr:`.intensities` of each channel is then a view of its row in
+    :attr:`.spectral_intensities`, and a spectrally integrated intensity can be created in the
+    domain through `integrated_var`.
+
     """
 
-    def __init__(self, hours_total = 24, day_fraction = 0.5, channels = None, **kwargs):
+    def __init__(self, hours_total = 24, day_fraction = 0.5, channels = None, spectral = False,
+                 integrated_var = None, schedule = None, **kwargs):
         """
         Initialize an irradiance source in the model domain
 
@@ -35,8 +54,21 @@ class Irradiance(DomainEntity):
 
             channels: See :meth:`.create_channel`
 
+            spectral (bool): Whether to update the channels together as stacked arrays (default:
+                False)
+
+            integrated_var (None, str): Name of a domain variable to create for the sum of the
+                intensities of all the channels, in spectral mode (default: None)
+
+            schedule (None, dict, IrradianceSchedule): The schedule of surface levels. See
+                :meth:`.create_schedule` for the dict definition. If None, the cosine profile is
+                calculated at each time update.
+
             **kwargs: passed to superclass
 
+        Raises:
+            ValueError: if `integrated_var` is given without `spectral` mode
+
         """
         self.logger = kwargs.get('logger') or logging.getLogger(__name__)
         self.logger.debug('Init in {}'.format(self.__class__.__name__))
@@ -45,6 +77,22 @@ class Irradiance(DomainEntity):
 
         #: the channels in the irradiance entity
         self.channels = {}
+        #: the names of the channels in order of creation, which is the order in spectral mode
+        self.channel_names = []
+
+        #: flag for the spectral mode of stacked channels
+        self.spectral = bool(spectral)
+        if integrated_var and not self.spectral:
+            raise ValueError('integrated_var {!r} requires spectral mode'.format(integrated_var))
+        #: name of the domain variable for the spectrally integrated intensity
+        self.integrated_var = integrated_var
+        #: the :class:`.LazyCellVariable` of the spectrally integrated intensity
+        self.integrated = None
+        self._K = None
+        self._profiles = None
+        self._stack = None
+        self._k_versions = None
+        self._stack_stale = True
 
         #: the number of hours in a diel period
         self.hours_total = PhysicalField(hours_total, 'h')
@@ -73,8 +121,18 @@ class Irradiance(DomainEntity):
         # This profile with loc=zenith means that the day starts at "midnight" and zenith occurs
         # in the center of the daylength
 
-        #: a :class:`Variable` for the momentary radiance level at the surface
-        self.surface_irrad = Variable(name='irrad_surface', value=0.0, unit=None)
+        #: the :class:`.IrradianceSchedule` to look up the surface level from, if given
+        self.schedule = None
+        if isinstance(schedule, IrradianceSchedule):
+            self.schedule = schedule
+        elif schedule:
+            self.schedule = self.create_schedule(**schedule)
+
+        self._clocktime = None
+
+        #: a :class:`.LazyVariable` for the momentary radiance level at the surface
+        self.surface_irrad = LazyVariable(name='irrad_surface', value=0.0, unit=None,
+                                          updater=self._calc_surface_irrad)
 
         if channels:
             for chinfo in channels:
@@ -96,6 +154,11 @@ class Irradiance(DomainEntity):
             if not channel.has_domain:
                 channel.domain = self.domain
             channel.setup(model=model)
+            if not self.spectral:
+                channel.set_surface(self.surface_irrad)
+
+        if self.spectral:
+            self._setup_spectral()
 
     @property
     def is_setup(self):
@@ -127,21 +190,178 @@ class Irradiance(DomainEntity):
 
         channel = IrradianceChannel(name=name, k0=k0, k_mods=k_mods)
         self.channels[name] = channel
+        self.channel_names.append(name)
 
         if self.has_domain:
             channel.domain = self.domain
             channel.setup(model=model)
+            if self.spectral:
+                self._setup_spectral()
+            else:
+                channel.set_surface(self.surface_irrad)
 
         return channel
 
+    def _setup_spectral(self):
+        """
+        Create the stacked arrays for the channels in spectral mode, and set the updaters of the
+        channel intensities to read from them.
+        """
+        shape = (len(self.channel_names), self.domain.distances.shape[0])
+        self.logger.debug('Setting up spectral arrays of shape {}'.format(shape))
+        self._K = numerix.zeros(shape)
+        self._profiles = numerix.ones(shape)
+        self._stack = numerix.zeros(shape)
+        self._k_versions = None
+        self._stack_stale = True
+
+        for idx, name in enumerate(self.channel_names):
+            self.channels[name].intensities.set_updater(functools.partial(self._spectral_row, idx))
+
+        if self.integrated_var and self.integrated is None:
+            self.integrated = self.domain.create_var(self.integrated_var,
+                                                     var_cls=LazyCellVariable)
+            self.logger.info('Created integrated intensity variable {!r}'.format(
+                self.integrated_var))
+        if self.integrated is not None:
+            self.integrated.set_updater(self._spectral_total)
+
+    @property
+    def spectral_profiles(self):
+        """
+        The attenuation profiles of all the channels in spectral mode, recalculated only when
+        the attenuation of any channel has changed.
+
+        Returns:
+            :class:`numpy.ndarray`: array of shape ``(n_channels, n_cells)``
+        """
+        channels = [self.channels[name] for name in self.channel_names]
+        versions = tuple(ch._attenuation_version() for ch in channels)
+        if versions != self._k_versions:
+            self.logger.debug('Calculating spectral attenuation profiles')
+            K = self._K
+            for idx, ch in enumerate(channels):
+                K[idx] = ch.k_var.numericValue
+            numerix.multiply(K, -1 * self.domain.distances.numericValue, out=K)
+            numerix.exp(K, out=K)
+            numerix.cumprod(K, axis=1, out=self._profiles)
+            # reading the k_var marks them fresh, which bumps their versions
+            self._k_versions = tuple(ch._attenuation_version() for ch in channels)
+
+        return self._profiles
+
+    @property
+    def spectral_intensities(self):
+        """
+        The intensities of all the channels in spectral mode, recalculated only when read after
+        a clock update.
+
+        Returns:
+            :class:`numpy.ndarray`: array of shape ``(n_channels, n_cells)`` with the rows
+            ordered as :attr:`.channel_names`
+        """
+        if self._stack_stale:
+            numerix.multiply(self.spectral_profiles, float(self.surface_irrad.value),
+                             out=self._stack)
+            self._stack_stale = False
+        return self._stack
+
+    def _spectral_row(self, idx):
+        """
+        Updater for the lazy intensities of a channel in spectral mode. The row is copied, so
+        that the channel does not hold a view into the stack, which is updated in place.
+        """
+        return self.spectral_intensities[idx].copy()
+
+    def _spectral_total(self):
+        """
+        Updater for the lazy :attr:`.integrated` intensity in spectral mode
+        """
+        return self.spectral_intensities.sum(axis=0)
+
     def on_time_updated(self, clocktime):
         """
-        Update the surface irradiance according to the clock time
+        Mark the surface irradiance and the channel intensities as stale for the clock time.
+        They are recalculated when next read.
 
         Args:
             clocktime (:class:`PhysicalField`): The model clock time
 
         """
+        self._clocktime = clocktime
+        self._stack_stale = True
+        self.surface_irrad.invalidate()
+        for channel in self.channels.values():
+            channel.invalidate()
+        if self.integrated is not None:
+            self.integrated.invalidate()
+
+    def create_schedule(self, resolution = None, path = None, cyclic = False, scale = 1.0,
+                        **kwargs):
+        """
+        Create an :class:`.IrradianceSchedule` for the surface level
+
+        Args:
+            resolution (None, float, PhysicalField): The time resolution to tabulate the cosine
+                profile over the diel period, in hours if a plain number. Used if no `path` is
+                given (default: 1 min).
+
+            path (None, str): Path to a CSV or HDF file with a measured light time series.
+                See :meth:`.IrradianceSchedule.from_file`.
+
+            cyclic (bool): Whether the measured series repeats with :attr:`.hours_total`. If
+                False, the series is an absolute record, such as over several days
+                (default: False)
+
+            scale (float): Factor to multiply the measured levels with (default: 1.0)
+
+            **kwargs: passed to the file loader
+
+        Returns:
+            :class:`.IrradianceSchedule`
+        """
+        if path:
+            self.logger.info('Loading irradiance schedule from {}'.format(path))
+            schedule = IrradianceSchedule.from_file(
+                path, period=self.hours_total if cyclic else None, scale=scale, **kwargs)
+        else:
+            if resolution is None:
+                resolution = PhysicalField(1, 'min')
+            schedule = IrradianceSchedule.from_function(
+                self.cosine_level, period=self.hours_total, resolution=resolution)
+
+        self.logger.info('Created {}'.format(schedule))
+        return schedule
+
+    def surface_level(self, clocktime):
+        """
+        Get the surface irradiance level according to the clock time, from the
+        :attr:`.schedule` if available, else from :meth:`.cosine_level`.
+
+        Args:
+            clocktime (float, :class:`PhysicalField`): The model clock time, in seconds if a
+                plain number
+
+        Returns:
+            float: the surface irradiance level
+        """
+        if self.schedule is None:
+            return self.cosine_level(clocktime)
+
+        if not isinstance(clocktime, PhysicalField):
+            clocktime = PhysicalField(clocktime, 's')
+        return self.schedule.level(clocktime)
+
+    def cosine_level(self, clocktime):
+        """
+        Calculate the surface irradiance level of the cosine profile according to the clock time
+
+        Args:
+            clocktime (float, :class:`PhysicalField`): The model clock time
+
+        Returns:
+            float: the surface irradiance level
+        """
         if isinstance(clocktime, PhysicalField):
             clocktime_ = clocktime.inBaseUnits() % self.hours_total.inBaseUnits()
         else:
@@ -152,16 +372,21 @@ class Irradiance(DomainEntity):
         # logger.debug('Profile level for clock {}: {}'.format(
         #     clock, self._profile.pdf(clocktime_)))
 
-        surface_value = self.zenith_level * self.hours_day.numericValue / 2.0 * \
-                        self._profile.pdf(clocktime_)
+        return self.zenith_level * self.hours_day.numericValue / 2.0 * \
+               self._profile.pdf(clocktime_)
 
-        self.surface_irrad.value = surface_value
-        self.logger.debug('Updated for time {} surface irradiance: {}'.format(clocktime,
-                                                                              self.surface_irrad))
+    def _calc_surface_irrad(self):
+        """
+        Updater for the lazy :attr:`.surface_irrad`
+        """
+        if self._clocktime is None:
+            return None
 
-        for channel in self.channels.values():
-            #: TODO: remove explicit calling by using Variable?
-            channel.update_intensities(self.surface_irrad)
+        surface_value = self.surface_level(self._clocktime)
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug('Updated for time {} surface irradiance: {}'.format(
+                self._clocktime, surface_value))
+        return surface_value
 
     def snapshot(self, base = False):
         """
@@ -243,8 +468,13 @@ class IrradianceChannel(DomainEntity):
 
         self.name = name
 
-        #: CellVariable to hold the intensities of the irradiance channel through the domain
+        #: LazyCellVariable to hold the intensities of the irradiance channel through the domain
         self.intensities = None
+        self._surface = None
+        self._intensities_buf = None
+
+        self._k_watcher = None
+        self._profile_cache = None
 
         try:
             #: the base attenuation through the sediment
@@ -277,7 +507,7 @@ class IrradianceChannel(DomainEntity):
         model = kwargs.get('model')
 
         if self.intensities is None:
-            self.intensities = self.domain.create_var(self.name)
+            self.intensities = self.domain.create_var(self.name, var_cls=LazyCellVariable)
 
             self.define_attenuation()
 
@@ -367,6 +597,18 @@ class IrradianceChannel(DomainEntity):
                 pending))
         return not bool(len(pending))
 
+    def _attenuation_version(self):
+        """
+        Returns:
+            int: the version of :attr:`.k_var`, which changes when it or its source variables
+            change
+        """
+        watcher = self._k_watcher
+        if watcher is None or watcher.watched is not self.k_var:
+            # k_var is replaced by a new variable when attenuation sources are added
+            watcher = self._k_watcher = _ChangeWatcher(self.k_var)
+        return watcher.version
+
     @property
     def attenuation_profile(self):
         """
@@ -374,10 +616,61 @@ class IrradianceChannel(DomainEntity):
 
         This returns the cumulative product of attenuation factors in each cell of the domain,
         allowing this to be multiplied by a surface value to get the irradiance intensity profile.
+
+        The profile is cached, and only recalculated when :attr:`.k_var` or its attenuation
+        sources have changed.
         """
+        version = self._attenuation_version()
+        cache = self._profile_cache
+        if cache is not None and cache[0] == version:
+            return cache[1]
+
         if not self.is_setup:
             self.logger.warning('Attenuation definition may be incomplete!')
-        return numerix.cumprod(numerix.exp(-1 * self.k_var * self.domain.distances))
+
+        profile = numerix.cumprod(numerix.exp(
+            -1 * self.k_var.numericValue * self.domain.distances.numericValue))
+
+        # reading k_var above marks it fresh, which bumps the version
+        self._profile_cache = (self._attenuation_version(), profile)
+        self.logger.debug('Calculated attenuation profile for {}'.format(self.name))
+        return profile
+
+    def set_surface(self, surface_level):
+        """
+        Set the variable of the surface level, from which the :attr:`.intensities` are lazily
+        calculated
+
+        Args:
+            surface_level (:class:`Variable`): The variable of the surface intensity
+        """
+        self._surface = surface_level
+        if self.intensities is not None:
+            self.intensities.set_updater(self._calc_intensities)
+
+    def invalidate(self):
+        """
+        Mark the :attr:`.intensities` as stale, to be recalculated when next read
+        """
+        if self.intensities is not None:
+            self.intensities.invalidate()
+
+    def _calc_intensities(self):
+        """
+        Updater for the lazy :attr:`.intensities`
+        """
+        if self._surface is None:
+            return None
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug('Updating intensities for surface value: {}'.format(self._surface))
+        profile = self.attenuation_profile
+
+        buf = self._intensities_buf
+        if buf is None or buf.shape != profile.shape:
+            buf = self._intensities_buf = numerix.empty_like(profile)
+
+        numerix.multiply(profile, float(self._surface.value), out=buf)
+        return buf
 
     def update_intensities(self, surface_level):
         """
@@ -389,7 +682,8 @@ class IrradianceChannel(DomainEntity):
         Returns:
             :class:`numpy.ndarray`: The intensity profile through the domain
         """
-        self.logger.debug('Updating intensities for surface value: {}'.format(surface_level))
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug('Updating intensities for surface value: {}'.format(surface_level))
         intensities = self.attenuation_profile * surface_level
         self.intensities.value = intensities
         return intensities
@@ -447,3 +741,24 @@ class IrradianceChannel(DomainEntity):
         self.intensities.setValue(restore_var(state['intensity'], tidx))
         # cannot set attenuation as this is determined as a binary operation between other variables
         # self.k_var.setValue(restore_var(state['attenuation'])[tidx])
+
+
+class _ChangeWatcher(Variable):
+    """
+    A variable that subscribes to another variable, to get a new version number every time it
+    is marked stale, i.e. when it or the variables it depends on change. The version numbers are
+    unique across all watchers.
+    """
+    _versions = itertools.count(1)
+
+    def __init__(self, var):
+        #: the version number, which changes when the watched variable changes
+        self.version = next(self._versions)
+        super(_ChangeWatcher, self).__init__(value=0)
+        #: the watched variable
+        self.watched = var
+        self._requires(var)
+
+    def _markStale(self):
+        self.version = next(self._versions)
+        super(_ChangeWatcher, self)._markStale()
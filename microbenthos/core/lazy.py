@@ -0,0 +1,78 @@
+"""
+Module with variables whose values are recalculated lazily, i.e. only when they are read after
+being invalidated.
+"""
+
+from fipy import CellVariable, Variable
+
+
+class LazyMixin(object):
+    """
+    Mixin for :class:`fipy.Variable` classes whose value is computed by an `updater` callable.
+
+    Instead of setting the value of the variable whenever its inputs change, the variable is
+    marked stale through :meth:`.invalidate`. This propagates through the dependency graph of
+    :mod:`fipy` variables, so that dependent expressions are also marked stale. The `updater` is
+    then called only when the value of the variable (or a dependent expression) is next read.
+
+    Setting the value directly (as done when restoring from a saved state) marks the variable as
+    fresh, until the next time it is invalidated.
+    """
+
+    def __init__(self, *args, **kwargs):
+        """
+        Args:
+            updater (callable): A function called without arguments that returns the new value
+                of the variable. If it returns `None`, then the current value is retained. A
+                returned array is used as the storage of the variable, so it should not be
+                shared with other objects.
+            *args, **kwargs: passed to the variable class
+        """
+        self._updater = kwargs.pop('updater', None)
+        #: number of times the value has been recalculated through the updater
+        self.update_count = 0
+        super(LazyMixin, self).__init__(*args, **kwargs)
+        self.invalidate()
+
+    def set_updater(self, updater):
+        """
+        Set the callable that computes the value of the variable, and invalidate it.
+
+        Args:
+            updater (callable): see :meth:`.__init__`
+        """
+        if updater is not None and not callable(updater):
+            raise TypeError('Updater {!r} should be callable'.format(updater))
+        self._updater = updater
+        self.invalidate()
+
+    def invalidate(self):
+        """
+        Mark the variable and its dependents as stale, so that the value is recalculated through
+        the updater when next read
+        """
+        if self._updater is not None:
+            self._markStale()
+
+    def _calcValue(self):
+        if self._updater is None:
+            return self._value
+
+        value = self._updater()
+        if value is None:
+            return self._value
+
+        self.update_count += 1
+        return value
+
+
+class LazyVariable(LazyMixin, Variable):
+    """
+    A :class:`fipy.Variable` whose value is computed lazily. See :class:`LazyMixin`.
+    """
+
+
+class LazyCellVariable(LazyMixin, CellVariable):
+    """
+    A :class:`fipy.CellVariable` whose value is computed lazily. See :class:`LazyMixin`.
+    """
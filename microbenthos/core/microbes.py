@@ -169,7 +169,8 @@ class MicrobialGroup(DomainEntity):
         """
         When model clock updated, delegate to feature and process instances
         """
-        self.logger.debug('Updating {}'.format(self))
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug('Updating {}'.format(self))
         for obj in self.features.values() + self.processes.values():
             obj.on_time_updated(clocktime)
 
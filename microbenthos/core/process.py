@@ -6,7 +6,7 @@ from fipy.tools import numerix as np
 
 from .expression import Expression
 from ..core import DomainEntity
-from ..utils import snapshot_var
+from ..utils import snapshot_var, restore_var
 
 
 class Process(DomainEntity):
@@ -114,7 +114,9 @@ class Process(DomainEntity):
             evaluated result typically one of (:class:`fipy binOp`, :class:`numpy.ndarray`)
 
         """
-        self.logger.debug('Evaluating expr {!r}'.format(expr))
+        debug = self.logger.isEnabledFor(logging.DEBUG)
+        if debug:
+            self.logger.debug('Evaluating expr {!r}'.format(expr))
 
         if not domain:
             self.check_domain()
@@ -158,7 +160,8 @@ class Process(DomainEntity):
         # self.logger.debug('Lambdifying with args: {}'.format(allsymbs))
         expr_func = sp.lambdify(allsymbs, expr, modules=self._lambdify_modules)
 
-        self.logger.debug('Evaluating with {}'.format(zip(allsymbs, args)))
+        if debug:
+            self.logger.debug('Evaluating with {}'.format(list(zip(allsymbs, args))))
         return expr_func(*args)
 
     def as_source_for(self, varname, **kwargs):
@@ -244,7 +247,7 @@ class Process(DomainEntity):
 
         """
         e = self.expr.expr()
-        return sp.pretty(e)
+        return sp.pretty(e, use_unicode=True)
 
     def snapshot(self, base = False):
         """
@@ -260,6 +263,10 @@ class Process(DomainEntity):
 
             * "data" : (:func:`.snapshot_var` of :meth:`.as_term`)
 
+            * "events" (only if the events are set up)
+
+                * name: {"data": (:func:`.snapshot_var` of :attr:`.ProcessEvent.event_time`)}
+
         Args:
             base (bool): Convert to base units?
 
@@ -281,18 +288,27 @@ class Process(DomainEntity):
 
         state['data'] = snapshot_var(evaled, base=base)
 
+        events = dict((name, {'data': snapshot_var(event.event_time, base=base)})
+                      for name, event in self.events.items()
+                      if getattr(event, 'event_time', None) is not None)
+        if events:
+            state['events'] = events
+
         return state
 
     def restore_from(self, state, tidx):
         """
-        Restore the process state. This is a no-op as the term of the process is symbolically
-        defined through :class:`fipy.binOp`.
+        Restore the process state. The term of the process is symbolically defined through
+        :class:`fipy.binOp`, so only the event times of the :attr:`.events` are restored, if
+        present in the `state`.
         """
         self.logger.debug('Restoring {} from state: {}'.format(self, tuple(state)))
         self.check_domain()
 
-        # nothing to restore here since evaled = as_term() is a binary operator of other variables
-        pass
+        events = state.get('events', {})
+        for name, event in self.events.items():
+            if name in events and getattr(event, 'event_time', None) is not None:
+                event.event_time.setValue(restore_var(events[name], tidx))
 
     def add_event(self, name, **definition):
         """
@@ -373,6 +389,9 @@ class ProcessEvent(DomainEntity):
 
         self._prev_clock = None
 
+        #: The :class:`~microbenthos.core.events.EventEngine` that updates the event time, if any
+        self.engine = None
+
     def __repr__(self):
         if self.process:
             return '{}:Event({})'.format(
@@ -427,22 +446,35 @@ class ProcessEvent(DomainEntity):
         self.logger.debug('Clock set to: {}'.format(self._prev_clock))
         self.condition = self.process.evaluate(self.expr.expr())
 
+        engine = getattr(model, 'event_engine', None)
+        if engine is not None:
+            engine.register(self, model.clock)
+
     def on_time_updated(self, clock):
         """
         The event_time must be reset, wherever :attr:`.condition` evaluates to False. Wherever it
         evaluates to True, then increment the value by ``(clock - prev_clock)``.
+
+        If the event is registered with an :attr:`.engine`, then this is skipped, as the engine
+        updates all the events of the model together.
         """
-        self.logger.debug('Updating {} to clock {}'.format(self, clock))
+        if self.engine is not None:
+            return
+
+        debug = self.logger.isEnabledFor(logging.DEBUG)
         dt = clock.copy() - self._prev_clock
-        self.logger.debug('Time since last: {}'.format(dt.inUnitsOf('s')))
+        if debug:
+            self.logger.debug('Updating {} to clock {}'.format(self, clock))
+            self.logger.debug('Time since last: {}'.format(dt.inUnitsOf('s')))
         condition = self.condition()
         self.event_time.setValue(self.event_time.copy() + dt)
         self.event_time.value[~condition] = 0.0
         self._prev_clock = clock.copy()
 
-        self.logger.debug('{} condition true in {} of {} with max time: {}'.format(
-            self,
-            np.count_nonzero(condition),
-            len(condition),
-            max(self.event_time)
-            ))
+        if debug:
+            self.logger.debug('{} condition true in {} of {} with max time: {}'.format(
+                self,
+                np.count_nonzero(condition),
+                len(condition),
+                max(self.event_time)
+                ))
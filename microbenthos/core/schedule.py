@@ -0,0 +1,225 @@
+"""
+Module for tabulated time series of the surface irradiance
+"""
+from __future__ import division
+
+import logging
+import os
+
+import h5py as hdf
+from fipy import PhysicalField
+from fipy.tools import numerix
+
+
+class IrradianceSchedule(object):
+    """
+    A table of surface irradiance levels over time, which is looked up by linear interpolation.
+
+    The schedule is either `cyclic`, in which case the times are wrapped around the `period`
+    (such as a diel period), or absolute, in which case times outside the table are clamped to
+    the first or last level. Absolute schedules are useful to drive a model with a measured
+    light record over several days.
+
+    Schedules can be tabulated from a function with :meth:`.from_function`, or loaded from a
+    measured time series with :meth:`.from_csv` or :meth:`.from_hdf`.
+    """
+
+    def __init__(self, times, levels, period = None, scale = 1.0):
+        """
+        Args:
+            times (array, PhysicalField): The times of the levels, assumed in hours if plain
+                numbers. They must be in increasing order.
+
+            levels (array): The surface irradiance levels at the `times`
+
+            period (None, float, PhysicalField): If given, the schedule repeats with this
+                period, assumed in hours if a plain number. The `times` should then span at
+                most one period.
+
+            scale (float): Factor to multiply the levels with (default: 1.0)
+
+        Raises:
+            ValueError: if the times and levels are not 1D arrays of the same length, or if
+                the times are not increasing, or if the `period` is not positive or shorter
+                than the span of the times
+        """
+        self.logger = logging.getLogger(__name__)
+
+        times = PhysicalField(times, 'h')
+        #: the times of the table in hours
+        self.times = numerix.array(times.inUnitsOf('h').value, dtype=float).ravel()
+        #: the surface levels of the table
+        self.levels = numerix.array(levels, dtype=float).ravel() * float(scale)
+
+        if len(self.times) < 2 or self.times.shape != self.levels.shape:
+            raise ValueError('Schedule needs at least two times and levels of same length, '
+                             'not {} and {}'.format(self.times.shape, self.levels.shape))
+
+        if numerix.any(numerix.diff(self.times) <= 0):
+            raise ValueError('Schedule times should be strictly increasing')
+
+        #: the period of the schedule in hours, or None if not cyclic
+        self.period = None
+        if period is not None:
+            period = float(PhysicalField(period, 'h').inUnitsOf('h').value)
+            if period <= 0:
+                raise ValueError('Schedule period should be > 0, not {}'.format(period))
+            # the times are wrapped around the period, so a longer series would mix its periods
+            span = self.times[-1] - self.times[0]
+            if span > period * (1 + 1e-9):
+                raise ValueError('Schedule times span {:.4g}h, which is longer than the period '
+                                 '{:.4g}h'.format(span, period))
+            self.period = period
+
+        self.logger.debug('Created {}'.format(self))
+
+    def __repr__(self):
+        return 'IrradianceSchedule(n={}, t=[{:.3g}, {:.3g}]h, period={})'.format(
+            len(self.times), self.times[0], self.times[-1], self.period)
+
+    @property
+    def cyclic(self):
+        """
+        Returns:
+            bool: True if the schedule repeats with :attr:`.period`
+        """
+        return self.period is not None
+
+    def level(self, clocktime):
+        """
+        Look up the surface level at the given time(s)
+
+        Args:
+            clocktime (float, array, PhysicalField): The time(s), assumed in hours if plain
+                numbers
+
+        Returns:
+            float, :class:`numpy.ndarray`: the interpolated level(s)
+        """
+        if isinstance(clocktime, PhysicalField):
+            clocktime = clocktime.inUnitsOf('h').value
+
+        return numerix.interp(clocktime, self.times, self.levels, period=self.period)
+
+    @classmethod
+    def from_function(cls, func, period, resolution = PhysicalField(1, 'min'), **kwargs):
+        """
+        Tabulate a cyclic schedule from a function over one period
+
+        Args:
+            func (callable): Function that takes an array of times as a :class:`PhysicalField`
+                in hours and returns the levels
+
+            period (float, PhysicalField): The period to tabulate, in hours if a plain number
+
+            resolution (float, PhysicalField): The time between samples, in hours if a plain
+                number (default: 1 min)
+
+            **kwargs: passed to the constructor
+
+        Returns:
+            :class:`IrradianceSchedule`
+        """
+        period = float(PhysicalField(period, 'h').inUnitsOf('h').value)
+        resolution = float(PhysicalField(resolution, 'h').inUnitsOf('h').value)
+        if not (0 < resolution < period):
+            raise ValueError('Resolution {}h should be in (0, {})h'.format(resolution, period))
+
+        N = int(numerix.ceil(period / resolution))
+        times = numerix.linspace(0, period, N, endpoint=False)
+        levels = numerix.array(func(PhysicalField(times, 'h')), dtype=float)
+        return cls(times, levels, period=period, **kwargs)
+
+    @classmethod
+    def from_csv(cls, path, time_column = 0, level_column = 1, time_unit = 'h',
+                 delimiter = ',', **kwargs):
+        """
+        Load a schedule from a measured time series in a delimited text file
+
+        Args:
+            path (str): Path to the file
+
+            time_column (int, str): Index or name (from the header row) of the time column
+
+            level_column (int, str): Index or name of the level column
+
+            time_unit (str): The unit of the time column (default: "h")
+
+            delimiter (str): The column delimiter (default: ",")
+
+            **kwargs: passed to the constructor
+
+        Returns:
+            :class:`IrradianceSchedule`
+        """
+        with open(path) as fp:
+            header = fp.readline().strip().split(delimiter)
+
+        try:
+            [float(h) for h in header]
+            skip = 0
+        except ValueError:
+            skip = 1
+        header = [h.strip() for h in header]
+
+        def column_index(col):
+            if isinstance(col, int):
+                return col
+            try:
+                return header.index(col)
+            except ValueError:
+                raise ValueError('Column {!r} not in {}: {}'.format(col, path, header))
+
+        data = numerix.loadtxt(path, delimiter=delimiter, skiprows=skip, ndmin=2,
+                               usecols=(column_index(time_column), column_index(level_column)))
+        return cls(PhysicalField(data[:, 0], time_unit), data[:, 1], **kwargs)
+
+    @classmethod
+    def from_hdf(cls, path, time_dataset = 'time', level_dataset = 'irradiance', time_unit = None,
+                 **kwargs):
+        """
+        Load a schedule from a measured time series in an HDF file
+
+        Args:
+            path (str): Path to the file
+
+            time_dataset (str): Path to the dataset of times in the file
+
+            level_dataset (str): Path to the dataset of levels in the file
+
+            time_unit (None, str): The unit of the times. If None, then the ``"unit"``
+                attribute of the dataset is used, else hours.
+
+            **kwargs: passed to the constructor
+
+        Returns:
+            :class:`IrradianceSchedule`
+        """
+        with hdf.File(path, 'r') as hf:
+            tds = hf[time_dataset]
+            time_unit = time_unit or tds.attrs.get('unit', 'h')
+            if isinstance(time_unit, bytes):
+                time_unit = time_unit.decode()
+            times = PhysicalField(tds[()], str(time_unit))
+            levels = hf[level_dataset][()]
+        return cls(times, levels, **kwargs)
+
+    @classmethod
+    def from_file(cls, path, **kwargs):
+        """
+        Load a schedule from a CSV or HDF file, based on the file extension
+
+        Args:
+            path (str): Path to the file. Files with extensions ``.h5``, ``.hdf`` or ``.hdf5``
+                are read with :meth:`.from_hdf`, others with :meth:`.from_csv`.
+
+            **kwargs: passed to the loader
+
+        Returns:
+            :class:`IrradianceSchedule`
+        """
+        ext = os.path.splitext(path)[1].lower()
+        if ext in ('.h5', '.hdf', '.hdf5'):
+            return cls.from_hdf(path, **kwargs)
+        else:
+            return cls.from_csv(path, **kwargs)
@@ -305,7 +305,8 @@ class ModelVariable(DomainEntity):
                   `scale` values
 
             * "linear"
-                * uses :func:`~numpy.linspace` to fill the first dimension of :attr:`.var`
+                * uses :func:`~numpy.linspace` to fill the first dimension of :attr:`.var`, or
+                  interpolates linearly over the depths if the domain mesh is not uniform
                 * `start`: the start value given, else taken from constraint "top"
                 * `stop`: the stop value given, else taken from constraint "bottom"
 
@@ -445,7 +446,12 @@ class ModelVariable(DomainEntity):
             self.logger.info(
                 'Seeding with profile linear: start: {} stop: {}'.format(start_, stop_))
 
-            val = numerix.linspace(start_, stop_, N)
+            if getattr(self.domain, 'uniform', True):
+                val = numerix.linspace(start_, stop_, N)
+            else:
+                # linear in depth, for meshes with cells of different sizes
+                depths = self.domain.depths.numericValue
+                val = start_ + (stop_ - start_) * (depths - depths[0]) / (depths[-1] - depths[0])
             self.var.value = val
 
         self.logger.debug('Seeded {!r} with {} profile'.format(self, profile))
@@ -1,4 +1,11 @@
-from .base import ModelData
-from .hdfstore import HDFModelData
-from .snapshot import SnapshotModelData
-from .plotter import ModelPlotter
+from ..utils.lazy_import import lazy_attributes
+
+#: the public attributes, imported from their modules on first access
+ATTRIBUTES = {
+    'ModelData': '.base',
+    'HDFModelData': '.hdfstore',
+    'SnapshotModelData': '.snapshot',
+    'ModelPlotter': '.plotter',
+    }
+
+lazy_attributes(__name__, ATTRIBUTES)
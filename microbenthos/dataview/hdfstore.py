@@ -34,6 +34,9 @@ class HDFModelData(ModelData):
 
         If `tidx` is `None`, then no slicing of the dataset is done
 
+        Raises:
+            ValueError: if the dataset has variable-length rows, as saved when the simulation
+                remeshes the model, since the profiles are read on a fixed mesh
         """
         path = path.replace('.', '/')
 
@@ -43,6 +46,10 @@ class HDFModelData(ModelData):
         ds.id.refresh()
 
         self.logger.debug('Found {}: {}'.format(path, ds))
+        vlen = hdf.check_dtype(vlen=ds.dtype)
+        if vlen is not None and vlen not in (str, bytes):
+            raise ValueError('Data in {} has variable-length profiles of a remeshed model, which '
+                             'is not supported'.format(path))
         ds_unit = str(ds.attrs['unit'].decode('utf-8'))
         if tidx is None:
             return PhysicalField(ds, ds_unit)
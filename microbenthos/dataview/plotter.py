@@ -468,8 +468,10 @@ class ModelPlotter(object):
             tidx (int): The time index
 
         """
-        self.logger.info(
-            'Updating artist_paths for time step #{}'.format(tidx))
+        debug = self.logger.isEnabledFor(logging.DEBUG)
+        info = self.logger.isEnabledFor(logging.INFO)
+        if info:
+            self.logger.info('Updating artist_paths for time step #{}'.format(tidx))
 
         clocktime = self.model.times[tidx]
         dt = int(np.ceil((clocktime - self._clock).numericValue))
@@ -478,7 +480,8 @@ class ModelPlotter(object):
         self._clock = clocktime
 
         self.clock_artist.set_text(hmstr)
-        self.logger.debug('Time: {}'.format(hmstr))
+        if debug:
+            self.logger.debug('Time: {}'.format(hmstr))
 
         # self.axes_all
         # all_depth_axes = itertools.chain(self.axes_depth, self.axes_depth_linked.values())
@@ -487,14 +490,15 @@ class ModelPlotter(object):
         for artist, dpath in self.artist_paths.items():
 
             ax = artist.axes
-            self.logger.info('Updating {} artist {} from {}'.format(ax.name, artist, dpath))
+            if info:
+                self.logger.info('Updating {} artist {} from {}'.format(ax.name, artist, dpath))
 
             # get the data
             data = self.model.get_data(dpath, tidx=tidx)
             data_unit = data.unit.name()
-            self.logger.debug('Got data {} {} of unit: {!r}'.format(data.__class__.__name__,
-                                                                    data.shape,
-                                                                    data_unit))
+            if debug:
+                self.logger.debug('Got data {} {} of unit: {!r}'.format(
+                    data.__class__.__name__, data.shape, data_unit))
 
             # cast to units
             if not getattr(ax, 'data_unit_', None):
@@ -506,7 +510,9 @@ class ModelPlotter(object):
 
             try:
                 D = data.inUnitsOf(ax_unit).value
-                self.logger.debug('Got data {} dtype {} --> {}'.format(D.dtype, D.min(), D.max()))
+                if debug:
+                    self.logger.debug('Got data {} dtype {} --> {}'.format(
+                        D.dtype, D.min(), D.max()))
 
             except TypeError:
                 self.logger.error("Error casting {} units from {} to {}".format(
@@ -541,8 +547,9 @@ class ModelPlotter(object):
 
                 D = D / Drange
 
-                self.logger.info('Normalized {} data by {:.3g}: {:.3g} --> {:.3g}'.format(
-                    label_base, Drange, D.min(), D.max()))
+                if info:
+                    self.logger.info('Normalized {} data by {:.3g}: {:.3g} --> {:.3g}'.format(
+                        label_base, Drange, D.min(), D.max()))
 
                 label = label_base + flabel(Drange)
 
@@ -568,7 +575,8 @@ class ModelPlotter(object):
                 artist.set_ydata(np.append(ydata, D))
                 artist.set_label(label + ' {}'.format(ax.data_unit_))
 
-            self.logger.debug('{} updated'.format(artist))
+            if debug:
+                self.logger.debug('{} updated'.format(artist))
 
         self.update_legends()
 
@@ -1,4 +1,15 @@
-from .exporter import BaseExporter
-from .graphic import GraphicExporter
-from .model_data import ModelDataExporter
-from .progress import ProgressExporter
+from ..utils.lazy_import import lazy_attributes
+
+#: the public attributes, imported from their modules on first access
+ATTRIBUTES = {
+    'BaseExporter': '.exporter',
+    'GraphicExporter': '.graphic',
+    'MetricsExporter': '.metrics',
+    'read_metrics': '.metrics',
+    'ModelDataExporter': '.model_data',
+    'ProgressExporter': '.progress',
+    'SharedMemoryExporter': '.sharedmem',
+    'TelemetryExporter': '.telemetry',
+    }
+
+lazy_attributes(__name__, ATTRIBUTES)
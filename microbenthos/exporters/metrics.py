@@ -0,0 +1,207 @@
+import json
+import logging
+import os
+
+import numpy as np
+from fipy import PhysicalField
+
+from .exporter import BaseExporter
+from ._output_dir_mixin import OutputDirMixin
+
+#: magic string at the start of the header line of a metrics file
+MAGIC = 'microbenthos-metrics'
+
+
+def _rss_reader():
+    """
+    Return a function for the resident memory (RSS) of the process in bytes. The current RSS is
+    read from ``/proc/self/statm`` where available, or else the peak RSS from
+    :func:`resource.getrusage`. If neither is available, the function returns NaN.
+    """
+    if os.path.exists('/proc/self/statm'):
+        page_size = os.sysconf('SC_PAGE_SIZE')
+
+        def read():
+            with open('/proc/self/statm') as fp:
+                return float(fp.read().split()[1]) * page_size
+
+        return read
+
+    try:
+        import resource
+        import sys
+    except ImportError:
+        return lambda: float('nan')
+
+    # ru_maxrss is in kilobytes on linux and in bytes on mac
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return lambda: float(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale)
+
+
+def read_metrics(path):
+    """
+    Read a metrics file written by the :class:`MetricsExporter`
+
+    Args:
+        path (str): path to the metrics file
+
+    Returns:
+        dict: mapping of the column names to :class:`numpy.ndarray`. An incomplete last record,
+        as from an interrupted run, is dropped.
+
+    Raises:
+        ValueError: if the file is not a metrics file
+    """
+    with open(path, 'rb') as fp:
+        header = json.loads(fp.readline().decode('utf-8'))
+        if header.get('magic') != MAGIC:
+            raise ValueError('{} is not a metrics file'.format(path))
+        dtype = np.dtype([(str(name), str(code)) for name, code in header['columns']])
+        raw = fp.read()
+
+    count = len(raw) // dtype.itemsize
+    records = np.frombuffer(raw[:count * dtype.itemsize], dtype=dtype)
+    return dict((name, records[name].copy()) for name in dtype.names)
+
+
+class MetricsExporter(OutputDirMixin, BaseExporter):
+    """
+    An exporter that appends the metrics of every simulation step to a binary record file,
+    without the model snapshot.
+
+    Each record holds the step number, the model clock (in seconds), the simulation metrics
+    (`dt`, `calc_time`, `residual`, `num_sweeps` and `cycle_residual`), the resident memory of
+    the process, and the time spent in each of the :attr:`.PHASES` of the
+    :attr:`.Simulation.timer` since the previous record (in ms). The `dt` is the time step
+    used in the step, as given by :meth:`.Simulation.get_state`.
+
+    The file starts with a JSON header line that describes the columns, followed by the
+    fixed-size records, so that writing a step is a single small write and the file can be
+    read while the simulation runs. Use :func:`read_metrics` to load it into arrays.
+    """
+    _exports_ = 'metrics'
+    __version__ = '1.0'
+    is_eager = True
+
+    #: the phases of the :class:`~microbenthos.utils.timing.PhaseTimer` that are recorded
+    PHASES = ('sweep.assemble', 'sweep.solve', 'update_vars', 'update_equations', 'clock',
+              'snapshot', 'remesh')
+
+    def __init__(self, filename = 'metrics.bin', flush_every = 100, **kwargs):
+        """
+        Args:
+            filename (str): name of the metrics file in the output directory
+            flush_every (int): the number of records after which the file is flushed
+        """
+        self.logger = kwargs.get('logger') or logging.getLogger(__name__)
+        self.logger.debug('Init in {}'.format(self.__class__.__name__))
+        kwargs['logger'] = self.logger
+        super(MetricsExporter, self).__init__(**kwargs)
+
+        self._filename = str(filename)
+        self.flush_every = max(1, int(flush_every))
+
+        columns = [('step', 'i8'), ('clock', 'f8'), ('dt', 'f8'), ('calc_time', 'f8'),
+                   ('residual', 'f8'), ('num_sweeps', 'i4'), ('cycle_residual', 'f8'),
+                   ('rss', 'f8')]
+        columns.extend(('phase.' + p, 'f8') for p in self.PHASES)
+        #: the column names and numpy type codes of the records
+        self.columns = columns
+        self.dtype = np.dtype([(str(name), code) for name, code in columns])
+
+        self._fp = None
+        self._record = np.zeros(1, dtype=self.dtype)
+        self._unflushed = 0
+        self._time_scales = {}
+        self._prev_phases = None
+        self._rss = _rss_reader()
+
+    @property
+    def outpath(self):
+        return os.path.join(self.output_dir, self._filename)
+
+    def header(self):
+        """
+        Returns:
+            bytes: the header line of the metrics file
+        """
+        header = dict(magic=MAGIC, version=self.__version__, columns=self.columns)
+        return (json.dumps(header) + '\n').encode('utf-8')
+
+    def prepare(self, state):
+        """
+        Open the metrics file for appending, and write the header if the file is new
+
+        Raises:
+            ValueError: if the file exists with different columns
+        """
+        self.output_dir = self.runner.output_dir
+
+        header = self.header()
+        if os.path.exists(self.outpath) and os.path.getsize(self.outpath):
+            with open(self.outpath, 'rb') as fp:
+                existing = fp.readline()
+            if json.loads(existing.decode('utf-8')).get('columns') != \
+                json.loads(header.decode('utf-8'))['columns']:
+                raise ValueError('Metrics file {} has different columns'.format(self.outpath))
+            self._fp = open(self.outpath, 'ab')
+        else:
+            self._fp = open(self.outpath, 'wb')
+            self._fp.write(header)
+
+        self._prev_phases = self._phase_totals()
+        self.logger.debug('Writing metrics to {}'.format(self.outpath))
+
+    def _phase_totals(self):
+        timer = getattr(self.sim, 'timer', None)
+        if timer is None:
+            return [0.0] * len(self.PHASES)
+        return [timer.total(p) for p in self.PHASES]
+
+    def _seconds(self, time, unit):
+        scale = self._time_scales.get(unit)
+        if scale is None:
+            scale = self._time_scales[unit] = float(PhysicalField(1, unit).inUnitsOf('s').value)
+        return float(time) * scale
+
+    def process(self, num, state):
+        """
+        Append a record of the metrics in the `state`
+        """
+        time, tmeta = state['time']['data']
+        clock = self._seconds(time, tmeta['unit'])
+        metrics = state.get('metrics', {})
+
+        def metric(name, default):
+            entry = metrics.get(name)
+            value = entry['data'][0] if entry else None
+            return default if value is None else value
+
+        record = self._record[0]
+        record['step'] = num
+        record['clock'] = clock
+        record['dt'] = metric('dt', np.nan)
+        record['calc_time'] = metric('calc_time', np.nan)
+        record['residual'] = metric('residual', np.nan)
+        record['num_sweeps'] = metric('num_sweeps', -1)
+        record['cycle_residual'] = metric('cycle_residual', np.nan)
+        record['rss'] = self._rss()
+
+        totals = self._phase_totals()
+        for phase, total, prev in zip(self.PHASES, totals, self._prev_phases):
+            record['phase.' + phase] = 1000.0 * (total - prev)
+        self._prev_phases = totals
+
+        self._fp.write(self._record.tobytes())
+        self._unflushed += 1
+        if self._unflushed >= self.flush_every:
+            self._fp.flush()
+            self._unflushed = 0
+
+    def finish(self):
+        """
+        Close the metrics file
+        """
+        if self._fp is not None:
+            self._fp.close()
+            self._fp = None
@@ -20,6 +20,7 @@ class ModelDataExporter(OutputDirMixin, BaseExporter):
     def __init__(self, overwrite = False,
                  filename = 'simulation_data.h5',
                  compression = 6,
+                 variable_length = None,
                  **kwargs):
         self.logger = kwargs.get('logger') or logging.getLogger(__name__)
         self.logger.debug('Init in {}'.format(self.__class__.__name__))
@@ -30,6 +31,10 @@ class ModelDataExporter(OutputDirMixin, BaseExporter):
         self._filename = str(filename)
         self._compression = int(compression)
         assert 0 <= self._compression <= 9
+        #: whether profiles are saved as variable-length rows. If None, then this is set in
+        #: :meth:`.prepare` from whether the domain depths are a time series in the state,
+        #: as when the simulation remeshes the model.
+        self.variable_length = variable_length
 
     @property
     def outpath(self):
@@ -51,6 +56,11 @@ class ModelDataExporter(OutputDirMixin, BaseExporter):
 
         self.output_dir = self.runner.output_dir
 
+        if self.variable_length is None:
+            depths = state.get('domain', {}).get('depths', {})
+            self.variable_length = 'data' in depths
+            self.logger.debug('Variable length profiles: {}'.format(self.variable_length))
+
         # if no file exists, then save the first state
         exists = os.path.exists(self.outpath)
 
@@ -59,7 +69,8 @@ class ModelDataExporter(OutputDirMixin, BaseExporter):
 
         if not exists:
             save_snapshot(self.outpath, snapshot=state,
-                          compression=self._compression)
+                          compression=self._compression,
+                          variable_length=self.variable_length)
 
         self.logger.debug('Preparation done')
 
@@ -70,5 +81,6 @@ class ModelDataExporter(OutputDirMixin, BaseExporter):
         """
         self.logger.debug('Processing export data for step #{}'.format(num))
         save_snapshot(self.outpath, snapshot=state,
-                      compression=self._compression)
+                      compression=self._compression,
+                      variable_length=bool(self.variable_length))
         self.logger.debug('Export data processed')
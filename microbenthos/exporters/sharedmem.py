@@ -0,0 +1,496 @@
+"""
+An exporter that hands the model snapshots to other exporters running in a separate process,
+with the arrays passed through shared memory instead of being pickled over a pipe.
+
+The arrays of a snapshot are copied into a slot of a ring buffer in
+:class:`multiprocessing.shared_memory.SharedMemory`, laid out by a fixed index of their paths
+(:class:`SnapshotLayout`). Only small headers, with the slot, step and model clock, travel over
+a queue to the consumer process, where :class:`SnapshotRing` presents the slot as a snapshot
+dict of array views for the exporters and :class:`~microbenthos.dataview.SnapshotModelData`,
+without copying. This requires python 3.8+.
+"""
+
+import copy
+import logging
+import multiprocessing
+from numbers import Number
+
+import numpy as np
+
+from .exporter import BaseExporter
+from ._output_dir_mixin import OutputDirMixin
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:  # python < 3.8
+    shared_memory = None
+
+#: the keys of a snapshot node that hold a ``(value, metadata)`` tuple
+DATA_KEYS = ('data', 'data_static')
+
+
+def _is_numeric(value):
+    if isinstance(value, np.ndarray):
+        return value.dtype.kind in 'biuf'
+    return isinstance(value, (Number, np.number)) and not isinstance(value, complex)
+
+
+def _data_nodes(state, path = ()):
+    """
+    Generate the numeric data in a snapshot as tuples of ``(path, key, value)``, in the order of
+    the sorted keys
+    """
+    for key in sorted(state):
+        node = state[key]
+        if not isinstance(node, dict):
+            continue
+        for dkey in DATA_KEYS:
+            entry = node.get(dkey)
+            if isinstance(entry, tuple) and entry and _is_numeric(entry[0]):
+                yield path + (key,), dkey, entry[0]
+        for item in _data_nodes(node, path + (key,)):
+            yield item
+
+
+def _skeleton(state):
+    """
+    Copy the snapshot without the numeric data values, which are set to None
+    """
+    skeleton = {}
+    for key, node in state.items():
+        if not isinstance(node, dict):
+            skeleton[key] = copy.deepcopy(node)
+            continue
+        node = _skeleton(node)
+        for dkey in DATA_KEYS:
+            entry = node.get(dkey)
+            if isinstance(entry, tuple) and entry and _is_numeric(entry[0]):
+                node[dkey] = (None,) + entry[1:]
+        skeleton[key] = node
+    return skeleton
+
+
+def _attach(name):
+    """
+    Attach to a shared memory block without registering it with the resource tracker, which
+    would unlink it when the reader exits
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:  # python < 3.13
+        shm = shared_memory.SharedMemory(name=name)
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, 'shared_memory')
+        return shm
+
+
+class SnapshotLayout(object):
+    """
+    The fixed layout of the numeric data of a model snapshot in a flat buffer.
+
+    Each array in a ``data`` or ``data_static`` tuple of the snapshot is given an offset in the
+    buffer, in the order of the sorted paths. The rest of the snapshot, such as the metadata,
+    is kept in :attr:`.skeleton` and sent to the reader once, so it should not change between
+    the snapshots. Scalars, such as the time and metrics, are stored as 0-d arrays and read
+    back as python numbers.
+    """
+
+    #: the alignment in bytes of the arrays in the buffer
+    ALIGN = 64
+
+    def __init__(self, state):
+        """
+        Args:
+            state (dict): a model snapshot
+        """
+        entries = []
+        offset = 0
+        for path, key, value in _data_nodes(state):
+            value = np.asarray(value)
+            entries.append((path, key, value.shape, value.dtype.str, offset))
+            offset += -(-value.nbytes // self.ALIGN) * self.ALIGN
+
+        #: list of ``(path, key, shape, dtype, offset)`` of the arrays
+        self.entries = entries
+        #: the size in bytes of a snapshot in the buffer
+        self.nbytes = max(offset, self.ALIGN)
+        #: the snapshot without the numeric data
+        self.skeleton = _skeleton(state)
+
+    def __repr__(self):
+        return 'SnapshotLayout({} arrays, {} bytes)'.format(len(self.entries), self.nbytes)
+
+    def fits(self, state):
+        """
+        Check that the arrays in a snapshot have the paths, shapes and types of this layout,
+        such as after a remesh of the domain.
+
+        Args:
+            state (dict): a model snapshot
+
+        Returns:
+            bool: True if the snapshot can be written with this layout
+        """
+        entries = iter(self.entries)
+        for path, key, value in _data_nodes(state):
+            entry = next(entries, None)
+            if entry is None:
+                return False
+            value = np.asarray(value)
+            if entry[:4] != (path, key, value.shape, value.dtype.str):
+                return False
+        return next(entries, None) is None
+
+    def arrays(self, buf, offset = 0):
+        """
+        Create the array views of the layout into a buffer
+
+        Args:
+            buf (buffer): the buffer, such as :attr:`SharedMemory.buf`
+            offset (int): the offset of the snapshot in the buffer
+
+        Returns:
+            list: the :class:`numpy.ndarray` views in the order of :attr:`.entries`
+        """
+        return [np.ndarray(shape, dtype=dtype, buffer=buf, offset=offset + off)
+                for path, key, shape, dtype, off in self.entries]
+
+    def build(self, arrays):
+        """
+        Create a snapshot from the skeleton with the given arrays
+
+        Args:
+            arrays (list): the arrays in the order of :attr:`.entries`
+
+        Returns:
+            dict: the model snapshot
+        """
+        state = copy.deepcopy(self.skeleton)
+        for (path, key, shape, dtype, off), array in zip(self.entries, arrays):
+            node = state
+            for part in path:
+                node = node[part]
+            value = array.item() if not shape else array
+            node[key] = (value,) + node[key][1:]
+        return state
+
+
+class SnapshotRing(object):
+    """
+    A ring buffer of model snapshots in shared memory, with :attr:`.slots` snapshots of the
+    :class:`SnapshotLayout`.
+
+    The writer creates the ring and the reader attaches to it by :attr:`.name`. The ring does
+    not track which slots are in use, which is left to the caller.
+    """
+
+    def __init__(self, layout, slots, name = None):
+        """
+        Args:
+            layout (:class:`SnapshotLayout`): the layout of the snapshots
+            slots (int): the number of snapshots in the ring
+            name (None, str): the name of the shared memory to attach to. If None, it is
+                created.
+
+        Raises:
+            ImportError: if :mod:`multiprocessing.shared_memory` is not available
+        """
+        if shared_memory is None:
+            raise ImportError('Shared memory snapshots require python 3.8+')
+
+        self.logger = logging.getLogger(__name__)
+        self.layout = layout
+        self.slots = int(slots)
+        self.owner = name is None
+
+        if self.owner:
+            self._shm = shared_memory.SharedMemory(create=True, size=layout.nbytes * self.slots)
+        else:
+            self._shm = _attach(name)
+        self._name = self._shm.name
+        self._arrays = [layout.arrays(self._shm.buf, layout.nbytes * i)
+                        for i in range(self.slots)]
+
+    def __repr__(self):
+        return 'SnapshotRing({}, slots={})'.format(self._name, self.slots)
+
+    @property
+    def name(self):
+        """
+        The name of the shared memory block
+        """
+        return self._name
+
+    def write(self, slot, state):
+        """
+        Copy the arrays of a snapshot into a slot
+
+        Args:
+            slot (int): the slot number
+            state (dict): a model snapshot that :meth:`SnapshotLayout.fits`
+        """
+        for array, (path, key, value) in zip(self._arrays[slot], _data_nodes(state)):
+            array[...] = value
+
+    def read(self, slot):
+        """
+        Create a snapshot with views of the arrays in a slot. The views are valid until the
+        slot is written again.
+
+        Args:
+            slot (int): the slot number
+
+        Returns:
+            dict: the model snapshot
+        """
+        return self.layout.build(self._arrays[slot])
+
+    def close(self, unlink = None):
+        """
+        Close the shared memory, and unlink it if this is the owner
+
+        Args:
+            unlink (None, bool): whether to unlink the shared memory. If None, it is unlinked
+                if the ring was created here.
+        """
+        if self._shm is None:
+            return
+        self._arrays = None
+        try:
+            self._shm.close()
+        except BufferError:
+            # views of the slots are still held, so the mapping is left to the garbage collector
+            self.logger.debug('Views still held on {}'.format(self))
+        if self.owner if unlink is None else unlink:
+            self._shm.unlink()
+        self._shm = None
+
+
+class _ConsumerRunner(object):
+    """
+    Stand-in for the runner of the exporters in the consumer process
+    """
+
+    def __init__(self, output_dir):
+        self.output_dir = output_dir
+        self.simulation = None
+
+
+def consume_snapshots(queue, free_slots, exporters, output_dir = '.'):
+    """
+    Run exporters on the snapshots in a :class:`SnapshotRing`, as the target of the consumer
+    process of the :class:`SharedMemoryExporter`.
+
+    The headers on the `queue` are tuples of:
+
+        * ``('layout', name, layout, slots)``: attach to a new ring
+        * ``('setup', slot, step, clock)``: set up the exporters with the snapshot in the slot
+        * ``('process', slot, step, clock)``: process the snapshot in the slot
+        * ``('close',)``: close the exporters and return
+
+    The slot is released on `free_slots` after the exporters are done with it.
+
+    Args:
+        queue (:class:`multiprocessing.Queue`): the queue of headers
+        free_slots (:class:`multiprocessing.Semaphore`): the semaphore of the free slots
+        exporters (list): the exporter definitions, as dicts with the `exptype`, optional
+            `name` and the init arguments of the exporter class
+        output_dir (str): the output directory of the exporters
+    """
+    from ..utils import find_subclasses_recursive
+    from ..utils.lazy_import import import_all
+
+    logger = logging.getLogger(__name__)
+
+    import_all('microbenthos.exporters')
+    classes = {c._exports_: c for c in find_subclasses_recursive(BaseExporter)}
+
+    runner = _ConsumerRunner(output_dir)
+    instances = []
+    for expdef in exporters:
+        expdef = dict(expdef)
+        exptype = expdef.pop('exptype')
+        expdef.setdefault('name', exptype)
+        expdef.setdefault('output_dir', output_dir)
+        instances.append(classes[exptype](**expdef))
+
+    ring = None
+    try:
+        while True:
+            header = queue.get()
+            kind = header[0]
+
+            if kind == 'close':
+                break
+
+            elif kind == 'layout':
+                if ring is not None:
+                    ring.close()
+                ring = SnapshotRing(header[2], header[3], name=header[1])
+                logger.debug('Attached to {}'.format(ring))
+
+            else:
+                slot, step, clock = header[1:]
+                state = ring.read(slot)
+                try:
+                    for exp in instances:
+                        if kind == 'setup':
+                            exp.setup(runner, state)
+                        else:
+                            exp.process(step, state)
+                finally:
+                    del state
+                    free_slots.release()
+
+    finally:
+        for exp in instances:
+            if exp.started:
+                exp.close()
+        if ring is not None:
+            ring.close()
+
+
+class SharedMemoryExporter(OutputDirMixin, BaseExporter):
+    """
+    An exporter that runs other exporters, such as the ``graphic`` and ``model_data``
+    exporters, in a separate process, so that the rendering and writing of the snapshots
+    overlaps with the solver.
+
+    The snapshots are written into a ring of :attr:`.slots` in shared memory, and the consumer
+    process (see :func:`consume_snapshots`) reads them in place. When all the slots are in use,
+    :meth:`.process` waits for the consumer to free one, so the consumer can fall behind by at
+    most that many snapshots. If the arrays of a snapshot change shape, as after a remesh, a
+    new ring is created.
+
+    The exporters of the consumer only get the snapshots, and not the simulation of the runner.
+    """
+    _exports_ = 'shared_memory'
+    __version__ = '1.0'
+
+    def __init__(self, exporters = (), slots = 4, start_method = None, timeout = 300,
+                 **kwargs):
+        """
+        Args:
+            exporters (list): the definitions of the exporters to run in the consumer process,
+                as dicts with the `exptype`, an optional `name` and the init arguments of the
+                exporter class
+            slots (int): the number of snapshots in the ring buffer
+            start_method (None, str): the :mod:`multiprocessing` start method of the consumer
+                process. If None, the platform default is used.
+            timeout (float): the seconds to wait for a free slot before checking that the
+                consumer process is alive
+
+        Raises:
+            ImportError: if :mod:`multiprocessing.shared_memory` is not available
+            ValueError: if an exporter definition has no `exptype`
+        """
+        self.logger = kwargs.get('logger') or logging.getLogger(__name__)
+        self.logger.debug('Init in {}'.format(self.__class__.__name__))
+        kwargs['logger'] = self.logger
+        super(SharedMemoryExporter, self).__init__(**kwargs)
+
+        if shared_memory is None:
+            raise ImportError('{} requires python 3.8+'.format(self.__class__.__name__))
+
+        self.exporters = [dict(e) for e in exporters]
+        for expdef in self.exporters:
+            if 'exptype' not in expdef:
+                raise ValueError('Exporter definition {} has no exptype'.format(expdef))
+
+        self.slots = max(1, int(slots))
+        self.timeout = float(timeout)
+        self._context = multiprocessing.get_context(start_method)
+
+        self.layout = None
+        self.ring = None
+        self.consumer = None
+        self._queue = None
+        self._free_slots = None
+        self._next_slot = 0
+
+    def get_info(self):
+        info = super(SharedMemoryExporter, self).get_info()
+        info['exporters'] = [e['exptype'] for e in getattr(self, 'exporters', ())]
+        return info
+
+    def prepare(self, state):
+        """
+        Start the consumer process and send it the first snapshot to set up the exporters
+        """
+        self.output_dir = self.runner.output_dir
+
+        self._queue = self._context.Queue()
+        self._free_slots = self._context.Semaphore(self.slots)
+        self.consumer = self._context.Process(
+            target=consume_snapshots,
+            args=(self._queue, self._free_slots, self.exporters, self.output_dir),
+            name='microbenthos-{}'.format(self.name),
+            )
+        self.consumer.daemon = True
+        self.consumer.start()
+        self.logger.debug('Started consumer process {}'.format(self.consumer.pid))
+
+        self._send('setup', 0, state)
+
+    def process(self, num, state):
+        """
+        Write the snapshot into a free slot and send its header to the consumer
+        """
+        self._send('process', num, state)
+
+    def _acquire_slot(self):
+        while not self._free_slots.acquire(timeout=self.timeout):
+            if not self.consumer.is_alive():
+                raise RuntimeError('Consumer process of {} exited with code {}'.format(
+                    self, self.consumer.exitcode))
+            self.logger.warning('Waiting for a free slot in {}'.format(self.ring))
+
+    def _relayout(self, state):
+        # wait for the consumer to be done with all the slots of the old ring
+        if self.ring is not None:
+            for _ in range(self.slots):
+                self._acquire_slot()
+
+        old = self.ring
+        self.layout = SnapshotLayout(state)
+        self.ring = SnapshotRing(self.layout, self.slots)
+        self._next_slot = 0
+        self._queue.put(('layout', self.ring.name, self.layout, self.slots))
+        self.logger.debug('Created {} with {}'.format(self.ring, self.layout))
+
+        if old is not None:
+            old.close()
+            for _ in range(self.slots):
+                self._free_slots.release()
+
+    def _send(self, kind, num, state):
+        if self.layout is None or not self.layout.fits(state):
+            self._relayout(state)
+
+        self._acquire_slot()
+        slot = self._next_slot
+        self._next_slot = (slot + 1) % self.slots
+        self.ring.write(slot, state)
+
+        time, tmeta = state['time']['data']
+        self._queue.put((kind, slot, num, (float(time), tmeta['unit'])))
+
+    def finish(self):
+        """
+        Close the consumer process and the shared memory
+        """
+        if self.consumer is None:
+            return
+
+        if self.consumer.is_alive():
+            self._queue.put(('close',))
+        self.consumer.join()
+        if self.consumer.exitcode:
+            self.logger.error('Consumer process of {} exited with code {}'.format(
+                self, self.consumer.exitcode))
+
+        self._queue.close()
+        self._queue.join_thread()
+        if self.ring is not None:
+            self.ring.close()
+        self.ring = self.layout = self.consumer = None
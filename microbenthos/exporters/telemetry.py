@@ -0,0 +1,336 @@
+"""
+An exporter that serves the telemetry of a running simulation over HTTP, so that schedulers
+and dashboards can poll many runs without reading their output files.
+"""
+
+import json
+import logging
+import os
+import socket
+import threading
+from collections import deque
+from timeit import default_timer
+
+import numpy as np
+from fipy import PhysicalField, Variable
+
+from .exporter import BaseExporter
+from ._output_dir_mixin import OutputDirMixin
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn, UnixStreamServer
+except ImportError:  # python 2
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn, UnixStreamServer
+
+
+def copy_arrays(obj):
+    """
+    Copy the arrays of a model snapshot, so that the copy does not change with the model.
+    Physical quantities and variables are converted to arrays of their values.
+    """
+    if isinstance(obj, (PhysicalField, Variable)):
+        return copy_arrays(obj.value)
+    if isinstance(obj, dict):
+        return dict((k, copy_arrays(v)) for k, v in obj.items())
+    if isinstance(obj, (list, tuple)):
+        return type(obj)(copy_arrays(v) for v in obj)
+    if isinstance(obj, np.ndarray):
+        return obj.copy()
+    return obj
+
+
+def jsonable(obj):
+    """
+    Convert a model snapshot into objects that can be serialized to JSON, with arrays as lists.
+    Physical quantities and variables are converted to their values, without the units.
+    """
+    if isinstance(obj, (PhysicalField, Variable)):
+        return jsonable(obj.value)
+    if isinstance(obj, dict):
+        return dict((str(k), jsonable(v)) for k, v in obj.items())
+    if isinstance(obj, (list, tuple)):
+        return [jsonable(v) for v in obj]
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, bytes):
+        return obj.decode('utf-8')
+    return obj
+
+
+class _TelemetryServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class _UnixTelemetryServer(ThreadingMixIn, UnixStreamServer):
+    daemon_threads = True
+
+
+class _TelemetryHandler(BaseHTTPRequestHandler):
+    """
+    Request handler that delegates the responses to the :class:`TelemetryExporter` set on the
+    server
+    """
+
+    def do_GET(self):
+        exporter = self.server.exporter
+        path = self.path.split('?', 1)[0].rstrip('/') or '/'
+        try:
+            if path == '/metrics':
+                body = exporter.render_metrics()
+                ctype = 'text/plain; version=0.0.4; charset=utf-8'
+            elif path == '/state':
+                body = exporter.render_state()
+                ctype = 'application/json'
+            elif path == '/':
+                body = exporter.render_info()
+                ctype = 'application/json'
+            else:
+                self.send_error(404)
+                return
+        except Exception:
+            exporter.logger.error('Error serving {}'.format(path), exc_info=True)
+            self.send_error(500)
+            return
+
+        body = body.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', ctype)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self):
+        # unix sockets have no client address
+        return str(self.client_address[0]) if self.client_address else 'local'
+
+    def log_message(self, format, *args):
+        self.server.exporter.logger.debug('HTTP: ' + format % args)
+
+
+class TelemetryExporter(OutputDirMixin, BaseExporter):
+    """
+    An exporter that serves the live telemetry of the simulation over HTTP, on a local TCP port
+    or a unix socket. The endpoints are:
+
+        * ``/metrics``: the run metrics in the Prometheus text format, such as the steps, the
+          steps per second, the sweeps, residual and time step of the last step, and the
+          durations of the exporters
+        * ``/state``: the latest model snapshot as JSON, with the profiles as lists
+        * ``/``: info about the run as JSON
+
+    The requests are served from a background thread. In :meth:`.process` the exporter only
+    stores the numbers and a copy of the arrays of the snapshot (see :func:`copy_arrays`),
+    since the arrays of the state may be updated in place by the solver. The responses are
+    converted and rendered in the server thread, so the solver is not held up by the
+    polling.
+
+    The address of the server is written to the file ``telemetry.addr`` in the output
+    directory, which is useful with ``port=0`` to bind any free port.
+    """
+    _exports_ = 'telemetry'
+    __version__ = '1.0'
+    is_eager = True
+
+    #: name of the file in the output directory with the address of the server
+    ADDRESS_FILE = 'telemetry.addr'
+
+    def __init__(self, host = '127.0.0.1', port = 0, socket_path = None, rate_window = 50,
+                 **kwargs):
+        """
+        Args:
+            host (str): the host address to bind
+            port (int): the TCP port to bind. If 0, any free port is used.
+            socket_path (None, str): path of a unix socket to serve on, instead of the TCP
+                port. A relative path is in the output directory.
+            rate_window (int): the number of recent steps to compute the steps per second over
+        """
+        self.logger = kwargs.get('logger') or logging.getLogger(__name__)
+        self.logger.debug('Init in {}'.format(self.__class__.__name__))
+        kwargs['logger'] = self.logger
+        super(TelemetryExporter, self).__init__(**kwargs)
+
+        self.host = str(host)
+        self.port = int(port)
+        self.socket_path = socket_path
+        #: the address the server is bound to, once started
+        self.address = None
+
+        self._server = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self._step_times = deque(maxlen=max(2, int(rate_window)))
+        self._time_scales = {}
+        self._metrics = {}
+        self._exports = {}
+        self._state = None
+        self._state_step = None
+
+    @property
+    def address_path(self):
+        return os.path.join(self.output_dir, self.ADDRESS_FILE)
+
+    def prepare(self, state):
+        """
+        Start the HTTP server in a background thread and write its address
+        """
+        self.output_dir = self.runner.output_dir
+
+        if self.socket_path:
+            path = os.path.join(self.output_dir, self.socket_path)
+            if os.path.exists(path):
+                os.remove(path)
+            self._server = _UnixTelemetryServer(path, _TelemetryHandler)
+            self.address = 'unix:{}'.format(os.path.abspath(path))
+        else:
+            self._server = _TelemetryServer((self.host, self.port), _TelemetryHandler)
+            host, port = self._server.server_address[:2]
+            self.address = 'http://{}:{}'.format(host, port)
+
+        self._server.exporter = self
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        name='telemetry-{}'.format(self.name))
+        self._thread.daemon = True
+        self._thread.start()
+
+        with open(self.address_path, 'w') as fp:
+            fp.write(self.address + '\n')
+        self.logger.info('Serving telemetry on {}'.format(self.address))
+
+    def _seconds(self, time, unit):
+        scale = self._time_scales.get(unit)
+        if scale is None:
+            scale = self._time_scales[unit] = float(PhysicalField(1, unit).inUnitsOf('s').value)
+        return float(time) * scale
+
+    def process(self, num, state):
+        """
+        Update the telemetry from the state. If the state is a full snapshot, a copy of it is
+        kept as the latest for the ``/state`` endpoint.
+        """
+        now = default_timer()
+        time, tmeta = state['time']['data']
+        clock = self._seconds(time, tmeta['unit'])
+
+        metrics = dict(step=num, clock_seconds=clock)
+        for name, entry in state.get('metrics', {}).items():
+            value = entry['data'][0]
+            if value is not None:
+                metrics[name] = value
+
+        exports = {}
+        timer = getattr(self.sim, 'timer', None)
+        if timer is not None:
+            for phase in timer.names():
+                if phase.startswith('export.'):
+                    exports[phase[7:]] = (timer.total(phase), timer.count(phase))
+
+        # the minimal states between the snapshots only have the time and metrics. The arrays
+        # of the snapshot are copied here, while they hold the values of this step.
+        snapshot = copy_arrays(state) if len(state) > 2 else None
+
+        with self._lock:
+            self._step_times.append(now)
+            self._metrics = metrics
+            self._exports = exports
+            if snapshot is not None:
+                self._state = snapshot
+                self._state_step = num
+
+    def steps_per_second(self):
+        """
+        Returns:
+            float: the rate of the recent steps in wall-clock time
+        """
+        with self._lock:
+            times = list(self._step_times)
+        if len(times) < 2 or times[-1] <= times[0]:
+            return 0.0
+        return (len(times) - 1) / (times[-1] - times[0])
+
+    def render_metrics(self):
+        """
+        Returns:
+            str: the telemetry in the Prometheus text format
+        """
+        rate = self.steps_per_second()
+        with self._lock:
+            metrics = dict(self._metrics)
+            exports = dict(self._exports)
+
+        gauges = [
+            ('step', 'counter', 'Simulation steps completed', metrics.get('step')),
+            ('steps_per_second', 'gauge', 'Recent rate of the steps in wall-clock time', rate),
+            ('clock_seconds', 'gauge', 'Model clock', metrics.get('clock_seconds')),
+            ('dt_seconds', 'gauge', 'Time step of the last step', metrics.get('dt')),
+            ('sweeps', 'gauge', 'Sweeps in the last step', metrics.get('num_sweeps')),
+            ('residual', 'gauge', 'Residual of the last step', metrics.get('residual')),
+            ('calc_time_seconds', 'gauge', 'Wall-clock time of the last step',
+             None if metrics.get('calc_time') is None else metrics['calc_time'] / 1000.0),
+            ('cycle_residual', 'gauge', 'Residual of the periodic steady state',
+             metrics.get('cycle_residual')),
+            ]
+
+        lines = []
+        for name, kind, doc, value in gauges:
+            if value is None:
+                continue
+            lines.append('# HELP microbenthos_{} {}'.format(name, doc))
+            lines.append('# TYPE microbenthos_{} {}'.format(name, kind))
+            lines.append('microbenthos_{} {!r}'.format(name, float(value)))
+
+        if exports:
+            name = 'microbenthos_export_duration_seconds'
+            lines.append('# HELP {} Time spent in the exporters'.format(name))
+            lines.append('# TYPE {} summary'.format(name))
+            for expname, (total, count) in sorted(exports.items()):
+                lines.append('{}_sum{{exporter="{}"}} {!r}'.format(name, expname, float(total)))
+                lines.append('{}_count{{exporter="{}"}} {}'.format(name, expname, count))
+
+        return '\n'.join(lines) + '\n'
+
+    def render_state(self):
+        """
+        Returns:
+            str: the latest model snapshot as JSON, with the keys `step` and `state`
+        """
+        with self._lock:
+            state, step = self._state, self._state_step
+        return json.dumps(dict(step=step, state=jsonable(state)))
+
+    def render_info(self):
+        """
+        Returns:
+            str: info about the exporter and the run as JSON
+        """
+        info = self.get_info()
+        info.update(
+            address=self.address,
+            output_dir=os.path.abspath(self.output_dir),
+            host=socket.gethostname(),
+            pid=os.getpid(),
+            endpoints=['/metrics', '/state'],
+            )
+        return json.dumps(info)
+
+    def finish(self):
+        """
+        Stop the server and remove the address file
+        """
+        if self._server is None:
+            return
+
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+        self._server = self._thread = None
+
+        if self.address.startswith('unix:') and os.path.exists(self.address[5:]):
+            os.remove(self.address[5:])
+        if os.path.exists(self.address_path):
+            os.remove(self.address_path)
+        self.logger.debug('Stopped telemetry server on {}'.format(self.address))
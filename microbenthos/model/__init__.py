@@ -1,4 +1,13 @@
-from .model import MicroBenthosModel
-from .resume import truncate_model_data, check_compatibility
-from .saver import save_snapshot
-from .simulation import Simulation
+from ..utils.lazy_import import lazy_attributes
+
+#: the public attributes, imported from their modules on first access
+ATTRIBUTES = {
+    'MicroBenthosModel': '.model',
+    'truncate_model_data': '.resume',
+    'check_compatibility': '.resume',
+    'save_snapshot': '.saver',
+    'Simulation': '.simulation',
+    'WarmStartStore': '.warmstart',
+    }
+
+lazy_attributes(__name__, ATTRIBUTES)
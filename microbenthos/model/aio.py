@@ -0,0 +1,164 @@
+"""
+Module for running the simulation evolution in an :mod:`asyncio` event loop, so that services
+can manage many simulations without blocking the loop.
+
+This module is python 3 only: it uses the ``async`` syntax of python 3.5+, so it cannot be
+imported on python 2. It is imported on demand by :meth:`.Simulation.aevolution`.
+"""
+
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+
+class AsyncEvolution(object):
+    """
+    An asynchronous iterator over the :meth:`.Simulation.evolution`, which runs each step in an
+    executor.
+
+    The evolution can be paused and resumed, and cancelled. These take effect between the
+    steps, as a running step of the solver cannot be interrupted. The methods are to be called
+    from the thread of the event loop.
+
+    Example:
+
+        .. code-block:: python
+
+            async with simulation.aevolution() as evolution:
+                async for step, state in evolution:
+                    await evolution.submit(exporter.process, step, state)
+
+    """
+
+    def __init__(self, simulation, executor = None):
+        """
+        Args:
+            simulation (:class:`~microbenthos.Simulation`): the simulation with the model set
+            executor (None, :class:`concurrent.futures.Executor`): the executor to run the steps
+                in. If None, a single thread executor is created and shut down on
+                :meth:`.aclose`. The steps are run one at a time in any case.
+        """
+        self.logger = logging.getLogger(__name__)
+
+        self.simulation = simulation
+
+        self._own_executor = executor is None
+        self.executor = executor or ThreadPoolExecutor(max_workers=1)
+
+        self._evolution = simulation.evolution()
+        self._pending = None
+        self._paused = False
+        self._resumed = None
+        self._cancelled = False
+        self._closed = False
+
+    def __repr__(self):
+        return 'AsyncEvolution({})'.format(self.simulation)
+
+    @property
+    def paused(self):
+        """
+        Flag whether the evolution is paused
+        """
+        return self._paused
+
+    @property
+    def cancelled(self):
+        """
+        Flag whether the evolution is cancelled
+        """
+        return self._cancelled
+
+    def pause(self):
+        """
+        Pause the evolution after the current step. The next step waits for :meth:`.resume`.
+        """
+        self._paused = True
+        if self._resumed is not None:
+            self._resumed.clear()
+
+    def resume(self):
+        """
+        Resume a paused evolution
+        """
+        self._paused = False
+        if self._resumed is not None:
+            self._resumed.set()
+
+    def cancel(self):
+        """
+        Cancel the evolution after the current step, which ends the iteration. A paused
+        evolution is woken up to end.
+        """
+        self._cancelled = True
+        if self._resumed is not None:
+            self._resumed.set()
+
+    def submit(self, func, *args):
+        """
+        Run a function in the executor, such as the processing of a state by an exporter. With
+        the default executor, it runs after any pending step.
+
+        Returns:
+            :class:`asyncio.Future`: the awaitable result of ``func(*args)``
+        """
+        return asyncio.wrap_future(self.executor.submit(func, *args))
+
+    def _next_step(self):
+        try:
+            return next(self._evolution)
+        except StopIteration:
+            return None
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._resumed is None:
+            self._resumed = asyncio.Event()
+            if not self._paused:
+                self._resumed.set()
+
+        await self._resumed.wait()
+        if self._cancelled or self._closed:
+            raise StopAsyncIteration
+
+        self._pending = self.executor.submit(self._next_step)
+        try:
+            step = await asyncio.wrap_future(self._pending)
+        except asyncio.CancelledError:
+            # the step keeps running in the executor, but no more steps are started
+            self._cancelled = True
+            raise
+
+        self._pending = None
+        if step is None:
+            raise StopAsyncIteration
+        return step
+
+    async def aclose(self):
+        """
+        Close the evolution, waiting for the current step to finish. The model is left in the
+        state after the last step.
+        """
+        if self._closed:
+            return
+        self._closed = True
+
+        if self._pending is not None:
+            try:
+                await asyncio.wrap_future(self._pending)
+            except Exception:
+                self.logger.warning('Error in the last step of {}'.format(self), exc_info=True)
+            self._pending = None
+
+        await asyncio.wrap_future(self.executor.submit(self._evolution.close))
+        if self._own_executor:
+            self.executor.shutdown(wait=False)
+        self.logger.debug('Closed {}'.format(self))
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
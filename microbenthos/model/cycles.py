@@ -0,0 +1,165 @@
+"""
+Module to monitor the convergence of a model towards a periodic (diel) steady state
+"""
+from __future__ import division
+
+import logging
+import math
+
+from fipy import PhysicalField
+from fipy.tools import numerix as np
+
+
+class DielCycleMonitor(object):
+    """
+    Monitor the cycle-to-cycle change of model variable profiles over a repeating diel period.
+
+    Models driven by :class:`~microbenthos.core.irradiance.Irradiance` are typically run for
+    several diel periods until the solution repeats itself from one day to the next. This class
+    samples the profiles of the given variables at the same phase (the start) of successive diel
+    periods, and computes the relative change between them. Once the change of all the variables
+    falls below :attr:`.tolerance`, the model is considered to be in a periodic steady state.
+
+    The relative change of a variable profile is computed as::
+
+        max(abs(current - previous)) / max(abs(previous))
+
+    """
+
+    def __init__(self, period, tolerance = 1e-3, min_cycles = 2):
+        """
+        Args:
+            period (float, PhysicalField): The duration of a diel period, assumed to be in hours
+                if a plain number
+
+            tolerance (float): The relative change between cycles under which the profiles are
+                considered to be converged (default: 1e-3)
+
+            min_cycles (int): The minimum number of full cycles to compare before convergence
+                can be declared (default: 2)
+
+        Raises:
+            ValueError: if `period` is not positive or `tolerance` is not in (0, 1)
+        """
+        self.logger = logging.getLogger(__name__)
+
+        period = PhysicalField(period, 'h')
+        #: the duration of the cycle in seconds
+        self.period = float(period.inUnitsOf('s').value)
+        if self.period <= 0:
+            raise ValueError('Cycle period should be > 0, not {}'.format(period))
+
+        self.tolerance = float(tolerance)
+        if not (0 < self.tolerance < 1):
+            raise ValueError('Cycle tolerance should be in (0, 1), not {}'.format(tolerance))
+
+        self.min_cycles = max(1, int(min_cycles))
+
+        self._cycle = None
+        self._profiles = None
+
+        #: list of `(cycle_number, residuals)` of the cycle comparisons done
+        self.history = []
+
+    def __repr__(self):
+        return 'DielCycleMonitor(period={}s, tol={:.2g})'.format(self.period, self.tolerance)
+
+    def cycle_number(self, clock):
+        """
+        Args:
+            clock (float): The model clock in seconds
+
+        Returns:
+            int: the index of the diel period the clock is in
+        """
+        return int(math.floor(clock / self.period))
+
+    def is_due(self, clock):
+        """
+        Check if the clock has entered a new cycle since the profiles were last sampled
+
+        Args:
+            clock (float): The model clock in seconds
+
+        Returns:
+            bool: True if the profiles should be sampled with :meth:`.update`
+        """
+        return self._cycle is None or self.cycle_number(clock) > self._cycle
+
+    def update(self, clock, profiles):
+        """
+        Sample the profiles at the given clock time and compare them to the previous cycle.
+
+        Args:
+            clock (float): The model clock in seconds
+
+            profiles (dict): Mapping of variable name to its numeric profile (array)
+
+        Returns:
+            dict: Mapping of the variable names to the relative change since the last cycle,
+            or ``None`` if no previous cycle was available for comparison.
+        """
+        cycle = self.cycle_number(clock)
+        if self._cycle is None and clock - cycle * self.period > 0:
+            # started in the middle of a cycle, so wait for the next one to sample the same phase
+            self.logger.debug('Clock {}s not at cycle start. Skipping sample.'.format(clock))
+            self._cycle = cycle
+            return None
+
+        current = {name: np.array(value, dtype=float) for name, value in profiles.items()}
+
+        residuals = None
+        if self._profiles is not None:
+            residuals = {}
+            for name, value in current.items():
+                previous = self._profiles.get(name)
+                if previous is None or previous.shape != value.shape:
+                    residuals[name] = float('inf')
+                    continue
+                scale = max(float(np.max(np.abs(previous))), 1e-30)
+                residuals[name] = float(np.max(np.abs(value - previous))) / scale
+
+            self.history.append((cycle, residuals))
+            self.logger.info('Cycle #{} max relative change: {:.3g}'.format(
+                cycle, max(residuals.values()) if residuals else 0.0))
+
+        self._cycle = cycle
+        self._profiles = current
+        return residuals
+
+    def remap_profiles(self, remap):
+        """
+        Remap the profiles sampled in the last cycle onto a new mesh, such as after the model is
+        remeshed, so that the next cycle is compared to them and the history is kept.
+
+        Args:
+            remap (callable): function that maps a profile on the old mesh to the new mesh
+        """
+        if self._profiles is None:
+            return
+        self._profiles = {name: np.array(remap(value), dtype=float)
+                          for name, value in self._profiles.items()}
+
+    @property
+    def residual(self):
+        """
+        Returns:
+            float: the largest relative change in the last cycle comparison, or NaN if none yet
+        """
+        if not self.history:
+            return float('nan')
+        residuals = self.history[-1][1]
+        if not residuals:
+            return 0.0
+        return max(residuals.values())
+
+    @property
+    def converged(self):
+        """
+        Returns:
+            bool: True if at least :attr:`.min_cycles` comparisons were made and the last one is
+            within the :attr:`.tolerance`
+        """
+        if len(self.history) < self.min_cycles:
+            return False
+        return self.residual < self.tolerance
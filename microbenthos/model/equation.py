@@ -292,7 +292,7 @@ class ModelEquation(object):
         """
         Return a pretty (unicode) string of the equation through sympy
         """
-        return sp.pretty(self.as_symbolic())
+        return sp.pretty(self.as_symbolic(), use_unicode=True)
 
     @property
     def RHS_terms(self):
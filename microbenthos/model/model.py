@@ -1,20 +1,22 @@
+import copy
+import fnmatch
 import logging
 import operator
 from collections import Mapping
 from functools import reduce
 
-import fipy.tools.numerix as np
 import h5py as hdf
-import sympy as sp
 from fipy import Variable, PhysicalField
 from sympy import Lambda, symbols
 
-sp.init_printing()
-
-from ..core import Entity, Expression, SedimentDBLDomain
+from ..core import Entity, SedimentDBLDomain, EventEngine
+from ..core.expression import formula_namespace
 from ..utils import snapshot_var, restore_var, CreateMixin
+from ..utils.timing import PhaseTimer
 from .resume import check_compatibility, truncate_model_data
 from .equation import ModelEquation
+from .state import StatefulVar, as_var_units, update_old, clip_var
+from .remesh import transfer_state, remap_var, domain_faces, stored_faces, state_variables
 
 
 class MicroBenthosModel(CreateMixin):
@@ -57,14 +59,31 @@ class MicroBenthosModel(CreateMixin):
         #: container (dict) of the :class:`.ModelEquation` defined in the model
         self.equations = {}
 
+        self._stateful_vars = None
+        self._object_index = {}
+
+        #: the :class:`.EventEngine` that updates the event times of all the process events
+        self.event_engine = EventEngine()
+
+        #: the :class:`~microbenthos.utils.timing.PhaseTimer` of the clock hooks, which is
+        #: disabled unless set by the :class:`~microbenthos.Simulation`
+        self.timer = PhaseTimer(enabled=False)
+        #: names of the timer phases of the entities, by target and entity name
+        self._clock_phases = dict(env={}, microbes={})
+
         #: a :class:`fipy.Variable` subclass that serves as the :class:`ModelClock`
         self.clock = ModelClock(self, value=0.0, unit='h', name='clock')
 
-        self._setup(**kwargs)
+        #: the formulae (dict) of the model, used to parse the expressions of its entities
+        self.formulae = {}
+
+        with formula_namespace(self.formulae):
+            self._setup(**kwargs)
 
     def add_formula(self, name, vars, expr):
         """
-        Add a formula to the sympy namespace of :class:`Expression`
+        Add a formula to the :attr:`.formulae` of the model, which are the namespace of the
+        :class:`Expression` instances of its entities
 
         Args:
             name (str): Name of the formula
@@ -84,7 +103,7 @@ class MicroBenthosModel(CreateMixin):
         try:
             func = Lambda(symbols(vars), expr)
             self.logger.debug('Formula {!r}: {}'.format(name, func))
-            Expression._sympy_ns[name] = func
+            self.formulae[name] = func
         except:
             self.logger.exception('Invalid input for formula {}: vars={} expr={}'.format(name, vars, expr))
             raise ValueError('Invalid input for formula')
@@ -106,6 +125,7 @@ class MicroBenthosModel(CreateMixin):
             raise RuntimeError('Model domain has already been set!')
 
         self._domain = domain
+        self._index_domain()
 
     def create_entity_from(self, defdict):
         """
@@ -117,7 +137,8 @@ class MicroBenthosModel(CreateMixin):
             The entity created
         """
         self.logger.debug('Creating entity from {}'.format(defdict))
-        entity = Entity.from_dict(defdict)
+        with formula_namespace(self.formulae):
+            entity = Entity.from_dict(defdict)
         entity.set_domain(self.domain)
         entity.setup(model=self)
         assert entity.check_domain()
@@ -134,13 +155,121 @@ class MicroBenthosModel(CreateMixin):
 
         """
         tdict = getattr(self, target)
+        path = '{}.{}'.format(target, name)
         if name in tdict:
             self.logger.warning("Entity {!r} exists in {}! Overwriting!".format(name, target))
+            self._unindex(path)
         defdict['init_params']['name'] = name
         entity = self.create_entity_from(defdict)
         tdict[name] = entity
+        self._stateful_vars = None
+        self._index_object(path, entity)
+        self._index_domain()
         self.logger.info('Added {} entity {} = {}'.format(target, name, entity))
 
+    def remove_entity(self, target, name):
+        """
+        Remove an entity from the model, and its paths from the object index
+
+        Args:
+            target (str): Target dict such as ``"env"``, ``"microbes"``
+            name (str): The key of the entity in the dictionary
+
+        Returns:
+            The removed entity
+
+        Raises:
+            ValueError: if no such entity exists
+        """
+        tdict = getattr(self, target)
+        if name not in tdict:
+            raise ValueError('Unknown model path {!r}'.format('{}.{}'.format(target, name)))
+
+        entity = tdict.pop(name)
+        path = '{}.{}'.format(target, name)
+        for key, obj in list(self._object_index.items()):
+            if key.startswith(path + '.') and getattr(obj, 'engine', None) is self.event_engine:
+                self.event_engine.unregister(obj)
+        self._unindex(path)
+        self._stateful_vars = None
+        self.logger.info('Removed {} entity {} = {}'.format(target, name, entity))
+        return entity
+
+    #: attributes of entities which are containers of further objects to be indexed
+    _indexed_containers = ('features', 'processes', 'channels', 'events')
+
+    def _index_object(self, path, obj):
+        """
+        Add the object and its nested model objects (variable, features, processes,
+        channels and events) to the object index under the given path
+        """
+        index = self._object_index
+        index[path] = obj
+
+        var = getattr(obj, 'var', None)
+        if var is not None:
+            index[path + '.var'] = var
+
+        for cname in self._indexed_containers:
+            container = getattr(obj, cname, None)
+            if isinstance(container, Mapping):
+                cpath = '{}.{}'.format(path, cname)
+                index[cpath] = container
+                for key, item in container.items():
+                    self._index_object('{}.{}'.format(cpath, key), item)
+
+    def _index_domain(self):
+        """
+        Add the domain and the variables stored in it to the object index
+        """
+        domain_vars = getattr(self.domain, 'VARS', None)
+        if not isinstance(domain_vars, Mapping):
+            return
+        for name, var in domain_vars.items():
+            self._object_index['domain.{}'.format(name)] = var
+
+    def _unindex(self, path):
+        """
+        Remove the path and all paths under it from the object index
+        """
+        prefix = path + '.'
+        for key in [k for k in self._object_index if k == path or k.startswith(prefix)]:
+            del self._object_index[key]
+
+    def reindex(self):
+        """
+        Rebuild the object index used by :meth:`.get_object` and :meth:`.find_objects` from the
+        entities in the model. This is only needed if the :attr:`.env` or :attr:`.microbes`
+        containers have been modified directly.
+        """
+        self._object_index = {}
+        self._index_domain()
+        for target in ('env', 'microbes'):
+            for name, entity in getattr(self, target).items():
+                self._index_object('{}.{}'.format(target, name), entity)
+        self.logger.debug('Indexed {} model objects'.format(len(self._object_index)))
+
+    def find_objects(self, pattern):
+        """
+        Find the indexed objects in the model whose paths match a wildcard pattern
+
+        Args:
+            pattern (str): a shell-style wildcard pattern, such as ``"microbes.*.features.*"``
+
+        Returns:
+            dict: mapping of the matching paths to the objects
+
+        Example:
+
+            .. code-block:: python
+
+                model.find_objects('env.*.var')
+                model.find_objects('microbes.cyano.processes.*')
+
+        """
+        return {path: obj for path, obj in self._object_index.items()
+                if fnmatch.fnmatchcase(path, pattern)}
+
     def _setup(self, **definition):
         """
         Set up the model instance from the `definition` dictionary, which is
@@ -181,6 +310,7 @@ class MicroBenthosModel(CreateMixin):
 
         if not self.all_entities_setup:
             self.entities_setup()
+            self.reindex()
 
         eqndef = definition.get('equations')
         if eqndef:
@@ -231,7 +361,9 @@ class MicroBenthosModel(CreateMixin):
             processed.
 
         """
-        self.logger.debug('Creating model snapshot')
+        debug = self.logger.isEnabledFor(logging.DEBUG)
+        if debug:
+            self.logger.debug('Creating model snapshot')
         state = {}
         state['time'] = dict(data=snapshot_var(self.clock, base=base))
         if self.domain:
@@ -242,19 +374,22 @@ class MicroBenthosModel(CreateMixin):
 
         env = state['env'] = {}
         for name, obj in self.env.items():
-            self.logger.debug('Snapshotting: {} --> {}'.format(name, obj))
+            if debug:
+                self.logger.debug('Snapshotting: {} --> {}'.format(name, obj))
             ostate = obj.snapshot(base=base)
             env[name] = ostate
 
         microbes = state['microbes'] = {}
         for name, obj in self.microbes.items():
-            self.logger.debug('Snapshotting: {} --> {}'.format(name, obj))
+            if debug:
+                self.logger.debug('Snapshotting: {} --> {}'.format(name, obj))
             ostate = obj.snapshot(base=base)
             microbes[name] = ostate
 
         eqns = state['equations'] = {}
         for name, obj in self.equations.items():
-            self.logger.debug('Snapshotting: {} --> {}'.format(name, obj))
+            if debug:
+                self.logger.debug('Snapshotting: {} --> {}'.format(name, obj))
             ostate = obj.snapshot()
             eqns[name] = ostate
 
@@ -301,6 +436,11 @@ class MicroBenthosModel(CreateMixin):
 
         tidx = -1
 
+        # restore the clock first, so that the event times restored below are not updated
+        key = 'time'
+        self.clock.setValue(restore_var(store[key], tidx))
+        self.logger.info('Restored model clock to {}'.format(self.clock))
+
         for name, envobj in self.env.items():
             self.logger.debug('Restoring {}: {}'.format(name, envobj))
             envobj.restore_from(store['env'][name], tidx)
@@ -311,16 +451,14 @@ class MicroBenthosModel(CreateMixin):
         for name, eqn in self.equations.items():
             eqn.restore_from(store['equations'][name], tidx)
 
-        key = 'time'
-        self.clock.setValue(restore_var(store[key], tidx))
-        self.logger.info('Restored model clock to {}'.format(self.clock))
-
-    def can_restore_from(self, store):
+    def can_restore_from(self, store, remap = False):
         """
         Check if the model can be resumed from the given store
 
         Args:
             store (:class:`hdf.Group`): The root of the model data store
+            remap (bool): whether the store may be on a different domain mesh, whose profiles
+                are remapped as in :meth:`.spinup_from`
 
         Returns:
             True if it is compatible
@@ -328,12 +466,99 @@ class MicroBenthosModel(CreateMixin):
         """
         self.logger.info('Checking if model can resume from {}'.format(store))
         try:
-            check_compatibility(self.snapshot(), store)
+            if remap:
+                check_compatibility(self.snapshot(), store, check_depths=False)
+            else:
+                check_compatibility(self.snapshot(), store)
             return True
         except:
             self.logger.warning('Model & stored data not compatible', exc_info=True)
             return False
 
+    def spinup_from(self, store, time_idx = -1):
+        """
+        Restore the model state from a store of a run on a different domain mesh, such as a
+        spin-up on a coarser domain. The clock is restored, and the profiles of the
+        :attr:`.stateful_vars` (with their old values) and the event times of the process events
+        are remapped conservatively onto the model domain, with the meshes aligned at the
+        sediment surface. Unlike :meth:`.restore_from`, the store is not modified.
+
+        Args:
+            store (:class:`h5py:Group`): The root of the model data store
+            time_idx (int): the index along the time series to restore from
+
+        Returns:
+            list: the paths of the restored variables
+
+        Raises:
+            TypeError: if the store data is not compatible with the model
+        """
+        self.logger.info('Spinning up model from store: {}'.format(tuple(store)))
+
+        if not self.can_restore_from(store, remap=True):
+            raise TypeError('Store incompatible to be restored from!')
+
+        self.clock.setValue(restore_var(store['time'], time_idx))
+        self.logger.info('Restored model clock to {}'.format(self.clock))
+
+        old_faces = stored_faces(store, time_idx)
+        new_faces = domain_faces(self.domain)
+
+        restored = []
+        for path, var in state_variables(self):
+            store_path = path.replace('.', '/')
+            if store_path not in store:
+                self.logger.warning('No stored data for {} to spin up from'.format(path))
+                continue
+            value = restore_var(store[store_path], time_idx)
+            remap_var(value, old_faces, new_faces, var)
+            if getattr(var, '_old', None) is not None:
+                update_old(var)
+            restored.append(path)
+
+        self.logger.info('Spun up {} variables from {} to {} cells'.format(
+            len(restored), len(old_faces) - 1, len(new_faces) - 1))
+        return restored
+
+    def remeshed(self, cell_sizes = None, **domain_params):
+        """
+        Create a copy of the model from its definition on a domain with the given cell sizes,
+        and transfer the model state onto it through :func:`.transfer_state`. The sediment
+        surface is kept at the same position.
+
+        Args:
+            cell_sizes (array, PhysicalField): the cell sizes of the new domain, in mm if plain
+                numbers. If None, the domain is created from the `domain_params` instead.
+            domain_params: other parameters of the new :class:`.SedimentDBLDomain`, such as a
+                uniform `cell_size` or a `grading_ratio`
+
+        Returns:
+            :class:`MicroBenthosModel`: the new model instance
+
+        Raises:
+            RuntimeError: if the model was not created from a definition through
+                :meth:`.create_from`
+        """
+        definition = getattr(self, 'definition_', None)
+        if not definition:
+            raise RuntimeError('Model {} has no definition to be remeshed from'.format(self))
+
+        definition = copy.deepcopy(definition)
+        domain_def = definition['domain']
+        params = domain_def.setdefault('init_params', {})
+        params.pop('cell_sizes', None)
+        if cell_sizes is not None:
+            params['cell_sizes'] = PhysicalField(cell_sizes, 'mm')
+            params['dbl_length'] = self.domain.DBL_length
+            params['porosity'] = self.domain.sediment_porosity
+        params.update(domain_params)
+
+        model = self.__class__(**copy.deepcopy(definition))
+        self.logger.info('Created remeshed model with {} cells'.format(model.domain.total_cells))
+        model.definition_ = definition
+        transfer_state(self, model)
+        return model
+
     def add_equation(self, name, transient, sources = None, diffusion = None, track_budget = False):
         """
         Create a transient reaction-diffusion equation for the model.
@@ -410,6 +635,7 @@ class MicroBenthosModel(CreateMixin):
         self.logger.info('Full model equation: {!r}'.format(full_eqn))
 
         self.full_eqn = full_eqn
+        self._stateful_vars = self._collect_stateful_vars()
 
         # self.logger.debug('Collecting unique source term expressions')
         # for eqn in self.equations.values():
@@ -431,6 +657,9 @@ class MicroBenthosModel(CreateMixin):
         """
         Get an object stored in the model
 
+        The path is first looked up in the index of model objects, which is filled as entities
+        are created. Other paths are resolved by traversing the model structure.
+
         Args:
             path (str): The stored path for the object in the model
 
@@ -440,6 +669,10 @@ class MicroBenthosModel(CreateMixin):
         Raises:
             ValueError if no object found at given path
         """
+        index = getattr(self, '_object_index', None)
+        if index and path in index:
+            return index[path]
+
         self.logger.debug('Getting object {!r}'.format(path))
         parts = path.split('.')
 
@@ -468,54 +701,90 @@ class MicroBenthosModel(CreateMixin):
         Callback function to update the time on all the stored entities
         """
         clock = self.clock()
-        self.logger.info('Updating entities for model clock: {}'.format(clock))
+        if self.logger.isEnabledFor(logging.INFO):
+            self.logger.info('Updating entities for model clock: {}'.format(clock))
+
+        timer = self.timer
+        if not timer.enabled:
+            for obj in self.env.values():
+                obj.on_time_updated(clock)
+            for obj in self.microbes.values():
+                obj.on_time_updated(clock)
+            self.event_engine.update(clock)
+            return
 
-        for name, obj in self.env.items():
-            obj.on_time_updated(clock)
+        for target, entities in (('env', self.env), ('microbes', self.microbes)):
+            phases = self._clock_phases[target]
+            for name, obj in entities.items():
+                phase = phases.get(name)
+                if phase is None:
+                    phase = phases[name] = 'clock.{}.{}'.format(target, name)
+                with timer.phase(phase):
+                    obj.on_time_updated(clock)
 
-        for name, obj in self.microbes.items():
-            obj.on_time_updated(clock)
+        with timer.phase('clock.events'):
+            self.event_engine.update(clock)
 
-    def update_vars(self):
+    def _collect_stateful_vars(self):
         """
-        Update all stored variables which have an `hasOld` setting. This is used while sweeping
-        for solutions.
+        Collect the variables in :attr:`.env` and the features of :attr:`.microbes` which have
+        an old value to update while sweeping.
+
+        Returns:
+            list: of :class:`.StatefulVar` entries
         """
+        registry = []
 
-        self.logger.debug('Updating model variables. Current time: {}'.format(self.clock))
-        updated = []
-        for name, obj in self.env.items():
+        for name, obj in sorted(self.env.items()):
             path = 'env.{}'.format(name)
-            if hasattr(obj, 'var'):
-                try:
-                    obj.var.updateOld()
-                    self.logger.debug("Updated old: {}".format(path))
-
-                    if obj.clip_min is not None or obj.clip_max is not None:
-                        obj.var.value = np.clip(obj.var.value, obj.clip_min, obj.clip_max)
-                        self.logger.info('Clipped {} between {} and {}'.format(
-                            obj, obj.clip_min, obj.clip_max
-                            ))
-                    updated.append(path)
-                except AssertionError:
-                    self.logger.debug('{} = {!r}.var.updateOld failed'.format(path, obj))
+            var = getattr(obj, 'var', None)
+            if var is None or getattr(var, '_old', None) is None:
+                self.logger.debug('{} = {!r} has no old value to update'.format(path, obj))
+                continue
+            registry.append(StatefulVar(path, var,
+                                        as_var_units(var, obj.clip_min),
+                                        as_var_units(var, obj.clip_max)))
+
+        for name, microbe in sorted(self.microbes.items()):
+            for fname, feat in sorted(microbe.features.items()):
+                path = 'microbes.{}.features.{}'.format(name, fname)
+                var = getattr(feat, 'var', None)
+                if var is None or getattr(var, '_old', None) is None:
+                    self.logger.debug('{} = {!r} has no old value to update'.format(path, feat))
+                    continue
+                registry.append(StatefulVar(path, var, None, None))
 
-            else:
-                self.logger.debug('env.{!r} not model variable'.format(obj))
+        self.logger.debug('Stateful variables: {}'.format([e.path for e in registry]))
+        return registry
 
-        for name, microbe in self.microbes.items():
-            for fname, feat in microbe.features.items():
-                path = 'microbes.{}.features.{}'.format(name, fname)
-                if hasattr(feat, 'var'):
-                    try:
-                        feat.var.updateOld()
-                        self.logger.debug("Updated old: {}".format(path))
-                        updated.append(path)
-                    except AssertionError:
-                        self.logger.debug('{} = {!r}.var.updateOld failed'.format(path, obj))
-                else:
-                    self.logger.debug(
-                        '{}={!r} is not model variable'.format(path, obj))
+    @property
+    def stateful_vars(self):
+        """
+        The registry (list) of :class:`~microbenthos.model.state.StatefulVar` entries for the
+        variables updated by :meth:`.update_vars`. This is created in
+        :meth:`.create_full_equation`, and recreated if entities are added to the model.
+        """
+        if self._stateful_vars is None:
+            self._stateful_vars = self._collect_stateful_vars()
+        return self._stateful_vars
+
+    def update_vars(self):
+        """
+        Update all stored variables which have an `hasOld` setting, and clip the environment
+        variables to their limits. This is used while sweeping for solutions.
+
+        Returns:
+            list: the paths of the updated variables
+        """
+
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug('Updating model variables. Current time: {}'.format(self.clock))
+        updated = []
+        for entry in self.stateful_vars:
+            update_old(entry.var)
+            if entry.clip_min is not None or entry.clip_max is not None:
+                clip_var(entry.var, entry.clip_min, entry.clip_max)
+            updated.append(entry.path)
 
         return updated
 
@@ -526,7 +795,9 @@ class MicroBenthosModel(CreateMixin):
         Args:
             dt (PhysicalField): the time step duration
         """
-        self.logger.debug('Updating model equations. Current time: {} dt={}'.format(self.clock, dt))
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug('Updating model equations. Current time: {} dt={}'.format(
+                self.clock, dt))
 
         for eqn in self.equations.values():
             eqn.update_tracked_budget(dt)
@@ -563,6 +834,19 @@ class ModelClock(Variable):
         dt = PhysicalField(dt, 's')
         self.value += dt
 
+    def set_seconds(self, t):
+        """
+        Set the clock time from a plain number of seconds. This avoids the unit arithmetic of
+        :meth:`.increment_time` in the evolution loop of the simulation.
+
+        Args:
+            t (float): Time in seconds
+        """
+        if t < 0:
+            raise ValueError('Time must be positive!')
+
+        self.value = PhysicalField(t / 3600.0, 'h')
+
     def set_time(self, t):
         """
         Set the clock time in hours
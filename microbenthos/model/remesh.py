@@ -0,0 +1,342 @@
+"""
+Module to adapt the 1D mesh of a model to the solution, and to transfer the model state between
+meshes of different cell sizes.
+
+The cell sizes are handled as plain arrays (in mm, as the :class:`.SedimentDBLDomain` does),
+and the profiles are treated as piecewise constant over the cells, so that the remapping
+conserves the depth integrals of the variables.
+"""
+
+import logging
+
+from fipy import PhysicalField
+from fipy.tools import numerix as np
+
+
+def cell_faces(sizes):
+    """
+    Return the face coordinates of cells with the given sizes, starting at 0
+
+    Args:
+        sizes (array): the cell sizes
+
+    Returns:
+        :class:`numpy.ndarray`: of length ``len(sizes) + 1``
+    """
+    return np.concatenate(([0.0], np.cumsum(sizes)))
+
+
+def domain_faces(domain):
+    """
+    Return the face coordinates of the cells of a domain in mm, with the sediment surface at 0
+
+    Args:
+        domain (:class:`~microbenthos.core.domain.SedimentDBLDomain`): the model domain
+
+    Returns:
+        :class:`numpy.ndarray`: of length ``domain.total_cells + 1``
+    """
+    faces = cell_faces(domain.cell_sizes.inUnitsOf('mm').value)
+    return faces - faces[domain.idx_surface]
+
+
+def stored_faces(store, tidx):
+    """
+    Return the face coordinates of the cells of the domain in a model data store in mm, with the
+    sediment surface at 0. The cell sizes are read from the stored ``cell_sizes`` of the domain
+    if present, which may vary over time for remeshed runs, and else from the uniform
+    ``cell_size`` in its metadata.
+
+    Args:
+        store (:class:`h5py.Group`): the root of the model data store
+        tidx (int): the index along the time series
+
+    Returns:
+        :class:`numpy.ndarray`: the face coordinates
+    """
+    domain = store['domain']
+
+    def read(ds):
+        if ds.dtype.kind == 'O' or ds.ndim > 1:
+            return np.asarray(ds[tidx], dtype=float)
+        return np.asarray(ds[()], dtype=float)
+
+    depths_ds = domain['depths']['data']
+    depths = PhysicalField(read(depths_ds), depths_ds.attrs['unit']).inUnitsOf('mm').value
+
+    if 'cell_sizes' in domain:
+        sizes_ds = domain['cell_sizes']['data']
+        sizes = PhysicalField(read(sizes_ds), sizes_ds.attrs['unit']).inUnitsOf('mm').value
+    else:
+        cell_size = domain.attrs['cell_size']
+        if isinstance(cell_size, bytes):
+            cell_size = cell_size.decode()
+        cell_size = PhysicalField(cell_size).inUnitsOf('mm').value
+        sizes = np.ones(len(depths)) * cell_size
+
+    faces = cell_faces(sizes)
+    return faces - faces[np.searchsorted(depths, 0)]
+
+
+def remap_faces(values, old_faces, new_faces):
+    """
+    Remap cell values between two 1D meshes given by their face coordinates, such that the
+    integral over each new cell is the integral of the old piecewise constant profile over it.
+    Where the new mesh extends beyond the old one, the profile is extended with the values of
+    the edge cells.
+
+    Args:
+        values (array): the cell values of shape ``(..., n_old)``
+        old_faces (array): the face coordinates of the old mesh, of length ``n_old + 1``
+        new_faces (array): the face coordinates of the new mesh
+
+    Returns:
+        :class:`numpy.ndarray`: the cell values of shape ``(..., n_new)``
+
+    Raises:
+        ValueError: if the shape of `values` does not match the old mesh
+    """
+    values = np.asarray(values, dtype=float)
+    old_faces = np.asarray(old_faces, dtype=float)
+    new_faces = np.asarray(new_faces, dtype=float)
+
+    if values.shape[-1] != len(old_faces) - 1:
+        raise ValueError('Values shape {} does not match {} cells'.format(
+            values.shape, len(old_faces) - 1))
+
+    # cumulative integral of the old profile at the old faces, which is linear in between
+    integral = np.zeros(values.shape[:-1] + old_faces.shape)
+    np.cumsum(values * np.diff(old_faces), axis=-1, out=integral[..., 1:])
+
+    flat_integral = integral.reshape(-1, len(old_faces))
+    flat_values = values.reshape(-1, len(old_faces) - 1)
+    below = np.minimum(new_faces - old_faces[0], 0)
+    above = np.maximum(new_faces - old_faces[-1], 0)
+
+    at_new = np.array([np.interp(new_faces, old_faces, row) + v[0] * below + v[-1] * above
+                       for row, v in zip(flat_integral, flat_values)])
+    at_new = at_new.reshape(values.shape[:-1] + new_faces.shape)
+
+    return np.diff(at_new, axis=-1) / np.diff(new_faces)
+
+
+def conservative_remap(values, old_sizes, new_sizes):
+    """
+    Remap cell values from one 1D mesh onto another that spans the same length, through
+    :func:`remap_faces`.
+
+    Args:
+        values (array): the cell values of shape ``(..., n_old)``
+        old_sizes (array): the cell sizes of the old mesh
+        new_sizes (array): the cell sizes of the new mesh
+
+    Returns:
+        :class:`numpy.ndarray`: the cell values of shape ``(..., n_new)``
+
+    Raises:
+        ValueError: if the shapes or the total lengths of the meshes do not match
+    """
+    old_faces = cell_faces(old_sizes)
+    new_faces = cell_faces(new_sizes)
+
+    if not np.allclose(old_faces[-1], new_faces[-1]):
+        raise ValueError('Mesh lengths differ: {} and {}'.format(old_faces[-1], new_faces[-1]))
+    new_faces[-1] = old_faces[-1]
+
+    return remap_faces(values, old_faces, new_faces)
+
+
+def remesh_indicator(profiles):
+    """
+    Compute the refinement indicator of the cells from a set of profiles. For each profile, the
+    jumps across the cell faces are scaled by the range of the profile, and each cell gets the
+    largest scaled jump across its faces. The indicator is the maximum over the profiles.
+
+    Args:
+        profiles (iterable): 1D arrays of the same length, such as the variables and source
+            terms of the model equations
+
+    Returns:
+        :class:`numpy.ndarray`: the indicator per cell in [0, 1]
+    """
+    indicator = None
+    for profile in profiles:
+        profile = np.asarray(profile, dtype=float)
+        if indicator is None:
+            indicator = np.zeros(profile.shape)
+
+        span = np.ptp(profile)
+        if not span > 0:
+            continue
+
+        jumps = np.abs(np.diff(profile)) / span
+        cell = np.zeros(profile.shape)
+        cell[:-1] = jumps
+        cell[1:] = np.maximum(cell[1:], jumps)
+        np.maximum(indicator, cell, out=indicator)
+
+    if indicator is None:
+        raise ValueError('No profiles to compute remesh indicator from')
+    return indicator
+
+
+def refine_cell_sizes(sizes, indicator, threshold, min_size, max_size = None,
+                      fixed_faces = (), coarsen_fraction = 0.25):
+    """
+    Refine and coarsen the cells of a 1D mesh based on the indicator.
+
+    Cells with indicator above `threshold` are split in two halves, if not smaller than
+    `min_size`. Pairs of adjacent cells whose indicators are both below
+    ``coarsen_fraction * threshold`` are merged, if the merged cell is not larger than
+    `max_size`, they are within a factor of two of each other and the face between them is not
+    in `fixed_faces`.
+
+    Args:
+        sizes (array): the cell sizes
+        indicator (array): the indicator per cell, see :func:`remesh_indicator`
+        threshold (float): the indicator value above which cells are refined
+        min_size (float): the smallest cell size
+        max_size (None, float): the largest cell size
+        fixed_faces (iterable): indices of the faces that must be preserved, such as the
+            sediment surface at index ``idx_surface``
+        coarsen_fraction (float): fraction of the threshold below which cells are coarsened
+
+    Returns:
+        tuple: `(new_sizes, face_map)` where `face_map` maps the indices of the `fixed_faces`
+        to their indices in the new mesh
+    """
+    sizes = np.asarray(sizes, dtype=float)
+    indicator = np.asarray(indicator, dtype=float)
+    if sizes.shape != indicator.shape:
+        raise ValueError('Sizes {} and indicator {} shapes differ'.format(sizes.shape,
+                                                                          indicator.shape))
+    fixed_faces = set(int(f) for f in fixed_faces)
+    coarsen_below = coarsen_fraction * threshold
+
+    new_sizes = []
+    face_map = {}
+    N = len(sizes)
+    i = 0
+    while i < N:
+        if i in fixed_faces:
+            face_map[i] = len(new_sizes)
+
+        size = sizes[i]
+        if indicator[i] > threshold and size / 2.0 >= min_size:
+            new_sizes.extend((size / 2.0, size / 2.0))
+            i += 1
+            continue
+
+        if i + 1 < N and (i + 1) not in fixed_faces:
+            merged = size + sizes[i + 1]
+            if indicator[i] < coarsen_below and indicator[i + 1] < coarsen_below and \
+                (max_size is None or merged <= max_size) and \
+                0.5 <= sizes[i + 1] / size <= 2:
+                new_sizes.append(merged)
+                i += 2
+                continue
+
+        new_sizes.append(size)
+        i += 1
+
+    if N in fixed_faces:
+        face_map[N] = len(new_sizes)
+
+    return np.array(new_sizes), face_map
+
+
+def remap_var(var, old_faces, new_faces, target):
+    """
+    Set the values (and old values) of the `target` variable from the `var` on another mesh,
+    through :func:`remap_faces`
+
+    Args:
+        var (:class:`fipy.CellVariable`, PhysicalField): the source variable or values
+        old_faces (array): the face coordinates of the mesh of `var`
+        new_faces (array): the face coordinates of the mesh of `target`
+        target (:class:`fipy.CellVariable`): the variable to set
+    """
+    value = var if isinstance(var, PhysicalField) else var.value
+    if isinstance(value, PhysicalField):
+        value = value.inUnitsOf(target.unit).value
+    new_value = remap_faces(value, old_faces, new_faces)
+    if isinstance(target.value, PhysicalField):
+        new_value = PhysicalField(new_value, target.unit)
+    target.setValue(new_value)
+
+    old = getattr(var, '_old', None)
+    target_old = getattr(target, '_old', None)
+    if old is not None and target_old is not None:
+        old_value = old.value
+        if isinstance(old_value, PhysicalField):
+            old_value = old_value.inUnitsOf(target.unit).value
+        new_old = remap_faces(old_value, old_faces, new_faces)
+        if isinstance(target_old.value, PhysicalField):
+            new_old = PhysicalField(new_old, target.unit)
+        target_old.setValue(new_old)
+
+
+def state_variables(model):
+    """
+    Return the variables that make up the state of a model on its domain: the
+    :attr:`~microbenthos.MicroBenthosModel.stateful_vars` and the event times of the process
+    events.
+
+    Args:
+        model (:class:`~microbenthos.MicroBenthosModel`): the model
+
+    Returns:
+        list: of `(path, var)` pairs
+    """
+    variables = [(entry.path, entry.var) for entry in model.stateful_vars]
+    variables.extend((path, event.event_time)
+                     for path, event in sorted(model.find_objects('*.events.*').items())
+                     if getattr(event, 'event_time', None) is not None)
+    return variables
+
+
+def transfer_state(source, target):
+    """
+    Transfer the state of a model onto another model of the same definition with a different
+    domain mesh. The clock is copied, and the stateful variables (with their old values) and
+    the event times of the process events are remapped conservatively, with the meshes aligned
+    at the sediment surface.
+
+    Args:
+        source (:class:`~microbenthos.MicroBenthosModel`): the model to transfer from
+        target (:class:`~microbenthos.MicroBenthosModel`): the model to transfer to
+
+    Returns:
+        list: the paths of the transferred variables
+    """
+    logger = logging.getLogger(__name__)
+
+    old_faces = domain_faces(source.domain)
+    new_faces = domain_faces(target.domain)
+
+    # set the clock first, so that the events of the target are updated to it before their
+    # event times are overwritten
+    target.clock.setValue(source.clock.copy())
+
+    transferred = []
+    target_vars = dict((entry.path, entry.var) for entry in target.stateful_vars)
+    for entry in source.stateful_vars:
+        tvar = target_vars.get(entry.path)
+        if tvar is None:
+            logger.warning('No variable {} in target model to transfer to'.format(entry.path))
+            continue
+        remap_var(entry.var, old_faces, new_faces, tvar)
+        transferred.append(entry.path)
+
+    target_events = target.find_objects('*.events.*')
+    for path, event in source.find_objects('*.events.*').items():
+        tevent = target_events.get(path)
+        if getattr(event, 'event_time', None) is None or \
+            getattr(tevent, 'event_time', None) is None:
+            continue
+        remap_var(event.event_time, old_faces, new_faces, tevent.event_time)
+        transferred.append(path)
+
+    logger.info('Transferred state of {} variables from {} to {} cells'.format(
+        len(transferred), len(old_faces) - 1, len(new_faces) - 1))
+    return transferred
@@ -10,7 +10,7 @@ import h5py as hdf
 import numpy as np
 
 
-def check_compatibility(state, store):
+def check_compatibility(state, store, check_depths = True):
     """
     Check that the given model snapshot is compatible with the structure of the store. This
     checks that every path in the snapshot exists in the HDF store.
@@ -18,6 +18,9 @@ def check_compatibility(state, store):
     Args:
         state (dict): a model snapshot dictionary
         store (:class:`~hdf.Group`): the root node of the stored model data
+        check_depths (bool): whether the domain and the lengths of the depth profiles must
+            match those of the store. This is disabled for stores from a different domain mesh,
+            whose profiles are remapped on restoring.
 
     Returns:
         True if the structures are compatible
@@ -39,6 +42,10 @@ def check_compatibility(state, store):
 
         path = '/' + '/'.join(path_parts)
 
+        if not check_depths and path_parts[:1] == ['domain']:
+            logger.debug('{} skipped because depths are not checked'.format(path))
+            continue
+
         node = store[path]
 
         if ctype == 'metadata':
@@ -72,7 +79,8 @@ def check_compatibility(state, store):
             state_arr, attrs = content
 
             if ctype == 'data_static':
-                assert np.allclose(node, state_arr)
+                if check_depths:
+                    assert np.allclose(node, state_arr)
 
             elif node is time_ds:
                 continue
@@ -94,6 +102,8 @@ def check_compatibility(state, store):
                     logger.debug('{} skipped because single timepoint'.format(path))
 
                 elif len(state_arr.shape) == 1:
+                    if not check_depths:
+                        continue
                     try:
                         assert state_arr.shape[0] == Ndepths
                         # assert node.shape[0] == Ntime
@@ -9,7 +9,7 @@ import h5py as hdf
 from fipy.tools import numerix as np
 
 
-def save_snapshot(fpath, snapshot, compression = 6, shuffle = True):
+def save_snapshot(fpath, snapshot, compression = 6, shuffle = True, variable_length = False):
     """
     Save a snapshot dictionary of the model to a HDF file
 
@@ -50,6 +50,10 @@ def save_snapshot(fpath, snapshot, compression = 6, shuffle = True):
 
         shuffle (bool): Whether to use the shuffle filter
 
+        variable_length (bool): If True, then the 1D arrays of `"data"` are saved in datasets of
+            variable-length rows, so that the profiles can change length between snapshots, as
+            when the model domain is remeshed. This applies when the datasets are created.
+
     Raises:
         TypeError: if `snapshot` is not a suitable mapping type
         ValueError: if saving fails due to incompatible data types
@@ -68,17 +72,19 @@ def save_snapshot(fpath, snapshot, compression = 6, shuffle = True):
 
     logger.debug('Saving snapshot ({}) to {}'.format(snapshot.keys(), fpath))
     with hdf.File(fpath, libver='latest') as hf:
-        _save_nested_dict(snapshot, hf, compression=compression, shuffle=shuffle)
+        _save_nested_dict(snapshot, hf, variable_length=variable_length,
+                          compression=compression, shuffle=shuffle)
     logger.debug('Snapshot saved in {}'.format(fpath))
 
 
-def _save_nested_dict(D, root, **kwargs):
+def _save_nested_dict(D, root, variable_length = False, **kwargs):
     """
     Recursively traverse the nested dictionary and save data and metadata into a mirrored hierarchy
 
     Args:
         D (dict): A possibly nested dictionary with special keys
         root (:class:`h5py:Group`): Reference to a node within the state hierarchy
+        variable_length (bool): Whether 1D data is saved as variable-length rows
 
     """
     logger = logging.getLogger(__name__)
@@ -117,7 +123,8 @@ def _save_nested_dict(D, root, **kwargs):
         # logger.debug('data shape={} dtype={}'.format(dsdata.shape, dsdata.dtype))
         # logger.debug('data:metadata: {}'.format(dsmeta))
         try:
-            _save_data(root, dsdata, dsmeta, name='data', **kwargs)
+            _save_data(root, dsdata, dsmeta, name='data', variable_length=variable_length,
+                       **kwargs)
         except IOError:
             logger.error('Error saving {} data {}: {}'.format(root, root['data'], dsdata.shape))
             raise
@@ -145,15 +152,31 @@ def _save_nested_dict(D, root, **kwargs):
     # now traverse the rest of the keys which are not popped
     for k in D:
         grp = root.require_group(k)
-        _save_nested_dict(D[k], grp, **kwargs)
+        _save_nested_dict(D[k], grp, variable_length=variable_length, **kwargs)
 
 
-def _save_data(root, data, meta, name = 'data', **kwargs):
+def _save_data(root, data, meta, name = 'data', variable_length = False, **kwargs):
     """
     Commit the data to the `root` node under the given `name`, and resize the target
     :class:`h5py:Dataset` accordingly. The dataset is created, if it doesn't exist.
+
+    If `variable_length` is set and the data is 1D, the dataset is created with a variable-length
+    dtype, so that each row can have a different length.
     """
-    if 'data' not in root:
+    if 'data' not in root and variable_length and data.ndim == 1:
+        dtype = hdf.special_dtype(vlen=data.dtype)
+        ds = root.create_dataset(name,
+                                 shape=(1,),
+                                 maxshape=(None,),
+                                 chunks=(5,),
+                                 dtype=dtype,
+                                 **kwargs
+                                 )
+        ds[0] = data
+        if meta:
+            ds.attrs.update(meta)
+
+    elif 'data' not in root:
         maxshape = (None,) + data.shape
         chunks = (5,) + tuple([25 for _ in range(len(data.shape))])
         ds = root.create_dataset(name,
@@ -6,12 +6,16 @@ from __future__ import division
 import importlib
 import logging
 import math
-import time
+from timeit import default_timer
 from collections import deque
 
 from fipy import PhysicalField, Variable
 
+from .cycles import DielCycleMonitor
+from .remesh import conservative_remap, refine_cell_sizes, remesh_indicator
+from .state import StateBuffer
 from ..utils import CreateMixin, snapshot_var
+from ..utils.timing import PhaseTimer
 
 
 class Simulation(CreateMixin):
@@ -49,6 +53,12 @@ class Simulation(CreateMixin):
                  fipy_solver = 'scipy',
                  max_sweeps = 50,
                  max_residual = 1e-14,
+                 cycle_tolerance = None,
+                 cycle_stop = True,
+                 numeric_time = False,
+                 remesh_interval = None,
+                 remesh_threshold = 0.05,
+                 remesh_max_cell_size = None,
                  ):
         """
         Args:
@@ -75,6 +85,32 @@ class Simulation(CreateMixin):
             fipy_solver (str): Name of the fipy solver to use. One of ``('scipy', 'trilinos',
                 'pysparse')`` (default: "scipy")
 
+            cycle_tolerance (None, float): If given, the relative change of the equation
+                variables between successive diel periods of the model irradiance is monitored
+                through a :class:`.DielCycleMonitor`, and the periodic steady state is considered
+                reached when the change is below this value (default: None)
+
+            cycle_stop (bool): Whether the evolution should stop once the periodic steady
+                state is reached (default: True). If False, only :attr:`.cycle_converged` is set.
+
+            numeric_time (bool): If True, the time quantities are converted once to plain
+                seconds when the evolution starts, and the evolution loop runs on floats. The
+                physical quantities such as :attr:`.simtime_step` are updated only when snapshots
+                are yielded (default: False)
+
+            remesh_interval (None, float, PhysicalField): If given, the duration in seconds of
+                the model clock between adapting the domain mesh to the solution through
+                :meth:`.remesh`. The cells are not refined below the initial cell size of the
+                domain, so the remeshing only refines again the regions it coarsened earlier.
+                The graphic exporter does not support remeshing. (default: None)
+
+            remesh_threshold (float): The refinement indicator (see
+                :func:`~microbenthos.model.remesh.remesh_indicator`) above which cells are
+                split. Cells are merged where it is below a quarter of this. (default: 0.05)
+
+            remesh_max_cell_size (None, float, PhysicalField): The largest cell size when
+                coarsening the mesh, in mm if a plain number (default: None)
+
         """
         super(Simulation, self).__init__()
         # the __init__ call is deliberately empty. will implement cooeperative inheritance only
@@ -82,6 +118,7 @@ class Simulation(CreateMixin):
         self.logger = logging.getLogger(__name__)
         self._started = False
         self._solver = None
+        self._state_buffer = None
 
         self._fipy_solver = None
         self.fipy_solver = fipy_solver
@@ -114,10 +151,60 @@ class Simulation(CreateMixin):
 
         self._residualQ = deque([], maxlen=10)
 
+        #: the :class:`~microbenthos.utils.timing.PhaseTimer` of the phases of the evolution
+        self.timer = PhaseTimer()
+
         self._max_sweeps = None
         self.max_sweeps = max_sweeps
         self._sweepsQ = deque([], maxlen=5)
 
+        self.cycle_tolerance = None
+        if cycle_tolerance is not None:
+            cycle_tolerance = float(cycle_tolerance)
+            if not (0 < cycle_tolerance < 1):
+                raise ValueError('cycle_tolerance should be in (0, 1), not {}'.format(
+                    cycle_tolerance))
+            #: tolerance for detecting the periodic steady state of the diel cycle
+            self.cycle_tolerance = cycle_tolerance
+
+        #: flag whether the evolution should stop on reaching the periodic steady state
+        self.cycle_stop = bool(cycle_stop)
+        #: the :class:`.DielCycleMonitor` created if :attr:`.cycle_tolerance` is set
+        self.cycle_monitor = None
+        #: flag that is set once the periodic steady state is reached
+        self.cycle_converged = False
+
+        #: flag to run the evolution loop on plain float seconds
+        self.numeric_time = bool(numeric_time)
+        self._clock_s = None
+        self._step_s = None
+        self._lims_s = None
+        self._total_s = None
+        self._snapshot_s = None
+        self._prev_snapshot_s = None
+        #: flag that a snapshot is due regardless of the interval, as at the end of the cycles
+        self._snapshot_forced = False
+        self._track_budget = True
+
+        #: the model clock duration between remeshing, or None to keep the mesh fixed
+        self.remesh_interval = None
+        if remesh_interval is not None:
+            self.remesh_interval = PhysicalField(remesh_interval, 's')
+            if self.remesh_interval.numericValue <= 0:
+                raise ValueError('remesh_interval should be > 0, not {}'.format(remesh_interval))
+
+        self.remesh_threshold = float(remesh_threshold)
+        if not (0 < self.remesh_threshold < 1):
+            raise ValueError('remesh_threshold should be in (0, 1), not {}'.format(
+                remesh_threshold))
+
+        self.remesh_max_cell_size = None
+        if remesh_max_cell_size is not None:
+            self.remesh_max_cell_size = PhysicalField(remesh_max_cell_size, 'mm')
+
+        self._remesh_min_size = None
+        self._prev_remesh_s = None
+
         self._model = None
 
     @property
@@ -408,9 +495,173 @@ class Simulation(CreateMixin):
         """
         solver_module = importlib.import_module('fipy.solvers.{}'.format(self.fipy_solver))
         Solver = getattr(solver_module, 'DefaultSolver')
-        self._solver = Solver()
+        self._solver = solver = Solver()
+
+        # time the solution of the linear system in each sweep, apart from its assembly
+        solve = solver._solve
+        timer = self.timer
+
+        def timed_solve(*args, **kwargs):
+            with timer.phase('sweep.solve'):
+                return solve(*args, **kwargs)
+
+        solver._solve = timed_solve
         self.logger.debug('Created fipy {} solver: {}'.format(self.fipy_solver, self._solver))
 
+    def _create_cycle_monitor(self):
+        """
+        Create the :attr:`.cycle_monitor` for the diel period of the model irradiance, if
+        :attr:`.cycle_tolerance` is set.
+        """
+        self.cycle_monitor = None
+        self.cycle_converged = False
+        if self.cycle_tolerance is None:
+            return
+
+        try:
+            I = self.model.get_object('env.irradiance')
+            period = I.hours_total
+        except (ValueError, AttributeError):
+            self.logger.warning('No irradiance in model to determine diel period. Cycle '
+                                'convergence will not be monitored!')
+            return
+
+        self.cycle_monitor = DielCycleMonitor(period=period, tolerance=self.cycle_tolerance)
+        self.logger.info('Monitoring diel cycle convergence: {}'.format(self.cycle_monitor))
+
+    def _clock_seconds(self):
+        """
+        Returns:
+            float: the model clock time in seconds
+        """
+        if self.numeric_time and self._clock_s is not None:
+            return self._clock_s
+        return float(self.model.clock().inUnitsOf('s').value)
+
+    def _setup_numeric_time(self):
+        """
+        Resolve the time quantities of the simulation into plain float seconds for the
+        evolution loop when :attr:`.numeric_time` is set.
+        """
+        def seconds(val):
+            return float(PhysicalField(val, 's').inUnitsOf('s').value)
+
+        self._lims_s = tuple(seconds(v) for v in self.simtime_lims)
+        self._total_s = seconds(self.simtime_total)
+        self._step_s = seconds(self.simtime_step)
+        self._snapshot_s = seconds(self.snapshot_interval)
+        self._clock_s = seconds(self.model.clock())
+
+        equations = getattr(self.model, 'equations', None) or {}
+        self._track_budget = any(getattr(eqn, 'track_budget', False)
+                                 for eqn in equations.values())
+
+        self.logger.debug('Numeric time setup: clock={}s step={}s lims={}s total={}s '
+                          'snapshot={}s'.format(self._clock_s, self._step_s, self._lims_s,
+                                                self._total_s, self._snapshot_s))
+
+    def _sync_numeric_time(self):
+        """
+        Update the physical time quantities of the simulation from the plain float seconds
+        used in the evolution loop
+        """
+        self._simtime_step = PhysicalField(self._step_s, 's')
+
+    def _check_cycle(self):
+        """
+        Sample the equation variables in the :attr:`.cycle_monitor` if a new diel period has
+        started, and update :attr:`.cycle_converged`.
+
+        Returns:
+            bool: True if the periodic steady state has been reached
+        """
+        clock = self._clock_seconds()
+        if not self.cycle_monitor.is_due(clock):
+            return self.cycle_converged
+
+        profiles = {eqn.varpath: eqn.var.numericValue for eqn in self.model.equations.values()}
+        self.cycle_monitor.update(clock, profiles)
+
+        if self.cycle_monitor.converged and not self.cycle_converged:
+            self.cycle_converged = True
+            self.logger.warning('Periodic steady state reached at clock {}: cycle change {:.3g} '
+                                '< {:.3g}'.format(self.model.clock, self.cycle_monitor.residual,
+                                                  self.cycle_tolerance))
+
+        return self.cycle_converged
+
+    def remesh_due(self):
+        """
+        Returns:
+            bool: True if :attr:`.remesh_interval` is set and has elapsed since the last remesh
+        """
+        if self.remesh_interval is None or self._prev_remesh_s is None:
+            return False
+        elapsed = self._clock_seconds() - self._prev_remesh_s
+        return elapsed >= float(self.remesh_interval.inUnitsOf('s').value)
+
+    def remesh(self):
+        """
+        Adapt the domain mesh of the model to the current solution. The cells are refined and
+        coarsened through :func:`.refine_cell_sizes` based on the :func:`.remesh_indicator` of
+        the equation variables and their sources, keeping the sediment surface in place. The
+        cells are not refined below the cell size of the domain when the evolution started, so
+        only the regions coarsened earlier can be refined again. If the mesh changes, the model is replaced by its :meth:`~.MicroBenthosModel.remeshed` copy,
+        and the profiles of the last cycle in the :attr:`.cycle_monitor` are remapped onto the
+        new mesh.
+
+        Returns:
+            bool: True if the model was remeshed
+        """
+        self._prev_remesh_s = self._clock_seconds()
+        domain = self.model.domain
+
+        profiles = []
+        for eqn in self.model.equations.values():
+            profiles.append(eqn.var.numericValue)
+            if eqn.sources_total is not None:
+                profiles.append(eqn.sources_total.numericValue)
+
+        sizes = domain.cell_sizes.inUnitsOf('mm').value
+        max_size = None
+        if self.remesh_max_cell_size is not None:
+            max_size = float(self.remesh_max_cell_size.inUnitsOf('mm').value)
+
+        new_sizes, face_map = refine_cell_sizes(
+            sizes, remesh_indicator(profiles),
+            threshold=self.remesh_threshold,
+            min_size=self._remesh_min_size,
+            max_size=max_size,
+            fixed_faces=(domain.idx_surface,))
+
+        if len(new_sizes) == len(sizes):
+            self.logger.debug('Mesh of {} cells unchanged by remesh'.format(len(sizes)))
+            return False
+
+        self.logger.info('Remeshing model from {} to {} cells at clock {}'.format(
+            len(sizes), len(new_sizes), self.model.clock))
+        model = self.model.remeshed(new_sizes)
+        assert model.domain.idx_surface == face_map[domain.idx_surface]
+
+        self._model = model
+        model.timer = self.timer
+        self._state_buffer = StateBuffer(model.full_eqn._vars)
+        if self.cycle_monitor is not None:
+            self.cycle_monitor.remap_profiles(
+                lambda value: conservative_remap(value, sizes, new_sizes))
+        model.update_vars()
+        return True
+
+    def _dynamic_domain(self, state):
+        """
+        Convert the static domain arrays in the model snapshot into time series, since they
+        change when the model is remeshed
+        """
+        for node in state.get('domain', {}).values():
+            if isinstance(node, dict) and 'data_static' in node:
+                node['data'] = node.pop('data_static')
+        return state
+
     def run_timestep(self):
         """
         Evolve the model through a single timestep
@@ -421,8 +672,11 @@ class Simulation(CreateMixin):
         if self.model is None:
             raise RuntimeError('Simulation model is None, cannot run timestep')
 
-        dt = self.simtime_step
-        self.logger.info('Running timestep {} + {}'.format(self.model.clock, dt))
+        numeric = self.numeric_time and self._clock_s is not None
+        dt = self._step_s if numeric else self.simtime_step
+        debug = self.logger.isEnabledFor(logging.DEBUG)
+        if self.logger.isEnabledFor(logging.INFO):
+            self.logger.info('Running timestep {} + {}'.format(self.model.clock, dt))
 
         num_sweeps = 0
         res = 100.0
@@ -433,17 +687,26 @@ class Simulation(CreateMixin):
 
         res_target = self.residual_target
 
+        if self._state_buffer is not None:
+            self._state_buffer.save()
+
+        timer = self.timer
         while (res > res_target) and (num_sweeps < self.max_sweeps) \
             and retry:
 
             try:
+                tic = default_timer()
+                solved = timer.total('sweep.solve')
                 res = EQN.sweep(
                     solver=self._solver,
-                    dt=float(dt.numericValue)
+                    dt=dt if numeric else float(dt.numericValue)
                     )
+                timer.add('sweep.assemble',
+                          default_timer() - tic - (timer.total('sweep.solve') - solved))
                 num_sweeps += 1
                 res = float(res)
-                self.logger.debug('Sweeps: {}  residual: {:.2g}'.format(num_sweeps, res))
+                if debug:
+                    self.logger.debug('Sweeps: {}  residual: {:.2g}'.format(num_sweeps, res))
 
             except RuntimeError:
                 self.logger.warning(
@@ -451,15 +714,12 @@ class Simulation(CreateMixin):
                         dt, num_sweeps, res))
                 fails += 1
 
-                for var in EQN._vars:
-                    self.logger.info('Setting {!r} to old value'.format(var))
-                    var.value = var.old.copy()
-
-                dt = self.simtime_step = self.simtime_lims[0]
+                self.reject_timestep()
+                dt = self._step_s if numeric else self.simtime_step
                 num_sweeps = 1
                 res_target = self.max_residual
                 self.logger.warning('Retrying with timestep {} residual_target {:.2g}'.format(
-                    self.simtime_step, self.max_residual))
+                    dt, self.max_residual))
 
                 if fails == 2:
                     retry = False
@@ -472,11 +732,37 @@ class Simulation(CreateMixin):
                 'Recovered with timestep {} - sweeps={} res={:.2g}'.format(
                     dt, num_sweeps, res))
 
-        self.model.update_vars()
-        self.model.update_equations(dt)
+        with timer.phase('update_vars'):
+            self.model.update_vars()
+        with timer.phase('update_equations'):
+            if not numeric:
+                self.model.update_equations(dt)
+            elif self._track_budget:
+                self.model.update_equations(PhysicalField(dt, 's'))
 
         return res, num_sweeps
 
+    def reject_timestep(self):
+        """
+        Reject the current time step by rolling back the equation variables to their values at
+        the start of the step, and reducing the :attr:`.simtime_step` to the minimum limit.
+
+        If the evolution has set up the state buffer, then the values are copied back in-place
+        from it. Otherwise, the variables are set to their old values.
+        """
+        if self._state_buffer is not None and self._state_buffer.saved:
+            self.logger.info('Restoring {} from state buffer'.format(self._state_buffer))
+            self._state_buffer.restore()
+        else:
+            for var in self.model.full_eqn._vars:
+                self.logger.info('Setting {!r} to old value'.format(var))
+                var.value = var.old.copy()
+
+        if self.numeric_time and self._clock_s is not None:
+            self._step_s = self._lims_s[0]
+        else:
+            self.simtime_step = self.simtime_lims[0]
+
     def evolution(self):
         """
         Evolves the model clock through the time steps for the simulation, i.e. by calling
@@ -505,47 +791,82 @@ class Simulation(CreateMixin):
         self.logger.debug('Solving: {}'.format(self.model.full_eqn))
 
         self._create_solver()
+        self.model.timer = self.timer
+        self._create_cycle_monitor()
+        self._state_buffer = StateBuffer(self.model.full_eqn._vars)
+        numeric = self.numeric_time
+        if numeric:
+            self._setup_numeric_time()
         self._started = True
         self.logger.info('Simulation evolution starting')
 
         self.model.update_vars()
 
         self._prev_snapshot = Variable(self.model.clock.copy(), name='prev_snapshot')
+        self._prev_snapshot_s = self._clock_s
+        if self.remesh_interval is not None:
+            self._remesh_min_size = float(self.model.domain.cell_size.inUnitsOf('mm').value)
+            self._prev_remesh_s = self._clock_seconds()
         step = 0
 
-        while self.model.clock() <= self.simtime_total:
-            self.logger.debug('Running step #{} {}'.format(step, self.model.clock))
+        while (self._clock_s <= self._total_s) if numeric else \
+            (self.model.clock() <= self.simtime_total):
+            # the level is checked each step, since it may be changed while the evolution runs
+            debug = self.logger.isEnabledFor(logging.DEBUG)
+            if debug:
+                self.logger.debug('Running step #{} {}'.format(step, self.model.clock))
 
-            tic = time.time()
+            tic = default_timer()
             residual, num_sweeps = self.run_timestep()
-            toc = time.time()
+            toc = default_timer()
+            self.timer.add('step', toc - tic)
 
             self._sweepsQ.appendleft(num_sweeps)
             self._residualQ.appendleft(residual)
             step += 1
 
+            # the time step used in the step, before it is adapted for the next one
+            dt = self._step_s if numeric else float(self.simtime_step.inUnitsOf('s').value)
             self.update_simtime_step(residual, num_sweeps)
 
             calc_time = 1000 * (toc - tic)
-            self.logger.debug('Time step {} done in {:.2f} msec'.format(
-                self.simtime_step, calc_time))
+            if debug:
+                self.logger.debug('Time step {} done in {:.2f} msec'.format(
+                    self.simtime_step, calc_time))
+
+            cycle_done = False
+            if self.cycle_monitor is not None:
+                cycle_done = self._check_cycle() and self.cycle_stop
 
+            # the state at the periodic steady state is always a full snapshot, so that it
+            # reaches all the exporters
+            self._snapshot_forced = cycle_done
             if self.snapshot_due():
 
-                self.logger.debug('Snapshot in step #{}'.format(step))
+                if debug:
+                    self.logger.debug('Snapshot in step #{}'.format(step))
+                if numeric:
+                    self._sync_numeric_time()
 
-                state = self.get_state(
-                    state=self.model.snapshot(),
-                    calc_time=calc_time,
-                    residual=residual,
-                    num_sweeps=num_sweeps
-                    )
+                with self.timer.phase('snapshot'):
+                    state = self.get_state(
+                        state=self.model.snapshot(),
+                        calc_time=calc_time,
+                        residual=residual,
+                        num_sweeps=num_sweeps,
+                        dt=dt
+                        )
 
                 yield (step, state)
 
                 # now set the prev_snapshot so that snapshot_due() will remain true for processing
-                self._prev_snapshot.setValue(self.model.clock.copy())
-                self.logger.debug('Prev snapshot set: {}'.format(self._prev_snapshot))
+                self._snapshot_forced = False
+                if numeric:
+                    self._prev_snapshot_s = self._clock_s
+                else:
+                    self._prev_snapshot.setValue(self.model.clock.copy())
+                if debug:
+                    self.logger.debug('Prev snapshot set: {}'.format(self._prev_snapshot))
 
             else:
                 # create a minimal state
@@ -553,12 +874,26 @@ class Simulation(CreateMixin):
                 state = self.get_state(
                     calc_time=calc_time,
                     residual=residual,
-                    num_sweeps=num_sweeps
+                    num_sweeps=num_sweeps,
+                    dt=dt
                     )
 
                 yield (step, state)
 
-            self.model.clock.increment_time(self.simtime_step)
+            if cycle_done:
+                self.logger.warning('Stopping evolution at periodic steady state')
+                break
+
+            with self.timer.phase('clock'):
+                if numeric:
+                    self._clock_s += self._step_s
+                    self.model.clock.set_seconds(self._clock_s)
+                else:
+                    self.model.clock.increment_time(self.simtime_step)
+
+            if self.remesh_due():
+                with self.timer.phase('remesh'):
+                    self.remesh()
 
         # state = self.get_state(
         #     calc_time=calc_time,
@@ -568,20 +903,51 @@ class Simulation(CreateMixin):
         # yield (step + 1, state)
 
         self.logger.info('Simulation evolution completed')
+        if numeric:
+            self._sync_numeric_time()
+            self._clock_s = None
+        self._state_buffer = None
         self._started = False
 
+    def aevolution(self, executor = None):
+        """
+        Asynchronous version of :meth:`.evolution`, which runs the steps in an executor so that
+        an :mod:`asyncio` event loop is not blocked. This requires python 3.5+.
+
+        Args:
+            executor (None, :class:`concurrent.futures.Executor`): the executor of the steps.
+                If None, a single thread executor is used.
+
+        Returns:
+            :class:`~microbenthos.model.aio.AsyncEvolution`: an asynchronous iterator of the
+            `(step, state)` tuples, which can be paused, resumed and cancelled
+
+        Example:
+
+            .. code-block:: python
+
+                async for step, state in simulation.aevolution():
+                    ...
+
+        """
+        from .aio import AsyncEvolution
+        return AsyncEvolution(self, executor=executor)
+
     def get_state(self, state = None, metrics = None, **kwargs):
         """
         Get the state of the simulation evolution
 
         Args:
             state (None, dict): If state is given (from ``model.snapshot()``), then that is used.
-                If None, then just the time info is created by using :attr:`.model.clock`.
+                If None, then just the time info is created by using :attr:`.model.clock`. If
+                :attr:`.remesh_interval` is set, the static domain arrays of the state are
+                turned into time series, since the mesh changes during the evolution.
 
             metrics (None, dict): a dict to get the simulation metrics from, else from `kwargs`
 
             **kwargs: parameters to build metrics dict. Currently the keys `"calc_time"`,
-                `"residual"` and `"num_sweeps"` are used, if available.
+                `"residual"`, `"num_sweeps"` and `"dt"` (the time step of the step in seconds)
+                are used, if available.
 
         Returns:
             dict: the simulation state
@@ -592,6 +958,8 @@ class Simulation(CreateMixin):
             state = dict(
                 time=dict(data=snapshot_var(self.model.clock))
                 )
+        elif self.remesh_interval is not None:
+            state = self._dynamic_domain(state)
 
         if metrics is None:
             metrics = dict(
@@ -602,8 +970,14 @@ class Simulation(CreateMixin):
                     data=(kwargs.get('residual', 0.0), None)),
                 num_sweeps=dict(
                     data=(kwargs.get('num_sweeps', 0), None)),
+                dt=dict(
+                    data=(kwargs.get('dt', 0.0), dict(unit='s'))),
                 )
 
+            if self.cycle_monitor is not None:
+                metrics['cycle_residual'] = dict(
+                    data=(self.cycle_monitor.residual, None))
+
         state['metrics'] = metrics
         return state
 
@@ -611,8 +985,12 @@ class Simulation(CreateMixin):
         """
         Returns:
             bool: If the current model clock time has exceeded :attr:`.snapshot_interval` since
-                the last snapshot time
+                the last snapshot time, or if the evolution stops at the periodic steady state
         """
+        if self._snapshot_forced:
+            return True
+        if self.numeric_time and self._clock_s is not None:
+            return self._clock_s - self._prev_snapshot_s >= self._snapshot_s
         return self.model.clock() - self._prev_snapshot() >= self.snapshot_interval
 
     def update_simtime_step(self, residual, num_sweeps):
@@ -630,15 +1008,46 @@ class Simulation(CreateMixin):
             num_sweeps (int): the number of sweeps from the last equation step
 
         """
-        self.logger.debug('Updating step {} after {}/{} sweeps and {:.3g}/{:.3g} residual'.format(
-            self.simtime_step, num_sweeps, self.max_sweeps, residual, self.residual_target
-            ))
+        debug = self.logger.isEnabledFor(logging.DEBUG)
+        info = self.logger.isEnabledFor(logging.INFO)
+        if debug:
+            self.logger.debug(
+                'Updating step {} after {}/{} sweeps and {:.3g}/{:.3g} residual'.format(
+                    self.simtime_step, num_sweeps, self.max_sweeps, residual,
+                    self.residual_target))
+
+        mult = self._step_multiplier(residual, num_sweeps)
+
+        if self.numeric_time and self._clock_s is not None:
+            lmin, lmax = self._lims_s
+            old_step = self._step_s
+            new_step = min(max(old_step * max(0.01, mult), lmin), lmax)
+            new_step = min(new_step, self._total_s - self._clock_s)
+            self._step_s = min(max(new_step, lmin), lmax)
+            if info:
+                self.logger.info('Time-step update {} x {:.2g} = {}'.format(
+                    old_step, mult, self._step_s))
+            return
 
-        # residual_factor = math.log10(self.residual_target / (residual + 1e-30)) * 0.05
+        old_step = self.simtime_step
+        new_step = self.simtime_step * max(0.01, mult)
+        self.simtime_step = min(new_step, self.simtime_total - self.model.clock())
+        if info:
+            self.logger.info('Time-step update {} x {:.2g} = {}'.format(
+                old_step, mult, self.simtime_step))
+        if debug:
+            self.logger.debug('Updated simtime_step: {}'.format(self.simtime_step))
+
+    def _step_multiplier(self, residual, num_sweeps):
+        """
+        Determine the multiplicative factor for the time-step from the residual and number of
+        sweeps of the last time step. See :meth:`.update_simtime_step`.
 
+        Returns:
+            float: the multiplier
+        """
         alpha = 0.8
         Smax = self.max_sweeps
-        old_step = self.simtime_step
         num_sweeps = max(1.0, num_sweeps)
         mult = 1.0
         restarget = self.residual_target
@@ -661,10 +1070,4 @@ class Simulation(CreateMixin):
                     else:
                         mult = 0.75
 
-
-        new_step = self.simtime_step * max(0.01, mult)
-        self.simtime_step = min(new_step, self.simtime_total - self.model.clock())
-        self.logger.info('Time-step update {} x {:.2g} = {}'.format(
-            old_step, mult, self.simtime_step))
-
-        self.logger.debug('Updated simtime_step: {}'.format(self.simtime_step))
+        return mult
@@ -0,0 +1,146 @@
+"""
+Module with helpers to manage the numerical state of the model variables in-place, without
+re-allocating arrays in the evolution loop.
+"""
+
+from collections import namedtuple
+
+from fipy import PhysicalField
+from fipy.tools import numerix as np
+
+#: An entry of the registry of stateful variables of a model, with the clip limits in the units
+#: of the variable
+StatefulVar = namedtuple('StatefulVar', 'path var clip_min clip_max')
+
+
+def var_array(var):
+    """
+    Return the numeric array that backs the value of a :class:`fipy.CellVariable`.
+
+    The returned array is the storage of the variable itself, so modifying it in-place changes
+    the variable. Callers that do so must then call ``var._markFresh()`` so that dependent
+    variables are recalculated.
+
+    Args:
+        var (:class:`fipy.CellVariable`): a variable that holds its own value (not an operator)
+
+    Returns:
+        :class:`numpy.ndarray`: the backing array in the units of the variable
+    """
+    value = var._value
+    if isinstance(value, PhysicalField):
+        value = value.value
+    return value
+
+
+def update_old(var):
+    """
+    In-place equivalent of :meth:`fipy.CellVariable.updateOld` that copies the current values
+    into the existing array of the old value. Falls back to :meth:`updateOld` if the values are
+    not stored in compatible arrays.
+
+    Args:
+        var (:class:`fipy.CellVariable`): variable with ``hasOld=True``
+
+    Raises:
+        AssertionError: if the variable does not have an old value, as fipy does.
+    """
+    old = var._old
+    if old is not None:
+        src = var_array(var)
+        dst = var_array(old)
+        if isinstance(src, np.ndarray) and isinstance(dst, np.ndarray) and \
+            src.shape == dst.shape:
+            np.copyto(dst, src)
+            old._markFresh()
+            return
+    var.updateOld()
+
+
+def as_var_units(var, limit):
+    """
+    Convert a limit value to a plain number in the units of the variable
+
+    Args:
+        var (:class:`fipy.CellVariable`): the variable
+        limit (None, float, PhysicalField): the limit value. Plain numbers are returned as is.
+
+    Returns:
+        The limit as a number in units of `var`, or as is if not a :class:`PhysicalField`
+    """
+    if isinstance(limit, PhysicalField):
+        if limit.unit.isDimensionless():
+            return float(limit.value)
+        return float(limit.inUnitsOf(var.unit).value)
+    return limit
+
+
+def clip_var(var, clip_min = None, clip_max = None):
+    """
+    Clip the values of the variable in-place
+
+    Args:
+        var (:class:`fipy.CellVariable`): the variable
+        clip_min (None, float, PhysicalField): the lower limit. Plain numbers are taken to be in
+            the units of the variable.
+        clip_max (None, float, PhysicalField): the upper limit
+
+    """
+    if clip_min is None and clip_max is None:
+        return
+    arr = var_array(var)
+    if not isinstance(arr, np.ndarray) or arr.dtype.kind != 'f':
+        var.value = np.clip(var.value, clip_min, clip_max)
+        return
+
+    np.clip(arr, as_var_units(var, clip_min), as_var_units(var, clip_max), out=arr)
+    var._markFresh()
+
+
+class StateBuffer(object):
+    """
+    A preallocated buffer to save and restore the values of a set of variables.
+
+    The buffer arrays are created once, and :meth:`save` and :meth:`restore` only copy the values
+    between the variables and the buffers. This is used by the :class:`~microbenthos.Simulation`
+    to roll back the model variables when a time step has to be rejected.
+    """
+
+    def __init__(self, variables):
+        """
+        Args:
+            variables (iterable): the :class:`fipy.CellVariable` instances to buffer
+        """
+        #: the tuple of variables being buffered
+        self.variables = tuple(variables)
+        self._buffers = tuple(np.empty_like(var_array(v)) for v in self.variables)
+        #: flag to indicate that a state has been saved into the buffers
+        self.saved = False
+
+    def __repr__(self):
+        return 'StateBuffer({})'.format(','.join(str(v.name) for v in self.variables))
+
+    def __len__(self):
+        return len(self.variables)
+
+    def save(self):
+        """
+        Copy the current values of the variables into the buffers
+        """
+        for var, buf in zip(self.variables, self._buffers):
+            np.copyto(buf, var_array(var))
+        self.saved = True
+
+    def restore(self):
+        """
+        Copy the buffered values back into the variables
+
+        Raises:
+            RuntimeError: if no state has been saved yet
+        """
+        if not self.saved:
+            raise RuntimeError('No state saved in buffer to restore from')
+
+        for var, buf in zip(self.variables, self._buffers):
+            np.copyto(var_array(var), buf)
+            var._markFresh()
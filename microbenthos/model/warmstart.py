@@ -0,0 +1,249 @@
+"""
+Module for a library of pre-equilibrated model states, to initialize new runs from.
+
+Runs in a parameter sweep or a calibration often reach nearly the same equilibrium. The
+:class:`WarmStartStore` saves the states of converged runs in a HDF file, keyed by the
+fingerprint of the model structure (:func:`model_fingerprint`) and the vector of the model
+parameters (:func:`model_parameters`). A new run is then initialized from the stored state
+nearest in parameter space, instead of the `seed` profiles of its variables.
+"""
+
+import hashlib
+import logging
+import os
+from collections import OrderedDict
+
+import h5py as hdf
+from fipy import PhysicalField
+from fipy.tools import numerix as np
+
+from ..core.process import Process
+from .remesh import domain_faces, remap_var, state_variables
+from .state import update_old
+
+
+def model_parameters(model):
+    """
+    Collect the parameters of the processes in the model as a flat vector. These are all the
+    indexed processes, whether entities of the environment (such as ``"env.aero_respire"``) or
+    processes of the microbes. Quantities are converted to base units, and non-numeric
+    parameters are skipped.
+
+    Args:
+        model (:class:`~microbenthos.MicroBenthosModel`): the model
+
+    Returns:
+        :class:`~collections.OrderedDict`: mapping of ``"<process path>.<param>"`` to float
+    """
+    params = OrderedDict()
+    for path, obj in sorted(model.find_objects('*').items()):
+        if not isinstance(obj, Process):
+            continue
+        for name, value in sorted(obj.params.items()):
+            if isinstance(value, PhysicalField):
+                value = value.inBaseUnits().value
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                continue
+            params['{}.{}'.format(path, name)] = value
+    return params
+
+
+def model_fingerprint(model, param_names = None):
+    """
+    Compute a fingerprint of the model structure, from the paths and units of its state
+    variables (see :func:`~microbenthos.model.remesh.state_variables`) and the names of its
+    parameters. The domain mesh is not part of the fingerprint, as stored states are remapped
+    onto the model domain.
+
+    Args:
+        model (:class:`~microbenthos.MicroBenthosModel`): the model
+        param_names (None, list): the names of the parameters. If None, the keys of
+            :func:`model_parameters`.
+
+    Returns:
+        str: a hex digest
+    """
+    if param_names is None:
+        param_names = model_parameters(model).keys()
+
+    parts = ['{}:{}'.format(path, var.unit.name()) for path, var in state_variables(model)]
+    parts.extend(sorted(param_names))
+    return hashlib.sha1('\n'.join(parts).encode('utf-8')).hexdigest()[:16]
+
+
+def parameter_distance(params, other):
+    """
+    Distance between two parameter vectors, as the euclidean norm of the relative differences
+    of the parameters, so that parameters of different magnitudes are weighted equally.
+
+    Args:
+        params (array): parameter vector
+        other (array): parameter vector of the same length
+
+    Returns:
+        float: the distance
+    """
+    params = np.asarray(params, dtype=float)
+    other = np.asarray(other, dtype=float)
+    scale = np.maximum(np.abs(params), np.abs(other))
+    diff = np.abs(params - other)
+    rel = np.where(scale > 0, diff / np.where(scale > 0, scale, 1), 0)
+    return float(np.sqrt((rel ** 2).sum()))
+
+
+class WarmStartStore(object):
+    """
+    A library of model states in a HDF file, to warm-start new runs from.
+
+    The states are stored in the file as::
+
+        /<fingerprint>/<index>/
+            attrs: params, clock
+            faces: face coordinates of the mesh in mm, with the sediment surface at 0
+            vars/<path>: values of the state variable with attr unit
+
+    where the `fingerprint` is from :func:`model_fingerprint` and the `params` attribute holds
+    the vector from :func:`model_parameters`, in the order of the `param_names` attribute of
+    the fingerprint group.
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str): path to the HDF file of the store, which is created on the first
+                :meth:`.save`. If it is a directory, the file ``warmstart.h5`` in it is used.
+        """
+        self.logger = logging.getLogger(__name__)
+
+        if os.path.isdir(path):
+            path = os.path.join(path, 'warmstart.h5')
+        #: path to the HDF file of the store
+        self.path = path
+
+    def __repr__(self):
+        return 'WarmStartStore({!r})'.format(self.path)
+
+    def __len__(self):
+        if not os.path.exists(self.path):
+            return 0
+        with hdf.File(self.path, 'r') as hf:
+            return sum(len(group) for group in hf.values())
+
+    def save(self, model, params = None):
+        """
+        Save the current state of the model in the store
+
+        Args:
+            model (:class:`~microbenthos.MicroBenthosModel`): the model with a converged state
+            params (None, dict): the parameter vector to key the state by. If None,
+                :func:`model_parameters` of the model.
+
+        Returns:
+            str: the path of the saved entry in the store
+        """
+        if params is None:
+            params = model_parameters(model)
+        names = sorted(params)
+        fingerprint = model_fingerprint(model, param_names=names)
+
+        with hdf.File(self.path, 'a') as hf:
+            if fingerprint not in hf:
+                group = hf.create_group(fingerprint)
+                group.attrs['param_names'] = np.array(names, dtype=hdf.special_dtype(vlen=str))
+            group = hf[fingerprint]
+
+            entry = group.create_group(str(len(group)))
+            entry.attrs['params'] = np.array([params[n] for n in names], dtype=float)
+            entry.attrs['clock'] = float(model.clock().inUnitsOf('s').value)
+            entry.create_dataset('faces', data=domain_faces(model.domain))
+
+            variables = entry.create_group('vars')
+            for path, var in state_variables(model):
+                value = var.value
+                if isinstance(value, PhysicalField):
+                    value = value.value
+                ds = variables.create_dataset(path, data=np.asarray(value, dtype=float))
+                ds.attrs['unit'] = var.unit.name()
+
+            name = entry.name
+
+        self.logger.info('Saved warm-start state {} in {}'.format(name, self))
+        return name
+
+    def nearest(self, model, params = None):
+        """
+        Find the stored state of the same model structure nearest to the parameters
+
+        Args:
+            model (:class:`~microbenthos.MicroBenthosModel`): the model
+            params (None, dict): the parameter vector. If None, :func:`model_parameters` of
+                the model.
+
+        Returns:
+            tuple: `(entry, distance)` with the path of the entry in the store and its
+            :func:`parameter_distance`, or None if no state of the model structure is stored
+        """
+        if not os.path.exists(self.path):
+            return None
+
+        if params is None:
+            params = model_parameters(model)
+        names = sorted(params)
+        fingerprint = model_fingerprint(model, param_names=names)
+        vector = [params[n] for n in names]
+
+        best = None
+        with hdf.File(self.path, 'r') as hf:
+            if fingerprint not in hf:
+                return None
+            for entry in hf[fingerprint].values():
+                distance = parameter_distance(vector, entry.attrs['params'])
+                if best is None or distance < best[1]:
+                    best = (entry.name, distance)
+
+        return best
+
+    def warm_start(self, model, params = None, max_distance = None):
+        """
+        Initialize the model from the stored state nearest to its parameters (see
+        :meth:`.nearest`). The state variables are remapped conservatively onto the model
+        domain, and their old values are updated. The model clock is not changed.
+
+        Args:
+            model (:class:`~microbenthos.MicroBenthosModel`): the model to initialize
+            params (None, dict): the parameter vector. If None, :func:`model_parameters` of
+                the model.
+            max_distance (None, float): the largest parameter distance of a state to use
+
+        Returns:
+            str: the path of the entry used, or None if there is no stored state to use
+        """
+        found = self.nearest(model, params=params)
+        if found is None:
+            self.logger.info('No warm-start state for model in {}'.format(self))
+            return None
+
+        name, distance = found
+        if max_distance is not None and distance > max_distance:
+            self.logger.info('Nearest warm-start state {} at distance {:.3g} > {}'.format(
+                name, distance, max_distance))
+            return None
+
+        new_faces = domain_faces(model.domain)
+        with hdf.File(self.path, 'r') as hf:
+            entry = hf[name]
+            faces = entry['faces'][()]
+            variables = entry['vars']
+            for path, var in state_variables(model):
+                if path not in variables:
+                    self.logger.warning('No warm-start data for {}'.format(path))
+                    continue
+                ds = variables[path]
+                remap_var(PhysicalField(ds[()], ds.attrs['unit']), faces, new_faces, var)
+                if getattr(var, '_old', None) is not None:
+                    update_old(var)
+
+        self.logger.info('Warm-started model from {} at distance {:.3g}'.format(name, distance))
+        return name
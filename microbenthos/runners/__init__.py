@@ -1 +1,6 @@
-from .simulate import SimulationRunner
+from ..utils.lazy_import import lazy_attributes
+
+lazy_attributes(__name__, {
+    'SimulationRunner': '.simulate',
+    'SensitivityRunner': '.sensitivity',
+    })
@@ -0,0 +1,32 @@
+"""
+Module to run a :class:`~microbenthos.runners.SimulationRunner` in an :mod:`asyncio` event
+loop.
+
+This module is python 3 only: it uses the ``async`` syntax of python 3.5+, so it cannot be
+imported on python 2. It is imported on demand by :meth:`.SimulationRunner.arun`.
+"""
+
+from ..model.aio import AsyncEvolution
+
+
+async def run_async(runner, evolution = None, executor = None):
+    """
+    Coroutine of :meth:`.SimulationRunner.arun`
+
+    Args:
+        runner (:class:`~microbenthos.runners.SimulationRunner`): the runner
+        evolution (None, :class:`~microbenthos.model.aio.AsyncEvolution`): the evolution to
+            drive. If None, one is created with the `executor`.
+        executor (None, :class:`concurrent.futures.Executor`): the executor of the steps
+    """
+    runner.start_run()
+
+    if evolution is None:
+        evolution = AsyncEvolution(runner.simulation, executor=executor)
+
+    with runner.exporters_activated():
+        async with evolution:
+            async for num, state in evolution:
+                await evolution.submit(runner.export_step, num, state)
+
+    runner.finish_run()
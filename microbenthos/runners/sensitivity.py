@@ -0,0 +1,684 @@
+"""
+Module to run a global sensitivity analysis of model outputs to the model parameters, such as
+the `params` of processes, the domain porosity or the irradiance parameters.
+
+The parameters are sampled with a design from :mod:`microbenthos.utils.sensitivity`, the model
+is run for each sample in a pool of processes, and the outputs are computed from the final
+model snapshot of each run. The outputs of each sample are cached in the output directory, so
+that an interrupted study resumes with the samples that are missing.
+"""
+
+import copy
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import traceback
+from timeit import default_timer
+
+import numpy as np
+from fipy import PhysicalField
+
+from ..utils import yaml, validate_dict
+from ..utils.loader import definition_hash
+from ..utils.sensitivity import DESIGNS
+from .simulate import DUMP_KWARGS
+
+# numpy 2 renamed trapz to trapezoid
+_trapezoid = getattr(np, 'trapezoid', None) or np.trapz
+
+
+def get_definition_value(definition, path):
+    """
+    Get a value from a nested definition
+
+    Args:
+        definition (dict): the definition, such as with the keys `model` and `simulation`
+        path (str): the dotted path of keys, or indices of lists, such as
+            ``"model.environment.aero_respire.init_params.params.Vmax"``
+
+    Returns:
+        the value at the path
+
+    Raises:
+        KeyError: if the path does not exist
+    """
+    node = definition
+    for part in path.split('.'):
+        try:
+            node = node[int(part) if isinstance(node, list) else part]
+        except (KeyError, IndexError, ValueError, TypeError):
+            raise KeyError('Path {!r} not found in definition at {!r}'.format(path, part))
+    return node
+
+
+def set_definition_value(definition, path, value):
+    """
+    Set a value in a nested definition, at a path that exists
+
+    Args:
+        definition (dict): the definition
+        path (str): the dotted path as for :func:`get_definition_value`
+        value: the value to set
+
+    Raises:
+        KeyError: if the path does not exist
+    """
+    parent, _, key = path.rpartition('.')
+    node = get_definition_value(definition, parent) if parent else definition
+    if isinstance(node, list):
+        key = int(key)
+    elif key not in node:
+        raise KeyError('Path {!r} not found in definition at {!r}'.format(path, key))
+    node[key] = value
+
+
+def _snapshot_node(state, path):
+    node = state
+    for part in path.split('.'):
+        node = node[part]
+    return node
+
+
+def _snapshot_data(state, path):
+    """
+    Get the data array and unit at a dotted path of a model snapshot
+    """
+    node = _snapshot_node(state, path)
+    for key in ('data', 'data_static'):
+        if key in node:
+            data, meta = node[key]
+            return np.asarray(data, dtype=float), (meta or {}).get('unit', '')
+    raise KeyError('No data at {!r} of the snapshot'.format(path))
+
+
+def _depths(state):
+    depths, unit = _snapshot_data(state, 'domain.depths')
+    if unit and unit != 'm':
+        depths = PhysicalField(depths, unit).inUnitsOf('m').value
+    # with remeshing, the domain data is a time series
+    return depths[-1] if depths.ndim > 1 else depths
+
+
+def _profile(state, path):
+    data, unit = _snapshot_data(state, path)
+    return (data[-1] if data.ndim > 1 else data), unit
+
+
+def output_integral(state, output):
+    """
+    The depth integral of the profile at the `path` of the snapshot, in the sediment if
+    `sediment` is True. The value is in the unit of the profile times meter.
+    """
+    values, unit = _profile(state, output['path'])
+    depths = _depths(state)
+    if output.get('sediment', True):
+        mask = depths >= 0
+        values, depths = values[mask], depths[mask]
+    return float(_trapezoid(values, depths))
+
+
+def output_penetration(state, output):
+    """
+    The depth (m) below the sediment surface at which the profile at the `path` of the
+    snapshot first falls below the `threshold`, linearly interpolated between the cells. If
+    it does not, this is the depth of the domain bottom.
+    """
+    values, unit = _profile(state, output['path'])
+    depths = _depths(state)
+    threshold = output.get('threshold', 0)
+    if isinstance(threshold, PhysicalField):
+        threshold = threshold.inUnitsOf(unit).value
+
+    mask = depths >= 0
+    values, depths = values[mask], depths[mask]
+    below = np.flatnonzero(values < threshold)
+    if not len(below):
+        return float(depths[-1])
+    i = below[0]
+    if i == 0:
+        return float(depths[0])
+    frac = (values[i - 1] - threshold) / (values[i - 1] - values[i])
+    return float(depths[i - 1] + frac * (depths[i] - depths[i - 1]))
+
+
+def output_budget(state, output):
+    """
+    A quantity of the tracked budget of the `equation`, as named by the `field`. The fields
+    `sources_rate` and `transport_rate` are the depth-integrated rates of the last time step.
+    """
+    tracked = _snapshot_node(state, 'equations')[output['equation']]['tracked_budget']
+
+    def value(name):
+        return float(np.asarray(tracked[name]['data'][0], dtype=float))
+
+    field = output.get('field', 'sources_rate')
+    if field.endswith('_rate'):
+        dt = value('time_step')
+        change = value(field[:-5] + '_change')
+        return change / dt if dt > 0 else float('nan')
+    return value(field)
+
+
+def output_value(state, output):
+    """
+    The value at the `path` of the snapshot, reduced to a number by the `reduce` function
+    (`mean`, `min` or `max`) if it is a profile
+    """
+    values, unit = _profile(state, output['path'])
+    return float(getattr(np, output.get('reduce', 'mean'))(values))
+
+
+#: the functions to compute the outputs from a snapshot, by the output kind
+OUTPUT_KINDS = dict(
+    integral=output_integral,
+    penetration=output_penetration,
+    budget=output_budget,
+    value=output_value,
+    )
+
+
+def snapshot_outputs(state, outputs):
+    """
+    Compute the outputs from a model snapshot
+
+    Args:
+        state (dict): the model snapshot
+        outputs (list): the output definitions, with the `name`, the `kind` of
+            :data:`OUTPUT_KINDS` and its options
+
+    Returns:
+        dict: the output values by name. An output that cannot be computed is NaN.
+    """
+    logger = logging.getLogger(__name__)
+    values = {}
+    for output in outputs:
+        try:
+            values[output['name']] = OUTPUT_KINDS[output['kind']](state, output)
+        except (KeyError, IndexError, TypeError, ValueError):
+            logger.warning('Could not compute output {!r}'.format(output['name']), exc_info=True)
+            values[output['name']] = float('nan')
+    return values
+
+
+def run_model(definition, outputs):
+    """
+    Run the simulation of a model definition to the end, and compute the outputs from the
+    final snapshot
+
+    Args:
+        definition (dict): with the `model` and `simulation` definitions
+        outputs (list): the output definitions for :func:`snapshot_outputs`
+
+    Returns:
+        dict: the output values by name
+    """
+    from ..model import MicroBenthosModel, Simulation
+
+    model = MicroBenthosModel.create_from(definition['model'])
+    simulation = Simulation.create_from(definition.get('simulation') or {})
+    simulation.model = model
+
+    for step in simulation.evolution():
+        pass
+
+    state = simulation.get_state(state=model.snapshot())
+    return snapshot_outputs(state, outputs)
+
+
+#: the definition and outputs of the study in a worker process
+_WORKER = {}
+
+
+def _init_worker(definition, outputs, loglevel = None):
+    _WORKER['definition'] = definition
+    _WORKER['outputs'] = outputs
+    if loglevel is not None:
+        logging.getLogger('microbenthos').setLevel(loglevel)
+
+
+def _evaluate(task):
+    """
+    Evaluate a sample of the study in a worker
+
+    Args:
+        task (tuple): the sample index and a list of ``(path, value)`` of the parameters
+
+    Returns:
+        dict: the `index`, `outputs`, `error` message if the run failed, and the `duration`
+    """
+    index, values = task
+    start = default_timer()
+
+    definition = copy.deepcopy(_WORKER['definition'])
+    for path, value in values:
+        set_definition_value(definition, path, value)
+
+    try:
+        outputs = run_model(definition, _WORKER['outputs'])
+        error = None
+    except Exception:
+        outputs = dict((o['name'], float('nan')) for o in _WORKER['outputs'])
+        error = traceback.format_exc()
+
+    return dict(index=index, outputs=outputs, error=error, duration=default_timer() - start)
+
+
+class SensitivityRunner(object):
+    """
+    Class that runs a sensitivity study of a model, as defined by a `sensitivity` definition
+    with the keys:
+
+        * `method`: the sampling design, ``morris`` or ``saltelli``
+        * `samples`: the number of trajectories (Morris) or base samples (Saltelli)
+        * `levels`: the grid levels of the Morris design
+        * `seed`: the seed of the design
+        * `parameters`: a list of parameters, each with the `path` in the definition (such as
+          ``model.domain.init_params.porosity``), the `bounds`, and the flags `relative` (the
+          bounds are factors of the nominal value) and `log` (sample in log space)
+        * `outputs`: a list of outputs computed from the final model snapshot, each with a
+          `name`, the `kind` (``integral``, ``penetration``, ``budget`` or ``value``) and its
+          options (see :data:`OUTPUT_KINDS`)
+
+    The output directory holds:
+
+        * ``definition.yml``: the model, simulation and sensitivity definitions
+        * ``study.yml``: the study with the resolved parameters and the design seed
+        * ``design.npy``: the samples of the design in the unit hypercube
+        * ``runs/<index>.json``: the outputs of each sample, written as it completes, or the
+          error of a failed sample, which is run again by the next :meth:`.run`
+        * ``indices.yml``: the sensitivity indices of each output, from :meth:`.analyze`
+
+    """
+    DEFINITION_FILE = 'definition.yml'
+    STUDY_FILE = 'study.yml'
+    DESIGN_FILE = 'design.npy'
+    RUNS_DIR = 'runs'
+    INDICES_FILE = 'indices.yml'
+
+    def __init__(self, model, study, simulation = None, output_dir = None, processes = None,
+                 overwrite = False):
+        """
+        Args:
+            model (dict): the model definition
+            study (dict): the sensitivity definition
+            simulation (None, dict): the simulation definition
+            output_dir (None, str): the output directory of the study
+            processes (None, int): the number of worker processes. If None, the number of CPUs.
+                If 1, the samples are run in this process.
+            overwrite (bool): whether to discard the cached runs of a different study in the
+                output directory
+
+        Raises:
+            ValueError: if the study definition is invalid, or the parameters do not fit the
+                definition
+        """
+        self.logger = logging.getLogger(__name__)
+        self.logger.info('Initializing {}'.format(self))
+
+        self.output_dir = output_dir or '.'
+        self.processes = int(processes or multiprocessing.cpu_count())
+        self.overwrite = overwrite
+
+        #: the definitions of the study as given, which are saved in the output directory
+        self.inputs = copy.deepcopy(dict(model=model, simulation=simulation or {},
+                                         sensitivity=study))
+        #: hash of the definitions, to check the cached runs
+        self.digest = definition_hash(self.inputs)
+
+        self.definition = dict(model=copy.deepcopy(model),
+                               simulation=copy.deepcopy(simulation or {}))
+        self.study = validate_dict(study, key='sensitivity')
+
+        self.parameters = [self._resolve_parameter(p) for p in self.study['parameters']]
+        names = [p['name'] for p in self.parameters]
+        if len(set(names)) < len(names):
+            raise ValueError('Parameter names should be unique, so set the name: {}'.format(
+                names))
+        self.outputs = self.study['outputs']
+        self._setup_outputs()
+
+        self.seed = self.study['seed']
+        self.design = None
+        self.samples = None
+
+    def __repr__(self):
+        return 'SensitivityRunner'
+
+    @classmethod
+    def from_output_dir(cls, output_dir, **kwargs):
+        """
+        Create the runner of the study in an output directory, such as to analyze it
+
+        Args:
+            output_dir (str): the output directory of a study
+            **kwargs: passed to the init of the class
+
+        Returns:
+            :class:`SensitivityRunner`: the runner
+        """
+        with open(os.path.join(output_dir, cls.DEFINITION_FILE)) as fp:
+            defs = yaml.load(fp, Loader=yaml.Loader)
+        return cls(model=defs['model'], study=defs['sensitivity'],
+                   simulation=defs.get('simulation'), output_dir=output_dir, **kwargs)
+
+    def _resolve_parameter(self, param):
+        param = dict(param)
+        path = param['path']
+        try:
+            nominal = get_definition_value(self.definition, path)
+        except KeyError as e:
+            raise ValueError(str(e))
+
+        if isinstance(nominal, PhysicalField):
+            unit = nominal.unit.name()
+            nominal_value = float(nominal.value)
+        elif isinstance(nominal, (int, float)) and not isinstance(nominal, bool):
+            unit = None
+            nominal_value = float(nominal)
+        else:
+            raise ValueError('Parameter {!r} is not a number: {!r}'.format(path, nominal))
+
+        bounds = []
+        for b in param['bounds']:
+            if isinstance(b, PhysicalField):
+                if param['relative'] or unit is None:
+                    raise ValueError('Bounds of {!r} should be numbers'.format(path))
+                b = float(b.inUnitsOf(unit).value)
+            bounds.append(float(b) * (nominal_value if param['relative'] else 1))
+
+        low, high = sorted(bounds)
+        if low == high:
+            raise ValueError('Bounds of {!r} are empty: {}'.format(path, param['bounds']))
+        if param['log'] and low * high <= 0:
+            raise ValueError('Log bounds of {!r} should have the same sign: {}'.format(
+                path, param['bounds']))
+
+        param.update(name=param.get('name') or path.split('.')[-1], nominal=nominal_value,
+                     unit=unit, low=low, high=high)
+        return param
+
+    def _setup_outputs(self):
+        names = [o['name'] for o in self.outputs]
+        if len(set(names)) < len(names):
+            raise ValueError('Output names should be unique: {}'.format(names))
+
+        for output in self.outputs:
+            kind = output['kind']
+            required = 'equation' if kind == 'budget' else 'path'
+            if not output.get(required):
+                raise ValueError('Output {!r} of kind {} needs the {}'.format(
+                    output['name'], kind, required))
+
+            if kind == 'budget':
+                # the budget is tracked only when set on the equation
+                equations = self.definition['model'].get('equations', {})
+                if output['equation'] not in equations:
+                    raise ValueError('Output {!r}: no equation {!r} in the model'.format(
+                        output['name'], output['equation']))
+                equations[output['equation']]['track_budget'] = True
+
+    def parameter_values(self, sample):
+        """
+        Scale a sample of the unit hypercube to the parameter values
+
+        Args:
+            sample (:class:`numpy.ndarray`): a row of the design
+
+        Returns:
+            list: the values of the parameters, as numbers in their units
+        """
+        values = []
+        for param, u in zip(self.parameters, sample):
+            low, high = param['low'], param['high']
+            if param['log']:
+                sign = np.sign(low)
+                low, high = np.log10(abs(low)), np.log10(abs(high))
+                values.append(float(sign * 10 ** (low + u * (high - low))))
+            else:
+                values.append(float(low + u * (high - low)))
+        return values
+
+    def _task(self, index):
+        values = []
+        for param, value in zip(self.parameters, self.parameter_values(self.samples[index])):
+            if param['unit'] is not None:
+                value = PhysicalField(value, param['unit'])
+            values.append((param['path'], value))
+        return index, values
+
+    @property
+    def study_path(self):
+        return os.path.join(self.output_dir, self.STUDY_FILE)
+
+    @property
+    def design_path(self):
+        return os.path.join(self.output_dir, self.DESIGN_FILE)
+
+    @property
+    def runs_dir(self):
+        return os.path.join(self.output_dir, self.RUNS_DIR)
+
+    def run_path(self, index):
+        """
+        Returns:
+            str: the path of the cached outputs of a sample
+        """
+        return os.path.join(self.runs_dir, '{:06d}.json'.format(index))
+
+    def load_design(self):
+        """
+        Load the design of the study from the output directory, to resume or analyze the study
+
+        Returns:
+            bool: True if the design was loaded, or False if the output directory has no study
+
+        Raises:
+            ValueError: if the output directory has a different study
+        """
+        if not os.path.exists(self.study_path):
+            return False
+
+        with open(self.study_path) as fp:
+            cached = yaml.load(fp, Loader=yaml.Loader)
+
+        if cached.get('digest') != self.digest or not os.path.exists(self.design_path):
+            raise ValueError('Output directory {} has a different study'.format(
+                self.output_dir))
+
+        self.seed = cached['seed']
+        self._create_design()
+        self.samples = np.load(self.design_path)
+        self.logger.info('Loaded study with {} of {} samples done'.format(
+            len(self.completed()), len(self.samples)))
+        return True
+
+    def prepare_design(self):
+        """
+        Create the design of the study, or load it from the output directory to resume the
+        study
+
+        Raises:
+            ValueError: if the output directory has a different study and :attr:`.overwrite`
+                is not set
+        """
+        try:
+            if self.load_design():
+                return
+        except ValueError:
+            if not self.overwrite:
+                raise ValueError('Output directory {} has a different study. Use a new '
+                                 'directory or set overwrite.'.format(self.output_dir))
+            self.logger.warning('Discarding the runs of the different study in {}'.format(
+                self.output_dir))
+            if os.path.isdir(self.runs_dir):
+                shutil.rmtree(self.runs_dir)
+
+        if self.seed is None:
+            self.seed = int(np.random.randint(2 ** 31 - 1))
+        self._create_design()
+        self.samples = self.design.sample()
+
+        if not os.path.isdir(self.runs_dir):
+            os.makedirs(self.runs_dir)
+        np.save(self.design_path, self.samples)
+        with open(os.path.join(self.output_dir, self.DEFINITION_FILE), 'w') as fp:
+            yaml.dump(self.inputs, fp, **DUMP_KWARGS)
+        with open(self.study_path, 'w') as fp:
+            yaml.dump(self.get_info(), fp, **DUMP_KWARGS)
+
+    def _create_design(self):
+        cls = DESIGNS[self.study['method']]
+        num_params = len(self.parameters)
+        if cls.method == 'morris':
+            self.design = cls(num_params, trajectories=self.study['samples'],
+                              levels=self.study['levels'], seed=self.seed)
+        else:
+            self.design = cls(num_params, base_samples=self.study['samples'], seed=self.seed)
+        self.logger.info('Created design: {}'.format(self.design))
+
+    def get_info(self):
+        """
+        Returns:
+            dict: the study info that is saved in the output directory
+        """
+        params = []
+        for p in self.parameters:
+            params.append(dict(name=p['name'], path=p['path'], unit=p['unit'],
+                               nominal=p['nominal'], low=p['low'], high=p['high'],
+                               log=p['log']))
+        return dict(
+            digest=self.digest,
+            seed=self.seed,
+            method=self.study['method'],
+            num_samples=self.design.num_samples if self.design else None,
+            parameters=params,
+            outputs=self.outputs,
+            )
+
+    def completed(self):
+        """
+        Returns:
+            set: the indices of the samples with cached outputs, without the failed samples
+        """
+        if not os.path.isdir(self.runs_dir):
+            return set()
+
+        done = set()
+        for f in os.listdir(self.runs_dir):
+            if not (f.endswith('.json') and f[:-5].isdigit()):
+                continue
+            with open(os.path.join(self.runs_dir, f)) as fp:
+                if not json.load(fp).get('error'):
+                    done.add(int(f[:-5]))
+        return done
+
+    def save_result(self, result):
+        """
+        Cache the result of a sample, as written by a complete file
+        """
+        index = result['index']
+        result = dict(result)
+        result['parameters'] = dict(
+            (p['name'], v) for p, v in zip(self.parameters,
+                                           self.parameter_values(self.samples[index])))
+        path = self.run_path(index)
+        with open(path + '.tmp', 'w') as fp:
+            json.dump(result, fp)
+        os.rename(path + '.tmp', path)
+
+    def run(self):
+        """
+        Run the missing and failed samples of the study and compute the indices.
+
+        The samples are run in a pool of :attr:`.processes`, and the outputs of each are cached
+        as it completes. Interrupting the run (such as with Ctrl-C) keeps the completed samples
+        for the next run.
+
+        Returns:
+            dict: the indices from :meth:`.analyze`
+        """
+        if not os.path.isdir(self.output_dir):
+            os.makedirs(self.output_dir)
+        self.prepare_design()
+
+        done = self.completed()
+        pending = [i for i in range(len(self.samples)) if i not in done]
+        self.logger.info('Running {} samples with {} processes'.format(
+            len(pending), self.processes))
+
+        tasks = (self._task(i) for i in pending)
+        failed = 0
+        count = 0
+        if self.processes == 1 or len(pending) <= 1:
+            _init_worker(self.definition, self.outputs)
+            results = (_evaluate(task) for task in tasks)
+            pool = None
+        else:
+            pool = multiprocessing.Pool(self.processes, initializer=_init_worker,
+                                        initargs=(self.definition, self.outputs,
+                                                  logging.WARNING))
+            results = pool.imap_unordered(_evaluate, tasks)
+
+        try:
+            for result in results:
+                self.save_result(result)
+                count += 1
+                if result['error']:
+                    failed += 1
+                    self.logger.warning('Sample #{} failed: {}'.format(
+                        result['index'], result['error'].strip().splitlines()[-1]))
+                self.logger.info('Sample #{} done in {:.1f}s ({}/{})'.format(
+                    result['index'], result['duration'], count, len(pending)))
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+
+        if failed:
+            self.logger.warning('{} of {} samples failed'.format(failed, len(pending)))
+        return self.analyze()
+
+    def load_outputs(self):
+        """
+        Load the cached outputs of the samples
+
+        Returns:
+            dict: mapping of output names to arrays with a value for each sample, which is NaN
+            for missing samples
+        """
+        outputs = dict((o['name'], np.full(len(self.samples), np.nan)) for o in self.outputs)
+        for index in self.completed():
+            with open(self.run_path(index)) as fp:
+                result = json.load(fp)
+            for name, value in result['outputs'].items():
+                if name in outputs and value is not None:
+                    outputs[name][index] = value
+        return outputs
+
+    def analyze(self):
+        """
+        Compute the sensitivity indices of the outputs from the cached runs, and save them to
+        :attr:`.INDICES_FILE`
+
+        Returns:
+            dict: mapping of output names to dicts of parameter names to the indices of the
+            design
+
+        Raises:
+            ValueError: if the output directory has no study
+        """
+        if self.samples is None and not self.load_design():
+            raise ValueError('No study to analyze in {}'.format(self.output_dir))
+
+        indices = {}
+        for name, values in self.load_outputs().items():
+            result = self.design.analyze(self.samples, values)
+            indices[name] = dict(
+                (p['name'], dict((k, float(v[i])) for k, v in result.items()))
+                for i, p in enumerate(self.parameters))
+
+        with open(os.path.join(self.output_dir, self.INDICES_FILE), 'w') as fp:
+            yaml.dump(indices, fp, **DUMP_KWARGS)
+        return indices
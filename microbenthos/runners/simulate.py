@@ -8,8 +8,9 @@ from collections import OrderedDict
 import click
 
 from ..exporters import BaseExporter
-from ..model import MicroBenthosModel, Simulation
+from ..model import MicroBenthosModel, Simulation, WarmStartStore
 from ..utils import yaml, find_subclasses_recursive
+from ..utils.lazy_import import import_all
 from ..utils.log import SIMULATION_DEFAULT_FORMATTER, SIMULATION_DEBUG_FORMATTER
 
 DUMP_KWARGS = dict(
@@ -40,6 +41,8 @@ class SimulationRunner(object):
     def __init__(self,
                  output_dir = None,
                  resume = False,
+                 spinup = None,
+                 warm_start = None,
                  confirm = False,
                  overwrite = False,
                  model = None,
@@ -51,6 +54,7 @@ class SimulationRunner(object):
                  budget = False,
                  exporters = None,
                  show_eqns = False,
+                 quiet = False,
                  ):
         self.logger = logging.getLogger(__name__)
         self.logger.info('Initializing {}'.format(self))
@@ -60,6 +64,8 @@ class SimulationRunner(object):
 
         exporters = exporters or []
         self.exporters = OrderedDict()
+        #: names of the timer phases of the exporters, by exporter name
+        self._export_phases = {}
 
         self.output_dir = output_dir or '.'
         self._log_fh = None
@@ -76,16 +82,18 @@ class SimulationRunner(object):
             overwrite = False
 
         self.resume = resume
+        self.spinup = spinup
+        self.warm_start = warm_start
         self.overwrite = overwrite
         self.confirm = confirm
         self.show_eqns = show_eqns
+        #: flag to log only warnings and errors during the run, which skips formatting the
+        #: debug and info messages in the evolution loop
+        self.quiet = quiet
+        self._log_level = None
 
         # load up exporters
-        from microbenthos.utils import find_subclasses_recursive
-        from microbenthos.exporters import BaseExporter
-
-        self._exporter_classes = {e._exports_: e for e in
-                                  find_subclasses_recursive(BaseExporter)}
+        self._load_exporters()
 
         if model:
             self.model = model
@@ -115,6 +123,14 @@ class SimulationRunner(object):
     def __repr__(self):
         return 'SimulationRunner'
 
+    @property
+    def timings_path(self):
+        """
+        Path of the YAML file in the output directory, to which the
+        :class:`~microbenthos.utils.timing.PhaseTimer` summary of the simulation is written
+        """
+        return os.path.join(self.output_dir, 'timings.yml')
+
     def _check_data_path(self, data_path = None):
 
         data_path = data_path
@@ -162,7 +178,13 @@ class SimulationRunner(object):
         """
         The model to run with the :attr:`simulation`. Typically an instance of
         :class:`~microbenthos.MicroBenthosModel`.
+
+        Once the model is set in the simulation, this is the model of the simulation, which is
+        replaced by a new model when the simulation remeshes it.
         """
+        sim_model = getattr(self._simulation, 'model', None)
+        if sim_model is not None:
+            return sim_model
         return self._model
 
     @model.setter
@@ -194,6 +216,8 @@ class SimulationRunner(object):
             raise RuntimeError('Simulation already set in runner!')
 
     def _load_exporters(self):
+        # the exporter modules are imported lazily, so import them to find the subclasses
+        import_all('microbenthos.exporters')
         self._exporter_classes = {c._exports_: c for c in find_subclasses_recursive(BaseExporter)}
         self.logger.debug("Loaded exporter classes: {}".format(self._exporter_classes.keys()))
 
@@ -297,13 +321,80 @@ class SimulationRunner(object):
             click.secho('Simulation could not be restored from given data file!', fg='red')
             raise  # click.Abort()
 
+    def spinup_simulation(self):
+        """
+        Restore the model from the final state of the model data store at :attr:`.spinup`,
+        which may be from a run on a different domain mesh, through
+        :meth:`~microbenthos.MicroBenthosModel.spinup_from`. The store is not modified.
+        """
+        if not self.spinup:
+            return
+
+        import h5py as hdf
+
+        click.secho('\n\nModel spin-up from {}'.format(self.spinup), fg='yellow')
+        try:
+            with hdf.File(self.spinup, 'r') as store:
+                self.model.spinup_from(store)
+            click.secho('Model spin-up successful. Clock = {}\n\n'.format(self.model.clock),
+                        fg='green')
+            self.simulation.simtime_step = 1
+        except:
+            click.secho('Simulation could not be spun up from given data file!', fg='red')
+            raise
+
+    def warm_start_simulation(self):
+        """
+        Initialize the model from the nearest state in the :class:`.WarmStartStore` at
+        :attr:`.warm_start`, if any
+        """
+        if not self.warm_start:
+            return
+
+        entry = WarmStartStore(self.warm_start).warm_start(self.model)
+        if entry:
+            click.secho('Model warm-started from {}'.format(entry), fg='green')
+        else:
+            click.secho('No warm-start state found for model', fg='yellow')
+
+    def save_warm_start(self, completed = True):
+        """
+        Save the final model state in the :class:`.WarmStartStore` at :attr:`.warm_start`.
+
+        If the simulation monitors the diel cycle, the state is saved only if the cycle
+        converged. Otherwise, it is saved only if the evolution ran to completion.
+
+        Args:
+            completed (bool): whether the evolution ran to completion, and was not interrupted
+        """
+        if not self.warm_start:
+            return
+
+        if self.simulation.cycle_tolerance is not None:
+            if not self.simulation.cycle_converged:
+                self.logger.warning('Diel cycle not converged, so the model state is not saved '
+                                    'to the warm-start store')
+                return
+        elif not completed:
+            self.logger.warning('Simulation not completed, so the model state is not saved to '
+                                'the warm-start store')
+            return
+
+        WarmStartStore(self.warm_start).save(self.model)
+
     def setup_logfile(self, mode = 'a'):
         """
         Setup log file in the output directory
         """
         logfile = os.path.join(self.output_dir, 'simulation.log')
         logger = logging.getLogger(__name__.split('.')[0])
-        lvl = 20
+        lvl = 30 if self.quiet else 20
+
+        if self.quiet:
+            # the package logger is set to DEBUG on import, so the level guards in the evolution
+            # only take effect once it is raised
+            self._log_level = logger.level
+            logger.setLevel(lvl)
 
         fh = self._log_fh = logging.FileHandler(logfile, mode=mode)
         fh.setLevel(lvl)
@@ -318,6 +409,9 @@ class SimulationRunner(object):
         self.logger.debug('Ending simulation logfile!')
         logger = logging.getLogger(__name__.split('.')[0])
         logger.removeHandler(self._log_fh)
+        if self._log_level is not None:
+            logger.setLevel(self._log_level)
+            self._log_level = None
 
     def save_definitions(self):
         """
@@ -364,6 +458,15 @@ class SimulationRunner(object):
         return dict(libraries=library_versions, exporters=exporters, runner=runner)
 
     def check_simulation(self):
+        """
+        Check that the model and simulation are set, and that the exporters support the
+        simulation
+
+        Raises:
+            RuntimeError: if the model or simulation is not set
+            ValueError: if the simulation remeshes the model with a graphic exporter, which
+                plots the profiles on a fixed mesh
+        """
         self.logger.info('Checking simulation')
         required = [self.model, self.simulation]
         if not all([s is not None for s in required]):
@@ -372,6 +475,13 @@ class SimulationRunner(object):
             raise RuntimeError(
                 'Simulation run cannot begin without model and simulation')
 
+        if self.simulation.remesh_interval is not None:
+            graphic = [name for name, exp in self.exporters.items()
+                       if exp._exports_ == 'graphic']
+            if graphic:
+                raise ValueError('Graphic exporters {} do not support remeshing of the '
+                                 'model'.format(graphic))
+
     def prepare_simulation(self):
         """
         Prepare the simulation by setting up the model
@@ -396,17 +506,19 @@ class SimulationRunner(object):
                 self.logger.error('Error in setting up exporter: {}'.format(expname))
                 raise
 
-        yield
-
-        # once context returns
-        self.logger.info('Closing exporters: {}'.format(self.exporters.keys()))
-        for expname, exporter in self.exporters.items():
-            if exporter.started:
-                try:
-                    exporter.close()
-                except:
-                    self.logger.error('Error in closing exporter: {}'.format(expname))
-                    raise
+        try:
+            yield
+
+        finally:
+            # once context returns, or the run is cancelled
+            self.logger.info('Closing exporters: {}'.format(self.exporters.keys()))
+            for expname, exporter in self.exporters.items():
+                if exporter.started:
+                    try:
+                        exporter.close()
+                    except:
+                        self.logger.error('Error in closing exporter: {}'.format(expname))
+                        raise
 
     def get_data_exporters(self):
         return filter(lambda e: e._exports_ == 'model_data', self.exporters.values())
@@ -417,22 +529,90 @@ class SimulationRunner(object):
 
         This performs a sequence of operations:
 
+            * spins up the model from :attr:`.spinup` if set (see :meth:`.spinup_simulation`)
+            * initializes the model from the warm-start store if set (see
+              :meth:`.warm_start_simulation`)
             * shows equations if :attr:`.show_eqns` is set
             * Announces simulation settings in output
             * Runs :meth:`.check_simulation`
             * creates output directory
-            * sets up the logfile
+            * sets up the logfile, at the warning level if :attr:`.quiet` is set
             * saves definitions to yaml outputs of simulation & model
             * saves the runtime info (library, exporter versions etc)
             * prepares the simulation
             * activates the exporter context (see :meth:`.exporters_activated`)
             * iterates over the :meth:`.simulation.evolution` and passes returned state to the
               exporters
+            * writes the timings of the evolution phases to :attr:`.timings_path`
+              periodically and at the end
+            * saves the final state to the warm-start store if set, and the evolution was not
+              interrupted
             * after that tears down the logfile
 
         Raises:
             RuntimeError: if no simulation exists
 
+        See Also:
+            :meth:`.arun` to run the simulation in an :mod:`asyncio` event loop
+
+        """
+        self.start_run()
+
+        completed = True
+        with self.exporters_activated():
+            for step in self.simulation.evolution():
+                try:
+                    # time.sleep(1e-5)
+                    # step is (num, state) is the model snapshot
+                    if step:
+                        num, state = step
+                        self.export_step(num, state)
+                    else:
+                        self.logger.warning('Empty model state received!')
+
+                except KeyboardInterrupt:
+                    self.logger.error("Keyboard interrupt on simulation run!")
+                    completed = False
+                    break
+
+        self.finish_run(completed=completed)
+
+    def arun(self, evolution = None, executor = None):
+        """
+        Run the simulation as :meth:`.run` does, but as a coroutine for an :mod:`asyncio` event
+        loop. The steps and the exports run in an executor, so the event loop is not blocked.
+        Cancelling the task stops the run after the current step, and closes the exporters.
+        This requires python 3.5+.
+
+        Args:
+            evolution (None, :class:`~microbenthos.model.aio.AsyncEvolution`): the evolution
+                to drive, such as to pause it while running. If None, one is created from
+                :meth:`.Simulation.aevolution` with the `executor`.
+            executor (None, :class:`concurrent.futures.Executor`): the executor to run the
+                steps in, if `evolution` is None
+
+        Returns:
+            coroutine: to be awaited or run as a task
+
+        Example:
+
+            .. code-block:: python
+
+                evolution = runner.simulation.aevolution()
+                task = asyncio.ensure_future(runner.arun(evolution))
+                evolution.pause()
+                ...
+                evolution.resume()
+                await task
+
+        """
+        from .aio import run_async
+        return run_async(self, evolution=evolution, executor=executor)
+
+    def start_run(self):
+        """
+        Perform the steps of :meth:`.run` before the evolution, from the spin-up to preparing
+        the simulation
         """
 
         self.logger.debug('Starting simulation run')
@@ -445,6 +625,10 @@ class SimulationRunner(object):
                 'No exporters defined for simulation run. Consider adding "model_data" to export '
                 'data.')
 
+        self.spinup_simulation()
+
+        self.warm_start_simulation()
+
         for dexporter in self.get_data_exporters():
             self.logger.debug('Checking outpath & resume of {}: {}'.format(dexporter,
                                                                            dexporter.outpath))
@@ -500,31 +684,52 @@ class SimulationRunner(object):
 
         warnings.filterwarnings('ignore', category=RuntimeWarning, module='fipy')
 
-        with self.exporters_activated():
-            for step in self.simulation.evolution():
-                try:
-                    # time.sleep(1e-5)
-                    # step is (num, state) is the model snapshot
-                    if step:
-                        num, state = step
+    def export_step(self, num, state):
+        """
+        Pass the state of an evolution step to the exporters. The eager exporters get every
+        step, and the others only the snapshots.
+
+        Args:
+            num (int): the step number
+            state (dict): the state from the evolution
+        """
+        timer = self.simulation.timer
+        export_due = self.simulation.snapshot_due() or (num == 0)
+        info = self.logger.isEnabledFor(logging.INFO)
+        if info:
+            self.logger.info('Step #{}: Exporting model state'.format(num))
 
-                        export_due = self.simulation.snapshot_due() or (num == 0)
-                        self.logger.info('Step #{}: Exporting model state'.format(num))
+        phases = self._export_phases
+        for expname, exporter in self.exporters.items():
+            if not (export_due or exporter.is_eager):
+                continue
+            if not timer.enabled:
+                exporter.process(num, state)
+                continue
 
-                        for exporter in self.exporters.values():
-                            if export_due:
-                                exporter.process(num, state)
-                            else:
-                                if exporter.is_eager:
-                                    exporter.process(num, state)
+            phase = phases.get(expname)
+            if phase is None:
+                phase = phases[expname] = 'export.{}'.format(expname)
+            with timer.phase(phase):
+                exporter.process(num, state)
 
-                        self.logger.info('Step #{}: Export done'.format(num))
-                    else:
-                        self.logger.warning('Empty model state received!')
+        if info:
+            self.logger.info('Step #{}: Export done'.format(num))
 
-                except KeyboardInterrupt:
-                    self.logger.error("Keyboard interrupt on simulation run!")
-                    break
+        if timer.write_due():
+            timer.write(self.timings_path)
+
+    def finish_run(self, completed = True):
+        """
+        Perform the steps of :meth:`.run` after the evolution, writing the timings, saving
+        the warm-start state and tearing down the logfile
+
+        Args:
+            completed (bool): whether the evolution ran to completion, and was not interrupted
+        """
+        self.simulation.timer.write(self.timings_path)
+
+        self.save_warm_start(completed=completed)
 
         self.teardown_logfile()
         warnings.resetwarnings()
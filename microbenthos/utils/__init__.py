@@ -1,6 +1,15 @@
-from .create import CreateMixin
-from .yaml_setup import yaml
-yaml # this is here so that pycharm doesn't "optimize" away this import
-from .loader import validate_dict, validate_yaml, get_schema, find_subclasses_recursive
-from .snapshotters import snapshot_var, restore_var
+from .lazy_import import lazy_attributes
 
+#: the public attributes, imported from their modules on first access
+ATTRIBUTES = {
+    'CreateMixin': '.create',
+    'yaml': '.yaml_setup',
+    'validate_dict': '.loader',
+    'validate_yaml': '.loader',
+    'get_schema': '.loader',
+    'find_subclasses_recursive': '.loader',
+    'snapshot_var': '.snapshotters',
+    'restore_var': '.snapshotters',
+    }
+
+lazy_attributes(__name__, ATTRIBUTES)
@@ -0,0 +1,90 @@
+"""
+Module to import the attributes of a package lazily, on first access. This keeps the import of
+:mod:`microbenthos` (as for the command line interface) from loading the heavy dependencies,
+such as sympy, fipy, scipy and matplotlib, until a class that needs them is used.
+"""
+
+import importlib
+import sys
+import types
+
+#: the original modules replaced by a :class:`LazyModule` copy on python < 3.5, which are kept
+#: alive since the functions defined in them use their globals
+_REPLACED = []
+
+
+class LazyModule(types.ModuleType):
+    """
+    A module type whose attributes in the mapping ``_lazy_attrs_`` are imported from their
+    submodules on first access, and then cached on the module.
+    """
+
+    def __getattr__(self, name):
+        # only called if the attribute was not found in the module dict
+        attrs = self.__dict__.get('_lazy_attrs_', {})
+        if name not in attrs:
+            raise AttributeError('module {!r} has no attribute {!r}'.format(self.__name__, name))
+
+        module = importlib.import_module(attrs[name], self.__name__)
+        value = getattr(module, name)
+        setattr(self, name, value)
+        return value
+
+    def __dir__(self):
+        return sorted(set(self.__dict__).union(self.__dict__.get('_lazy_attrs_', {})))
+
+
+def lazy_attributes(module_name, attributes):
+    """
+    Make the attributes of a module import lazily from their submodules.
+
+    Example:
+
+        In the ``__init__.py`` of a package:
+
+        .. code-block:: python
+
+            from ..utils.lazy_import import lazy_attributes
+
+            lazy_attributes(__name__, {
+                'MicroBenthosModel': '.model',
+                'Simulation': '.simulation',
+                })
+
+    Args:
+        module_name (str): the name of the module, as in ``sys.modules``
+        attributes (dict): mapping of attribute names to the module to import them from,
+            which may be relative to the module
+
+    Returns:
+        :class:`LazyModule`: the module
+    """
+    module = sys.modules[module_name]
+    try:
+        module.__class__ = LazyModule
+    except TypeError:
+        # python < 3.5 cannot change the class of a module, so it is replaced with a copy
+        lazy = LazyModule(module_name, module.__doc__)
+        lazy.__dict__.update(module.__dict__)
+        _REPLACED.append(module)
+        module = sys.modules[module_name] = lazy
+
+    lazy_attrs = dict(module.__dict__.get('_lazy_attrs_', {}))
+    lazy_attrs.update(attributes)
+    module._lazy_attrs_ = lazy_attrs
+    module.__all__ = sorted(set(getattr(module, '__all__', ())).union(attributes))
+    return module
+
+
+def import_all(module):
+    """
+    Import all the lazy attributes of a module, such as to find all the subclasses of a base
+    class defined in its submodules
+
+    Args:
+        module (:class:`LazyModule`, str): the module or its name
+    """
+    if not isinstance(module, types.ModuleType):
+        module = importlib.import_module(module)
+    for name in sorted(getattr(module, '_lazy_attrs_', ())):
+        getattr(module, name)
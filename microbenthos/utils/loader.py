@@ -1,5 +1,8 @@
+import copy
+import hashlib
 import logging
-from collections import Mapping
+import threading
+from collections import Mapping, OrderedDict
 
 import cerberus
 import pkg_resources
@@ -8,9 +11,94 @@ from sympy import sympify, Symbol
 
 from .yaml_setup import yaml
 
+#: the parsed inbuilt schema, loaded on first use
+_SCHEMA = None
+
+#: validators of the inbuilt schema, by schema key in the attribute `validators`. As the
+#: validators keep the state of a validation, they are not shared between threads.
+_LOCAL = threading.local()
+
+#: validated definitions of the inbuilt schema, by content hash, the least recently used first
+_VALIDATED = OrderedDict()
+_VALIDATED_SIZE = 32
+
+#: results of the custom type checks, by rule and value, the least recently used first
+_TYPE_CHECKS = OrderedDict()
+_TYPE_CHECKS_SIZE = 256
+
+#: lock of the caches, which are shared between the threads
+_CACHE_LOCK = threading.Lock()
+
+
+def _cache_get(cache, key):
+    """
+    Get the value of `key` in the LRU `cache` and mark it as the most recently used
+
+    Raises:
+        KeyError: if the key is not in the cache
+    """
+    with _CACHE_LOCK:
+        value = cache.pop(key)
+        cache[key] = value
+    return value
+
+
+def _cache_put(cache, key, value, size):
+    """
+    Put the `value` of `key` in the LRU `cache`, and drop the least recently used entries
+    beyond `size`
+    """
+    with _CACHE_LOCK:
+        cache.pop(key, None)
+        cache[key] = value
+        while len(cache) > size:
+            cache.popitem(last=False)
+
 
 # TODO: Allow equation with no diffusion term
 
+def _memoized_check(rule, func, value):
+    """
+    Memoize the result of the custom type check `func` for the `value`, as type checks such as
+    sympifying an expression are repeated for the same values across definitions. Values that
+    are not hashable are checked each time.
+    """
+    try:
+        key = (rule, type(value), value)
+        return _cache_get(_TYPE_CHECKS, key)
+    except TypeError:
+        return func(value)
+    except KeyError:
+        result = func(value)
+        _cache_put(_TYPE_CHECKS, key, result, _TYPE_CHECKS_SIZE)
+        return result
+
+
+def _is_sympifyable(value):
+    if not isinstance(value, (str, int, float)):
+        return False
+    try:
+        sympify(value)
+        return True
+    except:
+        return False
+
+
+def _is_symbolable(value):
+    try:
+        return isinstance(sympify(value), Symbol)
+    except:
+        return False
+
+
+def _is_unit_name(value):
+    try:
+        PhysicalField(1, value)
+        return True
+    except TypeError:
+        return False
+
+
 class MicroBenthosSchemaValidator(cerberus.Validator):
     """
     A :mod:`cereberus` validator for schema.yml in MicroBenthos
@@ -66,11 +154,7 @@ class MicroBenthosSchemaValidator(cerberus.Validator):
 
         """
         self.logger.debug('Validating unit_name: {}'.format(value))
-        try:
-            PhysicalField(1, value)
-            return True
-        except TypeError:
-            return False
+        return _memoized_check('unit_name', _is_unit_name, value)
 
     def _validate_like_unit(self, unit, field, value):
         """
@@ -101,25 +185,14 @@ class MicroBenthosSchemaValidator(cerberus.Validator):
         A string that can be run through sympify
         """
         self.logger.debug('Validating sympifyable: {}'.format(value))
-        if not isinstance(value, (str, int, float)):
-            return False
-        try:
-            e = sympify(value)
-            self.logger.debug('Sympified: {}'.format(e))
-            return True
-        except:
-            return False
+        return _memoized_check('sympifyable', _is_sympifyable, value)
 
     def _validate_type_symbolable(self, value):
         """
         String that can be run through sympify and only has one variable symbol in it.
         """
         self.logger.debug('Validating symbolable: {}'.format(value))
-        try:
-            e = sympify(value)
-            return isinstance(e, Symbol)
-        except:
-            return False
+        return _memoized_check('symbolable', _is_symbolable, value)
 
     def _validate_model_store(self, jnk, field, value):
         """
@@ -171,35 +244,94 @@ class MicroBenthosSchemaValidator(cerberus.Validator):
         return float(value)
 
 
-def validate_yaml(stream, key = None, schema = None, schema_stream = None):
+def validate_yaml(stream, key = None, schema = None, schema_stream = None, cached = True):
     logger = logging.getLogger(__name__)
 
     logger.info('Loading definition with yaml')
 
     inp_dict = yaml.load(stream)
 
-    return validate_dict(inp_dict, key=key, schema=schema, schema_stream=schema_stream)
+    return validate_dict(inp_dict, key=key, schema=schema, schema_stream=schema_stream,
+                         cached=cached)
+
 
+def definition_hash(inp_dict, key = None):
+    """
+    Compute a hash of the content of a definition, from its YAML serialization with sorted keys
 
-def validate_dict(inp_dict, key, schema = None, schema_stream = None):
+    Args:
+        inp_dict (dict): the definition
+        key (None, str): the schema key the definition is validated against
+
+    Returns:
+        str: a hex digest
+    """
+    content = yaml.dump(dict(key=key, definition=inp_dict), default_flow_style=False)
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+
+def validate_dict(inp_dict, key, schema = None, schema_stream = None, cached = True):
+    """
+    Validate a definition against the schema
+
+    For the inbuilt schema, the validators are created once per schema key and reused. If
+    `cached` is True, the validated definitions are also stored by their
+    :func:`definition_hash`, so that a definition of the same content is not validated again.
+
+    Args:
+        inp_dict (dict): the definition
+        key (None, str): the key of the schema to validate against
+        schema (None, dict): the schema. If None, the inbuilt schema or from `schema_stream`.
+        schema_stream (None, stream): a stream to load the schema from
+        cached (bool): whether to reuse the validated definitions of the inbuilt schema
+
+    Returns:
+        dict: the validated (normalized) definition
+
+    Raises:
+        ValueError: if the definition is invalid
+        TypeError: if the `schema` is not a mapping
+    """
     logger = logging.getLogger(__name__)
 
     logger.info('Loading definition from: {}'.format(inp_dict.keys()))
 
     logger.debug('Using schema key {!r} from schema_stream={}'.format(key, schema_stream))
-    if schema is None:
-        schema = get_schema(schema_stream=schema_stream)
+    inbuilt = schema is None and schema_stream is None
+
+    digest = None
+    if inbuilt and cached:
+        try:
+            digest = definition_hash(inp_dict, key=key)
+        except yaml.YAMLError:
+            logger.debug('Definition could not be hashed, so it is not cached', exc_info=True)
+        try:
+            cached_validated = _cache_get(_VALIDATED, digest)
+        except KeyError:
+            pass
+        else:
+            logger.info('{} definition already validated: {}'.format(key, digest))
+            return copy.deepcopy(cached_validated)
+
+    if inbuilt:
+        validators = _LOCAL.__dict__.setdefault('validators', {})
+        validator = validators.get(key)
+        if validator is None:
+            schema = _inbuilt_schema()
+            validator = validators[key] = MicroBenthosSchemaValidator(
+                schema[key] if key else schema)
     else:
-        if not isinstance(schema, Mapping):
+        if schema is None:
+            schema = get_schema(schema_stream=schema_stream)
+        elif not isinstance(schema, Mapping):
             raise TypeError('Supplied schema should be a mapping, not {!r}'.format(type(schema)))
 
-    if key:
-        schema = schema[key]
-    logger.debug('Schema with entries: {}'.format(schema.keys()))
-
-    validator = MicroBenthosSchemaValidator()
+        if key:
+            schema = schema[key]
+        logger.debug('Schema with entries: {}'.format(schema.keys()))
+        validator = MicroBenthosSchemaValidator(schema)
 
-    validated = validator.validated(inp_dict, schema)
+    validated = validator.validated(inp_dict)
 
     if not validated:
         logger.propagate = True
@@ -214,9 +346,23 @@ def validate_dict(inp_dict, key, schema = None, schema_stream = None):
 
     else:
         logger.info('{} definition successfully loaded: {}'.format(key, validated.keys()))
+        if digest is not None:
+            _cache_put(_VALIDATED, digest, copy.deepcopy(validated), _VALIDATED_SIZE)
         return validated
 
 
+def clear_validation_cache():
+    """
+    Clear the cached inbuilt schema, validators, validated definitions and type checks
+    """
+    global _SCHEMA
+    _SCHEMA = None
+    _LOCAL.__dict__.pop('validators', None)
+    with _CACHE_LOCK:
+        _VALIDATED.clear()
+        _TYPE_CHECKS.clear()
+
+
 def _denest_errors(D, paths, all_items):
     for k in D:
         # print('descending into {}'.format(k))
@@ -239,18 +385,27 @@ def _denest_errors(D, paths, all_items):
     return all_items
 
 
-def get_schema(schema_stream = None):
+def _inbuilt_schema():
     """
-    Returns the inbuilt model schema
+    Returns the inbuilt schema, which is parsed once and cached
     """
+    global _SCHEMA
+    if _SCHEMA is None:
+        with pkg_resources.resource_stream(__name__, 'schema.yml') as INBUILT:
+            _SCHEMA = yaml.load(INBUILT)
+    return _SCHEMA
+
 
-    # INBUILT = pkg_resources.resource_stream(__name__, 'schema.yml')
+def get_schema(schema_stream = None):
+    """
+    Returns the inbuilt model schema, or the schema loaded from `schema_stream`
+    """
 
     if schema_stream:
         schema = yaml.load(schema_stream)
     else:
-        with pkg_resources.resource_stream(__name__, 'schema.yml') as INBUILT:
-            schema = yaml.load(INBUILT)
+        # a copy, so that changes to it do not leak into the cached schema
+        schema = copy.deepcopy(_inbuilt_schema())
 
     return schema
 
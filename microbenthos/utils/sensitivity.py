@@ -0,0 +1,253 @@
+"""
+Sampling designs and indices for the global sensitivity analysis of the model outputs to its
+parameters. The designs sample the unit hypercube of the parameters, and the indices are
+computed from the model outputs at the samples.
+
+    * :class:`MorrisDesign`: elementary effects along random one-at-a-time trajectories
+      (Morris, 1991), to screen the parameters with few evaluations
+    * :class:`SaltelliDesign`: first-order and total Sobol indices from the Saltelli (2010)
+      scheme, with the Jansen estimator of the total indices
+"""
+
+import logging
+
+import numpy as np
+
+
+class MorrisDesign(object):
+    """
+    The Morris design of elementary effects.
+
+    Each of the :attr:`.trajectories` starts at a random point of a grid of :attr:`.levels` in
+    the unit hypercube, and moves each parameter once, in a random order, by :attr:`.delta`. The
+    elementary effect of a parameter is the change of the output over that move, divided by
+    the step. This takes ``trajectories * (num_params + 1)`` evaluations.
+    """
+    method = 'morris'
+
+    def __init__(self, num_params, trajectories = 10, levels = 4, seed = None):
+        """
+        Args:
+            num_params (int): the number of parameters
+            trajectories (int): the number of trajectories
+            levels (int): the number of grid levels of each parameter, which should be even
+            seed (None, int): seed of the random generator
+
+        Raises:
+            ValueError: if the numbers are too small
+        """
+        self.logger = logging.getLogger(__name__)
+
+        self.num_params = int(num_params)
+        self.trajectories = int(trajectories)
+        self.levels = int(levels)
+        self.seed = seed
+
+        if self.num_params < 1:
+            raise ValueError('num_params should be >= 1, not {}'.format(num_params))
+        if self.trajectories < 2:
+            raise ValueError('trajectories should be >= 2, not {}'.format(trajectories))
+        if self.levels < 2:
+            raise ValueError('levels should be >= 2, not {}'.format(levels))
+
+        #: the step of a parameter in the unit hypercube
+        self.delta = self.levels / (2.0 * (self.levels - 1))
+
+    def __repr__(self):
+        return 'MorrisDesign(params={}, trajectories={}, levels={})'.format(
+            self.num_params, self.trajectories, self.levels)
+
+    @property
+    def num_samples(self):
+        """
+        The number of samples of the design
+        """
+        return self.trajectories * (self.num_params + 1)
+
+    def sample(self):
+        """
+        Returns:
+            :class:`numpy.ndarray`: the samples as rows of the parameter values in [0, 1], with
+            the trajectories one after the other
+        """
+        rng = np.random.RandomState(self.seed)
+        grid = np.linspace(0, 1, self.levels)
+        samples = np.empty((self.num_samples, self.num_params))
+
+        row = 0
+        for _ in range(self.trajectories):
+            x = rng.choice(grid, size=self.num_params)
+            samples[row] = x
+            for i in rng.permutation(self.num_params):
+                row += 1
+                # step up if it stays within the hypercube, else down
+                x = x.copy()
+                x[i] += self.delta if x[i] + self.delta <= 1 + 1e-12 else -self.delta
+                samples[row] = x
+            row += 1
+
+        return samples
+
+    def analyze(self, samples, outputs):
+        """
+        Compute the Morris indices of an output. Trajectories with a non-finite output are
+        left out.
+
+        Args:
+            samples (:class:`numpy.ndarray`): the samples from :meth:`.sample`
+            outputs (:class:`numpy.ndarray`): the output at each sample
+
+        Returns:
+            dict: of arrays with a value for each parameter:
+
+                * `mu`: mean of the elementary effects
+                * `mu_star`: mean of the absolute elementary effects
+                * `sigma`: standard deviation of the elementary effects
+
+        """
+        samples = np.asarray(samples, dtype=float)
+        outputs = np.asarray(outputs, dtype=float)
+        per = self.num_params + 1
+
+        effects = np.full((self.trajectories, self.num_params), np.nan)
+        for t in range(self.trajectories):
+            x = samples[t * per:(t + 1) * per]
+            y = outputs[t * per:(t + 1) * per]
+            if not np.isfinite(y).all():
+                continue
+            dx = np.diff(x, axis=0)
+            moved = np.argmax(np.abs(dx), axis=1)
+            effects[t, moved] = np.diff(y) / dx[np.arange(self.num_params), moved]
+
+        valid = np.isfinite(effects).all(axis=1)
+        if valid.sum() < self.trajectories:
+            self.logger.warning('{} of {} trajectories have invalid outputs'.format(
+                self.trajectories - valid.sum(), self.trajectories))
+        effects = effects[valid]
+
+        return dict(
+            mu=effects.mean(axis=0),
+            mu_star=np.abs(effects).mean(axis=0),
+            sigma=effects.std(axis=0, ddof=1) if len(effects) > 1 else
+            np.full(self.num_params, np.nan),
+            )
+
+
+class SaltelliDesign(object):
+    """
+    The Saltelli design of the Sobol sensitivity indices.
+
+    Two independent matrices `A` and `B` of :attr:`.base_samples` rows are drawn from a
+    scrambled Sobol sequence (or random numbers, if :mod:`scipy.stats.qmc` is not available).
+    The samples are `A`, `B`, and for each parameter `A` with the column of the parameter from
+    `B`. This takes ``base_samples * (num_params + 2)`` evaluations.
+    """
+    method = 'saltelli'
+
+    def __init__(self, num_params, base_samples = 64, seed = None):
+        """
+        Args:
+            num_params (int): the number of parameters
+            base_samples (int): the number of rows of the base matrices, preferably a power
+                of 2
+            seed (None, int): seed of the random generator
+
+        Raises:
+            ValueError: if the numbers are too small
+        """
+        self.logger = logging.getLogger(__name__)
+
+        self.num_params = int(num_params)
+        self.base_samples = int(base_samples)
+        self.seed = seed
+
+        if self.num_params < 1:
+            raise ValueError('num_params should be >= 1, not {}'.format(num_params))
+        if self.base_samples < 2:
+            raise ValueError('base_samples should be >= 2, not {}'.format(base_samples))
+
+    def __repr__(self):
+        return 'SaltelliDesign(params={}, base_samples={})'.format(
+            self.num_params, self.base_samples)
+
+    @property
+    def num_samples(self):
+        """
+        The number of samples of the design
+        """
+        return self.base_samples * (self.num_params + 2)
+
+    def _base(self):
+        N, D = self.base_samples, self.num_params
+        try:
+            from scipy.stats import qmc
+        except ImportError:
+            self.logger.debug('No scipy.stats.qmc, so using random numbers')
+            return np.random.RandomState(self.seed).rand(N, 2 * D)
+
+        sobol = qmc.Sobol(d=2 * D, scramble=True, seed=self.seed)
+        m = int(np.log2(N))
+        if 2 ** m == N:
+            return sobol.random_base2(m)
+        return sobol.random(N)
+
+    def sample(self):
+        """
+        Returns:
+            :class:`numpy.ndarray`: the samples as rows of the parameter values in [0, 1], in
+            the blocks `A`, `B`, `AB_1`, ..., `AB_D`
+        """
+        D = self.num_params
+        base = self._base()
+        A, B = base[:, :D], base[:, D:]
+
+        blocks = [A, B]
+        for i in range(D):
+            AB = A.copy()
+            AB[:, i] = B[:, i]
+            blocks.append(AB)
+        return np.vstack(blocks)
+
+    def analyze(self, samples, outputs):
+        """
+        Compute the Sobol indices of an output. Rows of the base matrices with a non-finite
+        output in any block are left out.
+
+        Args:
+            samples (:class:`numpy.ndarray`): the samples from :meth:`.sample`
+            outputs (:class:`numpy.ndarray`): the output at each sample
+
+        Returns:
+            dict: of arrays with a value for each parameter:
+
+                * `S1`: the first-order index
+                * `ST`: the total index
+
+        """
+        N, D = self.base_samples, self.num_params
+        outputs = np.asarray(outputs, dtype=float).reshape(D + 2, N)
+
+        valid = np.isfinite(outputs).all(axis=0)
+        if valid.sum() < N:
+            self.logger.warning('{} of {} base samples have invalid outputs'.format(
+                N - valid.sum(), N))
+        outputs = outputs[:, valid]
+
+        fA, fB, fAB = outputs[0], outputs[1], outputs[2:]
+        variance = np.var(np.concatenate([fA, fB]))
+        if not variance > 0:
+            self.logger.warning('The output has no variance, so the indices are undefined')
+            nan = np.full(D, np.nan)
+            return dict(S1=nan, ST=nan.copy())
+
+        return dict(
+            S1=np.mean(fB * (fAB - fA), axis=1) / variance,
+            ST=0.5 * np.mean((fA - fAB) ** 2, axis=1) / variance,
+            )
+
+
+#: the designs by their method name
+DESIGNS = {
+    MorrisDesign.method: MorrisDesign,
+    SaltelliDesign.method: SaltelliDesign,
+    }
@@ -35,16 +35,19 @@ def snapshot_var(V, base = False, to_unit = None):
                          exc_info=True)
             raise
 
+        # the values are copied, since the arrays of variables may be updated in place, such
+        # as the reused buffers of the irradiance intensities
         if Vunit != '1':
             unit = var.unit.name()
             arr = np.array(var.value)
 
         else:
-            arr = var
+            # dimensionless variables are expressed as plain arrays
+            arr = np.array(getattr(var, 'value', var))
             unit = Vunit
 
     elif isinstance(V, np.ndarray):
-        arr = V
+        arr = np.array(V)
         unit = '1'
 
     elif isinstance(V, (int, float)):
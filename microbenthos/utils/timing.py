@@ -0,0 +1,174 @@
+"""
+Module for the timing of the phases of a simulation evolution, such as the sweeps, the clock
+hooks and the exporters, aggregated into histograms.
+"""
+
+import logging
+import os
+from contextlib import contextmanager
+from timeit import default_timer
+
+import numpy as np
+
+from .yaml_setup import yaml
+
+#: edges of the histogram bins of the phase durations in milliseconds
+BIN_EDGES_MS = tuple(float('{:.3g}'.format(10 ** e)) for e in np.arange(-3, 6.01, 0.25))
+
+
+class PhaseTimer(object):
+    """
+    Records the durations of named phases, such as ``"sweep.solve"`` or ``"export.model_data"``.
+
+    For each phase, the count, total, minimum and maximum durations are kept, along with a
+    histogram of the durations over the log-spaced :data:`BIN_EDGES_MS`. The durations are
+    measured with :func:`timeit.default_timer`.
+
+    Example:
+
+        .. code-block:: python
+
+            timer = PhaseTimer()
+            with timer.phase('update_vars'):
+                model.update_vars()
+            timer.write('timings.yml')
+
+    """
+
+    def __init__(self, enabled = True, write_interval = 60):
+        """
+        Args:
+            enabled (bool): If False, :meth:`.phase` and :meth:`.add` do nothing
+            write_interval (float): the wall-clock duration in seconds between writes of the
+                timings, as checked by :meth:`.write_due`
+        """
+        self.logger = logging.getLogger(__name__)
+
+        #: flag whether the phases are recorded
+        self.enabled = bool(enabled)
+        self.write_interval = float(write_interval)
+
+        self._edges = np.array(BIN_EDGES_MS) / 1000.0
+        self._phases = {}
+        self._last_write = default_timer()
+
+    def __repr__(self):
+        return 'PhaseTimer({})'.format(len(self._phases))
+
+    def __contains__(self, name):
+        return name in self._phases
+
+    def reset(self):
+        """
+        Clear the recorded phases
+        """
+        self._phases = {}
+
+    def add(self, name, seconds):
+        """
+        Record a duration of a phase
+
+        Args:
+            name (str): name of the phase
+            seconds (float): the duration in seconds
+        """
+        if not self.enabled:
+            return
+
+        record = self._phases.get(name)
+        if record is None:
+            record = self._phases[name] = dict(
+                count=0, total=0.0, min=seconds, max=seconds,
+                counts=np.zeros(len(self._edges) + 1, dtype=int))
+
+        record['count'] += 1
+        record['total'] += seconds
+        if seconds < record['min']:
+            record['min'] = seconds
+        if seconds > record['max']:
+            record['max'] = seconds
+        record['counts'][np.searchsorted(self._edges, seconds)] += 1
+
+    @contextmanager
+    def phase(self, name):
+        """
+        Context manager to record the duration of the enclosed block as a phase. The duration
+        is recorded even if the block raises an exception.
+
+        Args:
+            name (str): name of the phase
+        """
+        if not self.enabled:
+            yield
+            return
+
+        tic = default_timer()
+        try:
+            yield
+        finally:
+            self.add(name, default_timer() - tic)
+
+    def total(self, name):
+        """
+        Returns:
+            float: the total duration of the phase in seconds, or 0 if it is not recorded
+        """
+        record = self._phases.get(name)
+        return record['total'] if record else 0.0
+
+    def count(self, name):
+        """
+        Returns:
+            int: the number of recorded durations of the phase
+        """
+        record = self._phases.get(name)
+        return record['count'] if record else 0
+
+    def names(self):
+        """
+        Returns:
+            list: the names of the recorded phases
+        """
+        return list(self._phases)
+
+    def summary(self):
+        """
+        Summarize the recorded phases
+
+        Returns:
+            dict: with the key `bin_edges_ms`, and `phases` which maps each phase name to a dict
+            of `count`, `total_s`, `mean_ms`, `min_ms`, `max_ms` and the histogram `counts`
+            over the bins. The first and last bins count the durations outside the edges.
+        """
+        phases = {}
+        for name, record in self._phases.items():
+            phases[name] = dict(
+                count=record['count'],
+                total_s=float(record['total']),
+                mean_ms=1000.0 * record['total'] / record['count'],
+                min_ms=1000.0 * record['min'],
+                max_ms=1000.0 * record['max'],
+                counts=record['counts'].tolist(),
+                )
+        return dict(bin_edges_ms=list(BIN_EDGES_MS), phases=phases)
+
+    def write_due(self):
+        """
+        Returns:
+            bool: True if :attr:`.write_interval` has elapsed since the last :meth:`.write`
+        """
+        return self.enabled and default_timer() - self._last_write >= self.write_interval
+
+    def write(self, path):
+        """
+        Write the :meth:`.summary` to a YAML file, replacing it atomically
+
+        Args:
+            path (str): the file path
+        """
+        self._last_write = default_timer()
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as fp:
+            yaml.dump(self.summary(), fp, default_flow_style=None, explicit_start=True)
+        os.rename(tmp_path, path)
+        self.logger.debug('Wrote timings of {} phases to {}'.format(len(self._phases), path))
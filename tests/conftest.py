@@ -0,0 +1,49 @@
+import sys
+
+import mock
+import numpy as np
+import pytest
+
+from microbenthos.utils.timing import PhaseTimer
+
+collect_ignore = []
+if sys.version_info < (3, 5):
+    # the asyncio API uses the async syntax of python 3.5+
+    collect_ignore.append('test_aio.py')
+
+
+@pytest.fixture
+def runner(tmpdir):
+    """
+    A mock runner of the exporters, with the output directory in `tmpdir` and a phase timer
+    """
+    runner = mock.Mock()
+    runner.output_dir = str(tmpdir)
+    runner.simulation.timer = PhaseTimer()
+    return runner
+
+
+@pytest.fixture
+def make_state():
+    """
+    A factory of the simulation states given to the exporters. The minimal state has the time
+    and the metrics, and with `snapshot` the state has an environment variable.
+    """
+
+    def make(time, snapshot = False, dt = 1800.0, calc_time = 20.0, residual = 1e-12,
+             num_sweeps = 3, cycle_residual = False):
+        metrics = dict(
+            dt=dict(data=(dt, dict(unit='s'))),
+            calc_time=dict(data=(calc_time, dict(unit='ms'))),
+            residual=dict(data=(residual, None)),
+            num_sweeps=dict(data=(num_sweeps, None)),
+            )
+        if cycle_residual is not False:
+            metrics['cycle_residual'] = dict(data=(cycle_residual, None))
+
+        state = dict(time=dict(data=(time, dict(unit='h'))), metrics=metrics)
+        if snapshot:
+            state['env'] = dict(oxy=dict(data=(np.arange(3.0), dict(unit='mol/m**3'))))
+        return state
+
+    return make
@@ -0,0 +1,115 @@
+"""
+Tests of the asyncio API, which requires python 3.5+. The module is not collected on older
+versions (see conftest.py), as the coroutines are a syntax error there.
+"""
+import asyncio
+import time
+
+import mock
+import pytest
+
+from microbenthos.model.aio import AsyncEvolution
+from microbenthos.runners.aio import run_async
+
+
+def make_simulation(steps = 5, delay = 0.01):
+    sim = mock.Mock()
+    sim.closed = False
+
+    def evolution():
+        try:
+            for num in range(steps):
+                time.sleep(delay)
+                yield num, dict(num=num)
+        except GeneratorExit:
+            sim.closed = True
+            raise
+
+    sim.evolution.side_effect = evolution
+    return sim
+
+
+def run(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+def collect(evolution):
+    async def main():
+        steps = []
+        async for step in evolution:
+            steps.append(step)
+        return steps
+    return main()
+
+
+def test_iterate():
+    sim = make_simulation()
+    evolution = AsyncEvolution(sim)
+    steps = run(collect(evolution))
+    assert [s[0] for s in steps] == list(range(5))
+    assert steps[-1][1] == dict(num=4)
+
+
+def test_pause_resume_cancel():
+    sim = make_simulation(steps=100)
+
+    async def main():
+        evolution = AsyncEvolution(sim)
+        step, state = await evolution.__anext__()
+        assert step == 0
+
+        evolution.pause()
+        assert evolution.paused
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(evolution.__anext__(), 0.1)
+
+        evolution.resume()
+        step, state = await evolution.__anext__()
+        assert step == 1
+
+        # the result of a function run in the executor is awaitable
+        assert await evolution.submit(lambda a, b: a + b, 1, 2) == 3
+
+        evolution.cancel()
+        with pytest.raises(StopAsyncIteration):
+            await evolution.__anext__()
+
+        await evolution.aclose()
+        return evolution
+
+    evolution = run(main())
+    assert evolution.cancelled
+    assert sim.closed
+
+
+def test_task_cancelled():
+    sim = make_simulation(steps=100, delay=0.05)
+
+    async def main():
+        evolution = AsyncEvolution(sim)
+        task = asyncio.ensure_future(collect(evolution))
+        await asyncio.sleep(0.12)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert evolution.cancelled
+        await evolution.aclose()
+
+    run(main())
+    assert sim.closed
+
+
+def test_run_async():
+    runner = mock.MagicMock()
+    runner.simulation = make_simulation(steps=3)
+
+    run(run_async(runner))
+
+    runner.start_run.assert_called_once()
+    runner.exporters_activated.assert_called_once()
+    assert [c[0][0] for c in runner.export_step.call_args_list] == [0, 1, 2]
+    runner.finish_run.assert_called_once()
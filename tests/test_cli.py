@@ -21,3 +21,43 @@ def test_command_line_interface():
     help_result = runner.invoke(cli.cli, ['--help'])
     assert help_result.exit_code == 0
     assert 'Show this message and exit.' in help_result.output
+
+
+def test_sensitivity(tmpdir):
+    import mock
+    from microbenthos.runners import sensitivity
+
+    model_file = tmpdir.join('model.yml')
+    model_file.write('model:\n    domain:\n        init_params:\n            porosity: 0.6\n')
+
+    runner = CliRunner()
+    result = runner.invoke(cli.cli, ['sensitivity', 'run', str(model_file)])
+    assert result.exit_code != 0
+    assert 'No "sensitivity" definition found' in result.output
+
+    study_file = tmpdir.join('study.yml')
+    study_file.write('\n'.join([
+        'sensitivity:',
+        '    seed: 1',
+        '    parameters:',
+        '        - path: model.domain.init_params.porosity',
+        '          bounds: [0.4, 0.8]',
+        '    outputs:',
+        '        - name: y',
+        '          kind: value',
+        '          path: env.y',
+        ]))
+    outdir = str(tmpdir.join('study'))
+
+    def fake_run(definition, outputs):
+        return dict(y=2 * definition['model']['domain']['init_params']['porosity'])
+
+    with mock.patch.object(sensitivity, 'run_model', side_effect=fake_run):
+        result = runner.invoke(cli.cli, ['sensitivity', 'run', '-j', '1', '-o', outdir,
+                                         str(model_file), str(study_file)])
+    assert result.exit_code == 0, result.output
+    assert 'porosity' in result.output
+
+    result = runner.invoke(cli.cli, ['sensitivity', 'analyze', outdir])
+    assert result.exit_code == 0, result.output
+    assert 'Indices from 20 of 20 samples' in result.output
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+from fipy import PhysicalField
+
+from microbenthos.model.cycles import DielCycleMonitor
+
+
+class TestDielCycleMonitor:
+    def test_init(self):
+        mon = DielCycleMonitor(period=24)
+        assert mon.period == 24 * 3600
+        assert not mon.converged
+        assert np.isnan(mon.residual)
+
+        mon = DielCycleMonitor(period=PhysicalField(30, 'min'))
+        assert mon.period == 1800
+
+        with pytest.raises(ValueError):
+            DielCycleMonitor(period=0)
+
+        with pytest.raises(ValueError):
+            DielCycleMonitor(period=24, tolerance=0)
+
+        with pytest.raises(ValueError):
+            DielCycleMonitor(period=24, tolerance=2)
+
+    def test_is_due(self):
+        mon = DielCycleMonitor(period=1)
+        assert mon.is_due(0)
+        mon.update(0, dict(a=np.ones(5)))
+        assert not mon.is_due(100)
+        assert not mon.is_due(3599)
+        assert mon.is_due(3600)
+
+    def test_update(self):
+        mon = DielCycleMonitor(period=1, tolerance=1e-3, min_cycles=2)
+
+        assert mon.update(0, dict(a=np.ones(5))) is None
+        res = mon.update(3600, dict(a=np.ones(5) * 1.1))
+        assert res['a'] == pytest.approx(0.1)
+        assert mon.residual == pytest.approx(0.1)
+        assert not mon.converged
+
+        res = mon.update(7200, dict(a=np.ones(5) * 1.1))
+        assert res['a'] == 0
+        assert len(mon.history) == 2
+        assert mon.converged
+
+    def test_update_mid_cycle(self):
+        # starting in the middle of a cycle, the first sample should be at the next cycle start
+        mon = DielCycleMonitor(period=1)
+        assert mon.update(1800, dict(a=np.ones(5))) is None
+        assert not mon.is_due(3000)
+        assert mon.is_due(3600)
+        assert mon.update(3600, dict(a=np.ones(5))) is None
+        assert mon.update(7200, dict(a=np.ones(5)))['a'] == 0
+
+    def test_shape_change(self):
+        mon = DielCycleMonitor(period=1)
+        mon.update(0, dict(a=np.ones(5)))
+        res = mon.update(3600, dict(a=np.ones(6)))
+        assert res['a'] == float('inf')
+
+    def test_remap_profiles(self):
+        mon = DielCycleMonitor(period=1, min_cycles=1)
+        mon.remap_profiles(lambda value: value[:2])
+        mon.update(0, dict(a=np.arange(4.0)))
+        mon.update(3600, dict(a=np.ones(4)))
+        assert len(mon.history) == 1
+
+        # the profiles of the last cycle are compared on the new mesh
+        mon.remap_profiles(lambda value: np.repeat(value, 2))
+        res = mon.update(7200, dict(a=np.ones(8)))
+        assert res['a'] == 0
+        assert len(mon.history) == 2
+        assert mon.converged
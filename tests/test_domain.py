@@ -1,7 +1,9 @@
+import numpy as np
 import pytest
 from fipy import PhysicalField
 
 from microbenthos import SedimentDBLDomain
+from microbenthos.core.domain import graded_cell_sizes
 
 
 class TestModelDomain:
@@ -134,3 +136,60 @@ class TestModelDomain:
             # check that the units are that of distances
             p = PhysicalField(1, state[k]['data_static'][1]['unit']).inUnitsOf('m')
             assert p.value > 0
+
+    def test_graded(self):
+        domain = SedimentDBLDomain(cell_size=0.02, sediment_length=10, dbl_length=1,
+                                   grading_ratio=1.1, max_cell_size=0.5)
+        assert not domain.uniform
+        uniform = SedimentDBLDomain(cell_size=0.02, sediment_length=10, dbl_length=1)
+        assert uniform.uniform
+        assert domain.total_cells < uniform.total_cells / 5
+
+        sizes = domain.cell_sizes.value
+        assert len(sizes) == domain.mesh.nx == domain.total_cells
+        assert domain.sediment_length.value == pytest.approx(10)
+        assert domain.DBL_length.value == pytest.approx(1)
+        assert sizes[domain.idx_surface - 1] == sizes[domain.idx_surface] == 0.02
+        # cells coarsen away from the surface, up to the max size
+        assert (np.diff(sizes[domain.idx_surface:-1]) >= 0).all()
+        assert (np.diff(sizes[:domain.idx_surface][1:]) <= 0).all()
+        assert sizes[:-1].max() == pytest.approx(0.5)
+
+        assert domain.depths.value[domain.idx_surface] == 0
+        assert (np.diff(domain.depths.value) > 0).all()
+
+        state = domain.snapshot()
+        assert state['metadata']['grading_ratio'] == 1.1
+        assert len(state['cell_sizes']['data_static'][0]) == domain.total_cells
+
+        with pytest.raises(ValueError):
+            SedimentDBLDomain(grading_ratio=0.9)
+
+        with pytest.raises(ValueError):
+            SedimentDBLDomain(cell_size=0.1, grading_ratio=1.1, max_cell_size=0.05)
+
+    def test_cell_sizes(self):
+        domain = SedimentDBLDomain(cell_sizes=[0.1] * 12 + [0.2] * 20, dbl_length=1)
+        assert not domain.uniform
+        assert domain.DBL_cells == 10
+        assert domain.sediment_cells == 22
+        assert domain.sediment_length.value == pytest.approx(4.2)
+        assert domain.cell_size == PhysicalField(0.1, 'mm')
+
+        with pytest.raises(ValueError):
+            SedimentDBLDomain(cell_sizes=[0.1] * 5)
+
+
+@pytest.mark.parametrize('first, length, ratio, largest', [
+    (1, 0, 1.2, None),
+    (1, 10, 1.0, None),
+    (1, 20.5, 1.2, None),
+    (1, 100, 1.5, 4),
+    ])
+def test_graded_cell_sizes(first, length, ratio, largest):
+    sizes = graded_cell_sizes(first, length, ratio, largest)
+    assert sizes.sum() == pytest.approx(length)
+    if length:
+        assert sizes[0] == first
+        if largest:
+            assert sizes[:-1].max() <= largest
@@ -0,0 +1,103 @@
+import mock
+import numpy as np
+import pytest
+from fipy import CellVariable, Grid1D, PhysicalField
+
+from microbenthos.core.events import EventEngine
+
+
+def make_event(mesh, condition, unit = 's', value = 0.0):
+    event = mock.Mock()
+    event.engine = None
+    event.event_time = CellVariable(mesh=mesh, value=PhysicalField(value, unit))
+    event.condition = CellVariable(mesh=mesh, value=condition)
+    return event
+
+
+def values(var):
+    return var.value.value
+
+
+@pytest.fixture
+def mesh():
+    return Grid1D(nx=4, dx=1)
+
+
+def test_register(mesh):
+    engine = EventEngine()
+    assert len(engine) == 0
+    assert engine.times is None
+
+    ev1 = make_event(mesh, [True, True, False, False])
+    ev2 = make_event(mesh, [True, False, True, False], unit='h', value=2.0)
+
+    engine.register(ev1, 0.0)
+    engine.register(ev2, PhysicalField(0, 'h'))
+    assert len(engine) == 2
+    assert ev1.engine is engine
+    assert ev2.engine is engine
+    assert engine.times.shape == (2, 4)
+    assert np.allclose(engine.times[1], 2.0)
+
+    # the variables are backed by the rows of the engine array
+    engine.times[0, 0] = 7
+    ev1.event_time._markFresh()
+    assert values(ev1.event_time)[0] == 7
+
+    with pytest.raises(ValueError):
+        engine.register(make_event(Grid1D(nx=3, dx=1), [True] * 3), 0.0)
+
+
+def test_update(mesh):
+    engine = EventEngine()
+    ev1 = make_event(mesh, [True, True, False, False])
+    ev2 = make_event(mesh, [True, False, True, False], unit='h')
+    engine.register(ev1, 0.0)
+    engine.register(ev2, 0.0)
+
+    derived = ev1.event_time * 2
+
+    engine.update(PhysicalField(1, 'h'))
+    assert ev1.event_time.unit.name() == 's'
+    assert np.allclose(values(ev1.event_time), [3600, 3600, 0, 0])
+    assert np.allclose(values(ev2.event_time), [1, 0, 1, 0])
+    assert np.allclose(values(derived), [7200, 7200, 0, 0])
+
+    ev1.condition.value = [True, False, False, True]
+    engine.update(7200.0)
+    assert np.allclose(values(ev1.event_time), [7200, 0, 0, 3600])
+    assert np.allclose(values(derived), [14400, 0, 0, 7200])
+    assert np.allclose(values(ev2.event_time), [2, 0, 2, 0])
+
+    # values set directly on the variable are carried over
+    ev2.event_time.setValue(PhysicalField(5, 'h'))
+    engine.update(PhysicalField(3, 'h'))
+    assert np.allclose(values(ev2.event_time), [6, 0, 6, 0])
+    assert np.shares_memory(values(ev2.event_time), engine.times[1])
+
+
+def test_unregister(mesh):
+    engine = EventEngine()
+    ev1 = make_event(mesh, [True, True, False, False])
+    ev2 = make_event(mesh, [True, False, True, False])
+    engine.register(ev1, 0.0)
+    engine.register(ev2, 0.0)
+    engine.update(10.0)
+
+    engine.unregister(ev1)
+    assert len(engine) == 1
+    assert ev1.engine is None
+    assert engine.times.shape == (1, 4)
+    assert np.allclose(values(ev1.event_time), [10, 10, 0, 0])
+    assert float(ev1._prev_clock.inUnitsOf('s').value) == 10
+
+    engine.update(20.0)
+    assert np.allclose(values(ev1.event_time), [10, 10, 0, 0])
+    assert np.allclose(values(ev2.event_time), [20, 0, 20, 0])
+
+    with pytest.raises(ValueError):
+        engine.unregister(ev1)
+
+    engine.unregister(ev2)
+    assert engine.times is None
+    engine.update(30.0)
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from microbenthos.exporters.metrics import MetricsExporter, read_metrics
+
+
+def test_export(runner, make_state):
+    exp = MetricsExporter()
+    assert exp.is_eager
+    exp.setup(runner, make_state(0.0))
+
+    timer = runner.simulation.timer
+    for num in range(1, 4):
+        timer.add('sweep.solve', 0.001 * num)
+        exp.process(num, make_state(0.5 * num, num_sweeps=num, cycle_residual=0.1,
+                                    dt=600.0 * num))
+
+    # the records are readable while the exporter runs
+    exp._fp.flush()
+    assert len(read_metrics(exp.outpath)['step']) == 3
+    exp.close()
+
+    data = read_metrics(exp.outpath)
+    assert list(data['step']) == [1, 2, 3]
+    assert np.allclose(data['clock'], [1800, 3600, 5400])
+    # the time step is that used in the step, and not the change of the clock
+    assert np.allclose(data['dt'], [600, 1200, 1800])
+    assert list(data['num_sweeps']) == [1, 2, 3]
+    assert np.allclose(data['cycle_residual'], 0.1)
+    assert np.allclose(data['phase.sweep.solve'], [1, 2, 3])
+    assert np.allclose(data['phase.remesh'], 0)
+    assert (data['rss'] > 0).all()
+
+
+def test_append(runner, make_state):
+    exp = MetricsExporter()
+    exp.setup(runner, make_state(0.0))
+    exp.process(1, make_state(1.0, cycle_residual=False))
+    exp.close()
+
+    # a resumed run appends to the file
+    exp = MetricsExporter()
+    exp.setup(runner, make_state(1.0))
+    exp.process(2, make_state(2.0, cycle_residual=None))
+    exp.close()
+
+    data = read_metrics(exp.outpath)
+    assert list(data['step']) == [1, 2]
+    assert np.isnan(data['cycle_residual']).all()
+
+    # an incomplete record is dropped
+    with open(exp.outpath, 'ab') as fp:
+        fp.write(b'\x00' * 7)
+    assert len(read_metrics(exp.outpath)['step']) == 2
+
+    exp = MetricsExporter()
+    exp.columns = exp.columns[:-1]
+    with pytest.raises(ValueError):
+        exp.setup(runner, make_state(2.0))
+
+
+def test_read_invalid(tmpdir):
+    path = str(tmpdir.join('other.bin'))
+    with open(path, 'wb') as fp:
+        fp.write(b'{"magic": "x"}\n')
+    with pytest.raises(ValueError):
+        read_metrics(path)
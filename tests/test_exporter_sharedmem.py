@@ -0,0 +1,155 @@
+import json
+import multiprocessing
+import os
+
+import mock
+import numpy as np
+import pytest
+
+from microbenthos.exporters import BaseExporter
+from microbenthos.exporters._output_dir_mixin import OutputDirMixin
+from microbenthos.exporters.sharedmem import SnapshotLayout, SnapshotRing, \
+    SharedMemoryExporter, shared_memory
+
+pytestmark = pytest.mark.skipif(shared_memory is None, reason='requires python 3.8+')
+
+
+def make_state(time, ncells = 5):
+    depths = np.linspace(0, 1, ncells)
+    return dict(
+        time=dict(data=(time, dict(unit='h'))),
+        domain=dict(depths=dict(data_static=(depths, dict(unit='mm'))),
+                    metadata=dict(cell_size=0.1)),
+        env=dict(oxy=dict(data=(depths * time, dict(unit='mol/l')),
+                          metadata=dict(clip_min=0.0))),
+        metrics=dict(num_sweeps=dict(data=(3, None)),
+                     cycle_residual=dict(data=(None, None))),
+        )
+
+
+class RecordingExporter(OutputDirMixin, BaseExporter):
+    """
+    Exporter for the consumer process, which writes what it gets to a file
+    """
+    _exports_ = 'test_shared_recording'
+    __version__ = '1.0'
+
+    def prepare(self, state):
+        self.output_dir = self.runner.output_dir
+        self.records = [self.record('setup', 0, state)]
+
+    def record(self, kind, num, state):
+        return dict(kind=kind, num=num, time=state['time']['data'][0],
+                    oxy=state['env']['oxy']['data'][0].tolist(),
+                    ncells=len(state['domain']['depths']['data_static'][0]),
+                    clip_min=state['env']['oxy']['metadata']['clip_min'],
+                    cycle_residual=state['metrics']['cycle_residual']['data'][0])
+
+    def process(self, num, state):
+        self.records.append(self.record('process', num, state))
+
+    def finish(self):
+        with open(os.path.join(self.output_dir, 'records.json'), 'w') as fp:
+            json.dump(self.records, fp)
+
+
+def test_layout():
+    state = make_state(2.0)
+    layout = SnapshotLayout(state)
+
+    paths = [(path, key) for path, key, shape, dtype, off in layout.entries]
+    assert paths == [(('domain', 'depths'), 'data_static'), (('env', 'oxy'), 'data'),
+                     (('metrics', 'num_sweeps'), 'data'), (('time',), 'data')]
+    offsets = [e[-1] for e in layout.entries]
+    assert all(off % layout.ALIGN == 0 for off in offsets)
+    assert layout.nbytes >= offsets[-1] + 8
+
+    # the skeleton has no arrays, but keeps the rest
+    assert layout.skeleton['env']['oxy']['data'] == (None, dict(unit='mol/l'))
+    assert layout.skeleton['domain']['metadata'] == dict(cell_size=0.1)
+    assert layout.skeleton['metrics']['cycle_residual']['data'] == (None, None)
+
+    assert layout.fits(make_state(3.0))
+    assert not layout.fits(make_state(3.0, ncells=6))
+
+    state = make_state(3.0)
+    state['metrics']['cycle_residual']['data'] = (0.1, None)
+    assert not layout.fits(state)
+
+
+def test_ring_views():
+    layout = SnapshotLayout(make_state(0.0))
+    ring = SnapshotRing(layout, slots=2)
+    reader = SnapshotRing(layout, slots=2, name=ring.name)
+    try:
+        ring.write(0, make_state(1.0))
+        ring.write(1, make_state(2.0))
+
+        state = reader.read(1)
+        assert state['time']['data'] == (2.0, dict(unit='h'))
+        assert state['metrics']['num_sweeps']['data'][0] == 3
+        oxy = state['env']['oxy']['data'][0]
+        assert np.allclose(oxy, np.linspace(0, 1, 5) * 2)
+
+        # the arrays are views of the slot and not copies
+        ring.write(1, make_state(4.0))
+        assert np.allclose(oxy, np.linspace(0, 1, 5) * 4)
+        assert np.allclose(reader.read(0)['env']['oxy']['data'][0], np.linspace(0, 1, 5))
+        del state, oxy
+    finally:
+        reader.close()
+        ring.close()
+
+
+def test_exporter_init():
+    with pytest.raises(ValueError):
+        SharedMemoryExporter(exporters=[dict(name='x')])
+
+    exp = SharedMemoryExporter(exporters=[dict(exptype='graphic')], slots=0)
+    assert exp.slots == 1
+    assert exp.get_info()['exporters'] == ['graphic']
+
+
+@pytest.mark.skipif('fork' not in multiprocessing.get_all_start_methods(),
+                    reason='test exporter is found in the consumer by forking')
+def test_roundtrip(tmpdir):
+    runner = mock.Mock()
+    runner.output_dir = str(tmpdir)
+
+    exp = SharedMemoryExporter(exporters=[dict(exptype='test_shared_recording')], slots=2,
+                               start_method='fork', timeout=10)
+    exp.setup(runner, make_state(0.0))
+    for num in range(1, 5):
+        exp.process(num, make_state(float(num)))
+
+    # a remesh changes the layout
+    exp.process(5, make_state(5.0, ncells=3))
+    exp.close()
+
+    assert exp.consumer is None
+    with open(os.path.join(str(tmpdir), 'records.json')) as fp:
+        records = json.load(fp)
+
+    assert [r['kind'] for r in records] == ['setup'] + ['process'] * 5
+    assert [r['num'] for r in records] == list(range(6))
+    assert [r['time'] for r in records] == [float(n) for n in range(6)]
+    assert [r['ncells'] for r in records] == [5] * 5 + [3]
+    assert np.allclose(records[3]['oxy'], np.linspace(0, 1, 5) * 3)
+    assert np.allclose(records[5]['oxy'], np.linspace(0, 1, 3) * 5)
+    assert all(r['clip_min'] == 0.0 and r['cycle_residual'] is None for r in records)
+
+
+@pytest.mark.skipif('fork' not in multiprocessing.get_all_start_methods(),
+                    reason='consumer is started by forking')
+def test_consumer_error(tmpdir):
+    runner = mock.Mock()
+    runner.output_dir = str(tmpdir)
+
+    # the exporter type is unknown in the consumer, so the process exits
+    exp = SharedMemoryExporter(exporters=[dict(exptype='no_such_exporter')], slots=1,
+                               start_method='fork', timeout=0.5)
+    with pytest.raises(RuntimeError):
+        exp.setup(runner, make_state(0.0))
+        for num in range(1, 4):
+            exp.process(num, make_state(float(num)))
+    exp.close()
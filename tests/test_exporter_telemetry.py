@@ -0,0 +1,100 @@
+import json
+import socket
+
+import numpy as np
+import pytest
+from fipy import PhysicalField, Variable
+
+from microbenthos.exporters.telemetry import TelemetryExporter, copy_arrays, jsonable
+
+try:
+    from urllib.request import urlopen
+    from urllib.error import HTTPError
+except ImportError:
+    from urllib2 import urlopen, HTTPError
+
+
+def test_jsonable():
+    obj = dict(a=(np.arange(2), dict(unit=b'h')), b=np.float32(1.5))
+    assert jsonable(obj) == dict(a=[[0, 1], dict(unit='h')], b=1.5)
+
+    obj = dict(a=PhysicalField([1.0, 2.0], 'mm'), b=Variable(3.0, unit='h'), c=Variable([4, 5]))
+    assert json.loads(json.dumps(jsonable(obj))) == dict(a=[1, 2], b=3, c=[4, 5])
+
+
+def test_copy_arrays():
+    arr = np.arange(3.0)
+    obj = dict(a=(arr, dict(unit='h')), b=PhysicalField([1.0, 2.0], 'mm'), c=Variable([4, 5]))
+    copied = copy_arrays(obj)
+
+    # the arrays are copied, but not yet converted to lists
+    assert isinstance(copied['a'], tuple)
+    assert isinstance(copied['a'][0], np.ndarray)
+    assert not np.may_share_memory(copied['a'][0], arr)
+    assert np.allclose(copied['b'], [1, 2])
+    assert np.allclose(copied['c'], [4, 5])
+
+
+def test_serve(runner, make_state, tmpdir):
+    exp = TelemetryExporter()
+    exp.setup(runner, make_state(0.0, snapshot=True))
+    try:
+        assert tmpdir.join(exp.ADDRESS_FILE).read().strip() == exp.address
+        assert exp.address.startswith('http://127.0.0.1:')
+
+        runner.simulation.timer.add('export.model_data', 0.5)
+        state = make_state(0.5, snapshot=True)
+        exp.process(1, state)
+        exp.process(2, make_state(1.0))
+
+        # the solver updates the arrays in place after the step
+        state['env']['oxy']['data'][0][:] = -1
+
+        body = urlopen(exp.address + '/metrics').read().decode('utf-8')
+        assert 'microbenthos_step 2.0' in body
+        assert 'microbenthos_dt_seconds 1800.0' in body
+        assert 'microbenthos_sweeps 3.0' in body
+        assert 'microbenthos_calc_time_seconds 0.02' in body
+        assert 'microbenthos_export_duration_seconds_count{exporter="model_data"} 1' in body
+        assert 'cycle_residual' not in body
+
+        # the latest full snapshot is served
+        data = json.loads(urlopen(exp.address + '/state').read().decode('utf-8'))
+        assert data['step'] == 1
+        assert data['state']['env']['oxy']['data'] == [[0, 1, 2], dict(unit='mol/m**3')]
+
+        info = json.loads(urlopen(exp.address).read().decode('utf-8'))
+        assert info['exports'] == 'telemetry'
+
+        with pytest.raises(HTTPError):
+            urlopen(exp.address + '/other')
+    finally:
+        exp.close()
+
+    assert not tmpdir.join(exp.ADDRESS_FILE).exists()
+
+
+def test_unix_socket(runner, make_state, tmpdir):
+    if not hasattr(socket, 'AF_UNIX'):
+        pytest.skip('unix sockets not available')
+
+    exp = TelemetryExporter(socket_path='telemetry.sock')
+    exp.setup(runner, make_state(0.0))
+    try:
+        exp.process(1, make_state(0.5))
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(str(tmpdir.join('telemetry.sock')))
+        sock.sendall(b'GET /metrics HTTP/1.0\r\n\r\n')
+        response = b''
+        while True:
+            chunk = sock.recv(4096)
+            if not chunk:
+                break
+            response += chunk
+        sock.close()
+        assert response.startswith(b'HTTP/1.0 200')
+        assert b'microbenthos_step 1.0' in response
+    finally:
+        exp.close()
+
+    assert not tmpdir.join('telemetry.sock').exists()
@@ -1,7 +1,9 @@
+import threading
+
 import pytest
 import sympy as sp
 
-from microbenthos.core.expression import Expression
+from microbenthos.core.expression import Expression, active_namespace, formula_namespace
 
 
 class TestExpression:
@@ -27,6 +29,43 @@ class TestExpression:
             f = e._sympy_ns[n]
             assert isinstance(f, sp.Lambda)
 
+    def test_formula_namespace(self):
+        x = sp.symbols('x')
+        outer = dict(f=sp.Lambda(x, x ** 2), g=sp.Lambda(x, x + 1))
+        inner = dict(f=sp.Lambda(x, x ** 3))
+
+        assert active_namespace() == {}
+        with formula_namespace(outer):
+            assert Expression('f(y)').expr() == sp.sympify('y**2')
+            with formula_namespace(inner):
+                e = Expression('f(y) + g(y)')
+                assert e.expr() == sp.sympify('y**3 + y + 1')
+            # formulae added later are used by the later expressions
+            outer['h'] = sp.Lambda(x, 2 * x)
+            assert Expression('h(y)').expr() == sp.sympify('2*y')
+
+        assert active_namespace() == {}
+        assert 'f' not in Expression('a')._sympy_ns
+
+    def test_formula_namespace_threads(self):
+        x = sp.symbols('x')
+        results = {}
+        barrier = threading.Event()
+
+        def parse(power):
+            with formula_namespace(dict(f=sp.Lambda(x, x ** power))):
+                barrier.wait(5)
+                results[power] = Expression('f(y)').expr()
+
+        threads = [threading.Thread(target=parse, args=(p,)) for p in (2, 3)]
+        for t in threads:
+            t.start()
+        barrier.set()
+        for t in threads:
+            t.join()
+
+        assert results == {2: sp.sympify('y**2'), 3: sp.sympify('y**3')}
+
     @pytest.mark.parametrize(
         'formula,err',
         [
@@ -99,6 +99,22 @@ class TestIrradianceChannel:
         assert isinstance(chan.attenuation_profile, np.ndarray)
         assert isinstance(chan.attenuation_profile, numerix.ndarray)
 
+    def test_attenuation_cache(self, chan):
+        # the attenuation profile is only recalculated when the attenuation sources change
+        chan.setup()
+        profile = chan.attenuation_profile
+        assert chan.attenuation_profile is profile
+
+        for var, coeff in chan.k_mods:
+            source = chan.domain[var]
+            source.value = source.value * 2
+            new_profile = chan.attenuation_profile
+            assert new_profile is not profile
+            assert (new_profile[chan.domain.idx_surface + 1:] <
+                    profile[chan.domain.idx_surface + 1:]).all()
+            profile = new_profile
+            assert chan.attenuation_profile is profile
+
     def test_update_intensity(self, chan):
         # check that setting surface intensity updates the intensity profile
         chan.setup()
@@ -194,6 +210,70 @@ class TestIrradiance:
         irrad.on_time_updated(H / 2.0 * 3600.0)
         assert irrad.surface_irrad() == irrad.zenith_level
 
+    def test_schedule_file(self, tmpdir):
+        # a measured record over two days
+        path = tmpdir.join('light.csv')
+        path.write('\n'.join('{},{}'.format(h, h) for h in range(0, 48, 6)))
+
+        irrad = Irradiance(hours_total=24, schedule=dict(path=str(path)))
+        assert not irrad.schedule.cyclic
+        assert irrad.schedule.level(30) == pytest.approx(30)
+
+        with pytest.raises(ValueError):
+            Irradiance(hours_total=24, schedule=dict(path=str(path), cyclic=True))
+
+    def test_lazy_update(self, irrad):
+        # the channel intensities are recalculated only when read after a time update
+        irrad.setup()
+        H = irrad.hours_total.numericValue
+
+        for ch in irrad.channels.values():
+            count = ch.intensities.update_count
+            irrad.on_time_updated(H / 4.0)
+            irrad.on_time_updated(H / 2.0)
+            assert ch.intensities.update_count == count
+
+            I = ch.intensities.numericValue
+            assert ch.intensities.update_count == count + 1
+            assert numerix.allclose(ch.attenuation_profile * float(irrad.surface_irrad), I)
+
+            ch.intensities.numericValue
+            assert ch.intensities.update_count == count + 1
+
+    def test_spectral(self, domain):
+        with pytest.raises(ValueError):
+            Irradiance(integrated_var='total')
+
+        channels = [dict(name='band{}'.format(i), k0=PhysicalField(5 + i, '1/cm'))
+                    for i in range(6)]
+        irrad = Irradiance(channels=channels, spectral=True, integrated_var='total')
+        irrad.set_domain(domain)
+        irrad.setup()
+
+        assert irrad.channel_names == ['band{}'.format(i) for i in range(6)]
+        assert irrad.spectral_intensities.shape == (6, domain.distances.shape[0])
+        assert 'total' in domain
+
+        irrad.on_time_updated(irrad.zenith_time)
+        stack = irrad.spectral_intensities
+        for idx, name in enumerate(irrad.channel_names):
+            ch = irrad.channels[name]
+            assert numerix.allclose(ch.intensities.numericValue, stack[idx])
+            assert numerix.allclose(ch.attenuation_profile * irrad.zenith_level, stack[idx])
+
+        assert numerix.allclose(domain['total'].numericValue, stack.sum(axis=0))
+
+        profiles = irrad.spectral_profiles
+        assert irrad.spectral_profiles is profiles
+
+        # the channel values are not views of the stack, which is updated in place
+        before = irrad.channels['band0'].intensities.numericValue
+        assert not numerix.may_share_memory(before, stack)
+        expected = numerix.array(before)
+        irrad.on_time_updated(irrad.zenith_time * 0.5)
+        irrad.spectral_intensities
+        assert numerix.allclose(before, expected)
+
     def test_snapshot(self, irrad):
         # Irradiance snapshot should have metadata & channels
 
@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+from fipy import CellVariable, Grid1D, Variable
+
+from microbenthos.core.lazy import LazyCellVariable, LazyVariable
+
+
+class Counter(object):
+    def __init__(self, value = 1.0):
+        self.value = value
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return np.array(self.value)
+
+
+def test_lazy_variable():
+    updater = Counter(5.0)
+    var = LazyVariable(value=0.0, updater=updater)
+    assert isinstance(var, Variable)
+    derived = var * 2
+
+    assert float(derived) == 10.0
+    assert updater.calls == 1
+    assert var.update_count == 1
+
+    # no recalculation unless invalidated
+    assert float(var) == 5.0
+    assert updater.calls == 1
+
+    updater.value = 3.0
+    var.invalidate()
+    var.invalidate()
+    assert updater.calls == 1
+    assert float(derived) == 6.0
+    assert updater.calls == 2
+
+
+def test_lazy_cell_variable():
+    mesh = Grid1D(nx=4, dx=1.0)
+    updater = Counter(np.arange(4.0))
+    var = LazyCellVariable(mesh=mesh, value=0.0, updater=updater)
+    assert isinstance(var, CellVariable)
+    assert np.allclose(var.value, np.arange(4.0))
+
+    # setting the value directly holds until the next invalidation
+    var.setValue(7.0)
+    assert np.allclose((var + 1).value, 8.0)
+    var.invalidate()
+    assert np.allclose(var.value, np.arange(4.0))
+    assert updater.calls == 2
+
+
+def test_updater():
+    var = LazyVariable(value=1.0)
+    var.invalidate()
+    assert float(var) == 1.0
+
+    with pytest.raises(TypeError):
+        var.set_updater(1.0)
+
+    var.set_updater(lambda: None)
+    assert float(var) == 1.0
+    assert var.update_count == 0
+
+    var.set_updater(lambda: 2.0)
+    assert float(var) == 2.0
+
+
+def test_snapshot_reused_buffer():
+    from microbenthos.utils.snapshotters import snapshot_var
+
+    mesh = Grid1D(nx=4, dx=1.0)
+    buf = np.empty(4)
+
+    def updater():
+        # an updater that reuses its output array, as for the irradiance intensities
+        buf[:] = updater.value
+        return buf
+
+    updater.value = 1.0
+    var = LazyCellVariable(mesh=mesh, value=0.0, updater=updater)
+    snapshot, meta = snapshot_var(var)
+    assert meta['unit'] == '1'
+    assert np.allclose(snapshot, 1.0)
+
+    updater.value = 5.0
+    var.invalidate()
+    assert np.allclose(var.value, 5.0)
+    assert np.allclose(snapshot, 1.0)
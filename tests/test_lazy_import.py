@@ -0,0 +1,84 @@
+import subprocess
+import sys
+import types
+
+import pytest
+
+from microbenthos.utils.lazy_import import LazyModule, import_all, lazy_attributes
+
+HEAVY = ('sympy', 'fipy', 'matplotlib', 'scipy', 'h5py', 'cerberus')
+
+
+def test_import_is_light():
+    code = '; '.join([
+        'import sys',
+        'import microbenthos, microbenthos.cli',
+        'print(",".join(m for m in {!r} if m in sys.modules))'.format(HEAVY),
+        ])
+    out = subprocess.check_output([sys.executable, '-c', code])
+    assert out.decode().strip() == ''
+
+
+def test_lazy_attributes():
+    name = 'microbenthos_test_lazy'
+    sys.modules[name] = types.ModuleType(name)
+    try:
+        module = lazy_attributes(name, {'dumps': 'json', 'OrderedDict': 'collections'})
+        assert isinstance(module, LazyModule)
+        assert 'dumps' not in module.__dict__
+        assert module.__all__ == ['OrderedDict', 'dumps']
+        assert 'dumps' in dir(module)
+
+        import json
+        assert module.dumps is json.dumps
+        assert 'dumps' in module.__dict__
+
+        with pytest.raises(AttributeError):
+            module.missing
+
+        import_all(module)
+        assert 'OrderedDict' in module.__dict__
+    finally:
+        del sys.modules[name]
+
+
+def test_module_replaced():
+    # python < 3.5 cannot change the class of a module, as here for a module with slots
+    class SlotModule(types.ModuleType):
+        __slots__ = ('extra',)
+
+    name = 'microbenthos_test_lazy'
+    original = sys.modules[name] = SlotModule(name)
+    original.helper = len
+    try:
+        module = lazy_attributes(name, {'dumps': 'json'})
+        assert module is not original
+        assert sys.modules[name] is module
+        assert module.helper is len
+
+        import json
+        assert module.dumps is json.dumps
+    finally:
+        del sys.modules[name]
+
+
+def test_package_functions():
+    # the functions of the package are defined before its attributes are made lazy
+    code = '; '.join([
+        'import sys',
+        'from microbenthos import setup_console_logging',
+        'print(sys.modules["microbenthos"].__dict__["setup_console_logging"] is '
+        'setup_console_logging)',
+        ])
+    out = subprocess.check_output([sys.executable, '-c', code])
+    assert out.decode().strip() == 'True'
+
+
+def test_package_attributes():
+    import microbenthos
+    from microbenthos.model.model import MicroBenthosModel
+
+    assert microbenthos.MicroBenthosModel is MicroBenthosModel
+    assert microbenthos.model.MicroBenthosModel is MicroBenthosModel
+    for name in microbenthos.__all__:
+        assert getattr(microbenthos, name) is not None
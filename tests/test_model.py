@@ -2,8 +2,9 @@ import mock
 import pytest
 from fipy import PhysicalField
 
-from microbenthos import Expression, Entity, yaml, SedimentDBLDomain, DomainEntity
+from microbenthos import Entity, yaml, SedimentDBLDomain, DomainEntity
 from microbenthos.model.model import MicroBenthosModel, ModelClock, ModelEquation
+from microbenthos.utils.timing import PhaseTimer
 
 DOMAIN_DEF = yaml.load("""
 cls: SedimentDBLDomain
@@ -75,11 +76,13 @@ class TestMicroBenthosModel:
 
     def test_init_formulae(self):
         model = MicroBenthosModel(formulae={})
-        assert not Expression._sympy_ns
+        assert not model.formulae
 
         model = MicroBenthosModel(formulae=FORMULAE_DEF)
         for k in FORMULAE_DEF:
-            assert k in Expression._sympy_ns
+            assert k in model.formulae
+        # the formulae are not shared between models
+        assert not MicroBenthosModel().formulae
 
     def test_create_entity_from(self):
         model = MicroBenthosModel()
@@ -105,7 +108,7 @@ class TestMicroBenthosModel:
 
         for name, fdef in FORMULAE_DEF.items():
             model.add_formula(name, **fdef)
-            assert name in Expression._sympy_ns
+            assert name in model.formulae
 
         with pytest.raises(ValueError):
             model.add_formula(name='blah', **BAD_FORMULA)
@@ -169,7 +172,7 @@ class TestMicroBenthosModel:
         store = mock.Mock()
         model = MicroBenthosModel()
 
-        with mock.patch('microbenthos.model.check_compatibility') as m:
+        with mock.patch('microbenthos.model.model.check_compatibility') as m:
 
             model.can_restore_from(store)
 
@@ -188,7 +191,7 @@ class TestMicroBenthosModel:
         store.__getitem__.return_value = mock.MagicMock(Group)
 
         with mock.patch.multiple(
-            'microbenthos.model',
+            'microbenthos.model.model',
             check_compatibility=mock.DEFAULT,
             truncate_model_data=mock.DEFAULT,
             restore_var=mock.DEFAULT,
@@ -223,7 +226,7 @@ class TestMicroBenthosModel:
 
             assert model.clock.value == clockval
 
-    @mock.patch('microbenthos.model.ModelEquation')
+    @mock.patch('microbenthos.model.model.ModelEquation')
     def test_add_equation(self, MockEqn):
 
         model = MicroBenthosModel()
@@ -314,7 +317,40 @@ class TestMicroBenthosModel:
             except ValueError:
                 pass
 
-    @mock.patch('microbenthos.model.ModelClock')
+    def test_object_index(self):
+        model = MicroBenthosModel()
+
+        domain = mock.Mock()
+        domain.VARS = dict(oxy=mock.Mock())
+        model.domain = domain
+
+        feat = mock.Mock(spec=['var'])
+        proc = mock.Mock(spec=['events'])
+        proc.events = dict(ev=mock.Mock(spec=[]))
+        microbe = mock.Mock(spec=['features', 'processes'])
+        microbe.features = dict(biomass=feat)
+        microbe.processes = dict(resp=proc)
+
+        with mock.patch.object(model, 'create_entity_from', return_value=microbe):
+            model._create_entity_into('microbes', 'bac', dict(init_params={}))
+
+        assert model.get_object('domain.oxy') is domain.VARS['oxy']
+        assert model.get_object('microbes.bac') is microbe
+        assert model.get_object('microbes.bac.features.biomass.var') is feat.var
+        assert model.get_object('microbes.bac.processes.resp.events.ev') is proc.events['ev']
+
+        found = model.find_objects('microbes.*.features.*')
+        assert set(found) == {'microbes.bac.features.biomass',
+                              'microbes.bac.features.biomass.var'}
+
+        assert model.remove_entity('microbes', 'bac') is microbe
+        assert not model.find_objects('microbes.*')
+        with pytest.raises(ValueError):
+            model.get_object('microbes.bac')
+        with pytest.raises(ValueError):
+            model.remove_entity('microbes', 'bac')
+
+    @mock.patch('microbenthos.model.model.ModelClock')
     def test_on_time_updated(self, MClock):
         model = MicroBenthosModel()
 
@@ -337,6 +373,13 @@ class TestMicroBenthosModel:
             assert args == (MClock()(),)
             assert kwargs == {}
 
+        # the clock hooks of the entities are timed if the timer is enabled
+        model.timer = PhaseTimer()
+        model.on_time_updated()
+        assert set(model.timer.names()) == set(
+            ['clock.env.' + e for e in enames] + ['clock.microbes.' + m for m in mnames] +
+            ['clock.events'])
+
 
     def test_update_vars(self):
         model = MicroBenthosModel()
@@ -357,6 +400,30 @@ class TestMicroBenthosModel:
         nonvar.obj.assert_not_called()
         assert Mvar().var.updateOld.call_count == len(varnames)
 
+    def test_stateful_vars(self):
+        model = MicroBenthosModel()
+
+        model.env['oxy'] = oxy = mock.Mock()
+        oxy.clip_min = 0.0
+        oxy.clip_max = None
+        model.env['nonvar'] = mock.Mock(spec=[])
+        model.env['noold'] = noold = mock.Mock()
+        noold.var._old = None
+
+        microbe = mock.Mock()
+        microbe.features = dict(biomass=mock.Mock())
+        model.microbes['bac'] = microbe
+
+        paths = [e.path for e in model.stateful_vars]
+        assert paths == ['env.oxy', 'microbes.bac.features.biomass']
+        assert model.stateful_vars[0].var is oxy.var
+        assert model.stateful_vars[0].clip_min == 0.0
+
+        assert model.update_vars() == paths
+        oxy.var.updateOld.assert_called_once()
+        noold.var.updateOld.assert_not_called()
+        microbe.features['biomass'].var.updateOld.assert_called_once()
+
     def test_update_equations(self):
 
         model = MicroBenthosModel()
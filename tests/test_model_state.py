@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+from fipy import CellVariable, Grid1D, PhysicalField
+
+from microbenthos.model.state import StateBuffer, clip_var, update_old, var_array
+
+
+@pytest.fixture()
+def var():
+    mesh = Grid1D(nx=5, dx=1.0)
+    return CellVariable(mesh=mesh, value=[-1.0, 0.0, 1.0, 2.0, 3.0], unit='mol/l', hasOld=True)
+
+
+def test_var_array(var):
+    arr = var_array(var)
+    assert isinstance(arr, np.ndarray)
+    arr[0] = 5
+    assert var.value.value[0] == 5
+
+
+def test_update_old(var):
+    old_arr = var_array(var.old)
+    var.value = PhysicalField(np.arange(5.0), 'mol/l')
+    update_old(var)
+    assert var_array(var.old) is old_arr
+    assert np.allclose(var.old.value.value, np.arange(5.0))
+
+    nold = CellVariable(mesh=var.mesh, value=1.0)
+    with pytest.raises(AssertionError):
+        update_old(nold)
+
+
+def test_clip_var(var):
+    derived = var * 2
+    assert derived.value.value[0] == -2
+
+    clip_var(var)
+    assert var.value.value[0] == -1
+
+    clip_var(var, PhysicalField(0, 'mmol/l'), 2)
+    assert np.allclose(var.value.value, [0, 0, 1, 2, 2])
+    # dependent variables are recalculated
+    assert np.allclose(derived.value.value, [0, 0, 2, 4, 4])
+
+
+def test_state_buffer(var):
+    buf = StateBuffer([var])
+    assert len(buf) == 1
+    assert not buf.saved
+
+    with pytest.raises(RuntimeError):
+        buf.restore()
+
+    derived = var + PhysicalField(1, 'mol/l')
+    buf.save()
+    var.value = PhysicalField(np.ones(5) * 9, 'mol/l')
+    assert np.allclose(derived.value.value, 10)
+
+    arr = var_array(var)
+    buf.restore()
+    assert var_array(var) is arr
+    assert np.allclose(var.value.value, [-1, 0, 1, 2, 3])
+    assert np.allclose(derived.value.value, [0, 1, 2, 3, 4])
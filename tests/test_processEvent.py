@@ -89,3 +89,21 @@ class TestProcessEvent:
         pe.event_time.value.__setitem__.assert_called_once_with(
             NEG, 0.0)
 
+
+    def test_engine(self):
+        proc = mock.MagicMock(spec=Process)
+        proc.name = 'Proc'
+
+        model = mock.Mock()
+        model.clock = mock.MagicMock()
+        engine = model.event_engine
+
+        pe = ProcessEvent(mock.MagicMock(Expression))
+        assert pe.engine is None
+        pe.setup(process=proc, model=model)
+        engine.register.assert_called_once_with(pe, model.clock)
+
+        pe.engine = engine
+        pe.event_time = mock.MagicMock()
+        pe.on_time_updated(model.clock)
+        pe.event_time.setValue.assert_not_called()
@@ -0,0 +1,242 @@
+import h5py as hdf
+import mock
+import numpy as np
+import pytest
+from fipy import PhysicalField, Variable
+
+from microbenthos import MicroBenthosModel, SedimentDBLDomain
+from microbenthos.model.remesh import cell_faces, conservative_remap, refine_cell_sizes, \
+    remap_faces, remesh_indicator, stored_faces, transfer_state
+from microbenthos.model.resume import check_compatibility
+from microbenthos.model.saver import _save_nested_dict
+from microbenthos.model.state import StatefulVar
+
+
+def test_cell_faces():
+    assert np.allclose(cell_faces([1, 2, 3]), [0, 1, 3, 6])
+
+
+@pytest.mark.parametrize('new_sizes', [
+    [1.0] * 6,
+    [0.5] * 12,
+    [2.0, 2.0, 2.0],
+    [0.25, 0.75, 1.5, 1.5, 2.0],
+    ])
+def test_conservative_remap(new_sizes):
+    old_sizes = np.array([1.0, 1.0, 2.0, 2.0])
+    values = np.array([3.0, 1.0, 4.0, 0.5])
+
+    remapped = conservative_remap(values, old_sizes, new_sizes)
+    assert remapped.shape == (len(new_sizes),)
+    assert (remapped * new_sizes).sum() == pytest.approx((values * old_sizes).sum())
+
+    # stacked profiles are remapped along the last axis
+    stacked = conservative_remap(np.array([values, 2 * values]), old_sizes, new_sizes)
+    assert np.allclose(stacked[1], 2 * remapped)
+
+    # identity remap
+    assert np.allclose(conservative_remap(values, old_sizes, old_sizes), values)
+
+    with pytest.raises(ValueError):
+        conservative_remap(values, old_sizes, [1.0, 1.0])
+
+    with pytest.raises(ValueError):
+        conservative_remap(values[:3], old_sizes, new_sizes)
+
+
+def test_remap_faces():
+    old_faces = np.array([-1.0, 0, 1, 3])
+    values = np.array([2.0, 1.0, 4.0])
+
+    # the profile is extended with the edge values beyond the old mesh
+    remapped = remap_faces(values, old_faces, [-2.0, -1, 0, 2, 4])
+    assert np.allclose(remapped, [2, 2, 2.5, 4])
+
+    # cells inside the old mesh keep its integral
+    new_faces = np.array([-1.0, -0.5, 0.5, 3])
+    remapped = remap_faces(values, old_faces, new_faces)
+    assert (remapped * np.diff(new_faces)).sum() == pytest.approx(
+        (values * np.diff(old_faces)).sum())
+
+    with pytest.raises(ValueError):
+        remap_faces(values[:2], old_faces, new_faces)
+
+
+def test_remesh_indicator():
+    flat = np.ones(6)
+    step = np.array([0, 0, 0, 1, 1, 1.0])
+    ind = remesh_indicator([flat, step])
+    assert np.allclose(ind, [0, 0, 1, 1, 0, 0])
+
+    with pytest.raises(ValueError):
+        remesh_indicator([])
+
+
+def test_refine_cell_sizes():
+    sizes = np.ones(8)
+    indicator = np.array([0, 0, 0, 0.5, 0.5, 0, 0, 0])
+
+    new_sizes, face_map = refine_cell_sizes(sizes, indicator, threshold=0.1, min_size=0.25,
+                                            max_size=2, fixed_faces=(3,))
+    assert new_sizes.sum() == pytest.approx(sizes.sum())
+    # the first cell pair is merged, but not across the fixed face
+    assert np.allclose(new_sizes, [2, 1, 0.5, 0.5, 0.5, 0.5, 2, 1])
+    assert face_map == {3: 2}
+
+    # no refinement below the min size
+    new_sizes, _ = refine_cell_sizes(sizes, indicator, threshold=0.1, min_size=1)
+    assert not (new_sizes < 1).any()
+
+    # no coarsening above the max size
+    new_sizes, _ = refine_cell_sizes(sizes, np.zeros(8), threshold=0.1, min_size=1,
+                                     max_size=1)
+    assert np.allclose(new_sizes, sizes)
+
+
+def test_transfer_state():
+    def make_model(**kwargs):
+        model = mock.Mock()
+        model.domain = domain = SedimentDBLDomain(sediment_length=2, dbl_length=0.5, **kwargs)
+        model.clock = Variable(PhysicalField(0, 'h'))
+        var = domain.create_var('oxy', value=PhysicalField(1, 'mol/m**3'), hasOld=True)
+        model.stateful_vars = [StatefulVar('env.oxy', var, None, None)]
+        event = mock.Mock()
+        event.event_time = domain.create_var('ev', store=False, value=PhysicalField(0, 's'))
+        model.find_objects.return_value = {'env.proc.events.ev': event}
+        return model
+
+    source = make_model(cell_size=0.05)
+    target = make_model(cell_sizes=[0.1] * 25)
+    assert source.domain.total_cells == 50
+
+    source.clock.setValue(PhysicalField(2, 'h'))
+    oxy = source.stateful_vars[0].var
+    oxy.value = PhysicalField(np.linspace(0, 1, 50), 'mmol/l')
+    oxy.updateOld()
+    source.find_objects.return_value['env.proc.events.ev'].event_time.value = \
+        PhysicalField(np.arange(50.), 's')
+
+    paths = transfer_state(source, target)
+    assert paths == ['env.oxy', 'env.proc.events.ev']
+    assert target.clock() == PhysicalField(2, 'h')
+
+    toxy = target.stateful_vars[0].var
+    assert toxy.unit.name() == 'mol/m**3'
+    assert toxy.value.value.sum() * 0.1 == pytest.approx(oxy.value.value.sum() * 0.05)
+    assert np.allclose(toxy.old.value.value, toxy.value.value)
+    event_time = target.find_objects.return_value['env.proc.events.ev'].event_time
+    assert np.allclose(event_time.value.value, np.arange(0.5, 50, 2))
+
+
+def test_save_variable_length(tmpdir):
+    fpath = str(tmpdir.join('vlen.h5'))
+    for N in (5, 8):
+        state = dict(var=dict(data=(np.arange(N, dtype=float), dict(unit='m'))),
+                     time=dict(data=(np.array(N, dtype=float), None)))
+        with hdf.File(fpath, 'a') as hf:
+            _save_nested_dict(state, hf, variable_length=True)
+
+    with hdf.File(fpath, 'r') as hf:
+        ds = hf['var/data']
+        assert ds.shape == (2,)
+        assert ds.attrs['unit'] == 'm'
+        assert np.allclose(ds[1], np.arange(8))
+        assert hf['time/data'].shape == (2,)
+
+
+def test_dataview_variable_length(tmpdir):
+    from microbenthos.dataview import HDFModelData
+
+    fpath = str(tmpdir.join('vlen.h5'))
+    for N in (5, 8):
+        state = dict(domain=dict(depths=dict(data=(np.arange(N, dtype=float),
+                                                   dict(unit='mm')))),
+                     time=dict(data=(np.array(N, dtype=float), dict(unit='s'))))
+        with hdf.File(fpath, 'a') as hf:
+            _save_nested_dict(state, hf, variable_length=True)
+
+    # the data view reads the profiles on a fixed mesh, so a remeshed model is not supported
+    with hdf.File(fpath, 'r') as hf:
+        with pytest.raises(ValueError):
+            HDFModelData(hf)
+
+
+def test_transfer_state_lengths():
+    # domains of different lengths are aligned at the sediment surface
+    source = mock.Mock()
+    source.domain = SedimentDBLDomain(cell_size=0.1, sediment_length=1, dbl_length=0.5)
+    source.stateful_vars = [StatefulVar('env.oxy', source.domain.create_var(
+        'oxy', value=PhysicalField(np.arange(15.), 'mol/m**3')), None, None)]
+    source.clock = Variable(PhysicalField(1, 'h'))
+    source.find_objects.return_value = {}
+
+    target = mock.Mock()
+    target.domain = SedimentDBLDomain(cell_size=0.1, sediment_length=2, dbl_length=0.2)
+    target.stateful_vars = [StatefulVar('env.oxy', target.domain.create_var(
+        'oxy', value=PhysicalField(0, 'mol/m**3')), None, None)]
+    target.find_objects.return_value = {}
+
+    transfer_state(source, target)
+    toxy = target.stateful_vars[0].var.value.value
+    assert np.allclose(toxy[:2], [3, 4])
+    assert np.allclose(toxy[2:12], np.arange(5, 15))
+    assert np.allclose(toxy[12:], 14)
+
+
+def _coarse_store(hf):
+    domain = SedimentDBLDomain(cell_size=0.1, sediment_length=2, dbl_length=0.5)
+    oxy = domain.create_var('oxy', value=PhysicalField(np.arange(25.), 'mol/m**3'))
+    state = dict(
+        time=dict(data=(np.array(3600.0), dict(unit='s'))),
+        domain=domain.snapshot(),
+        env=dict(oxy=dict(data=(oxy.value.value, dict(unit='mol/m**3')))),
+        )
+    _save_nested_dict(state, hf)
+    return domain
+
+
+def test_stored_faces(tmpdir):
+    with hdf.File(str(tmpdir.join('coarse.h5')), 'a') as hf:
+        _coarse_store(hf)
+        faces = stored_faces(hf, -1)
+    assert np.allclose(faces, np.arange(-0.5, 2.05, 0.1))
+
+
+def test_spinup_from(tmpdir):
+    model = MicroBenthosModel()
+    model.domain = SedimentDBLDomain(cell_size=0.05, sediment_length=2, dbl_length=0.5)
+    oxy = model.domain.create_var('oxy', value=PhysicalField(0, 'mmol/l'), hasOld=True)
+    model._stateful_vars = [StatefulVar('env.oxy', oxy, None, None)]
+
+    with hdf.File(str(tmpdir.join('coarse.h5')), 'a') as hf:
+        coarse = _coarse_store(hf)
+
+        with mock.patch.object(model, 'can_restore_from', return_value=False):
+            with pytest.raises(TypeError):
+                model.spinup_from(hf)
+
+        with mock.patch.object(model, 'can_restore_from', return_value=True) as can_restore:
+            paths = model.spinup_from(hf)
+            can_restore.assert_called_once_with(hf, remap=True)
+
+    assert paths == ['env.oxy']
+    assert model.clock() == PhysicalField(1, 'h')
+    assert coarse.total_cells == 25
+    assert np.allclose(oxy.value.value, np.repeat(np.arange(25.), 2))
+    assert np.allclose(oxy.old.value.value, oxy.value.value)
+
+
+def test_check_compatibility_depths(tmpdir):
+    fine = SedimentDBLDomain(cell_size=0.05, sediment_length=2, dbl_length=0.5)
+    oxy = fine.create_var('oxy', value=PhysicalField(1, 'mol/m**3'))
+    state = dict(
+        time=dict(data=(np.array(0.0), dict(unit='s'))),
+        domain=fine.snapshot(),
+        env=dict(oxy=dict(data=(oxy.value.value, dict(unit='mol/m**3')))),
+        )
+
+    with hdf.File(str(tmpdir.join('coarse.h5')), 'a') as hf:
+        _coarse_store(hf)
+        with pytest.raises((ValueError, AssertionError)):
+            check_compatibility(state, hf)
+        check_compatibility(state, hf, check_depths=False)
@@ -0,0 +1,231 @@
+import json
+import multiprocessing
+
+import mock
+import numpy as np
+import pytest
+from fipy import PhysicalField
+
+from microbenthos.runners import sensitivity
+from microbenthos.runners.sensitivity import SensitivityRunner, get_definition_value, \
+    set_definition_value, snapshot_outputs
+
+
+def make_model():
+    return dict(
+        domain=dict(init_params=dict(porosity=0.6)),
+        environment=dict(
+            aero=dict(init_params=dict(params=dict(Vmax=PhysicalField(1.0, 'mmol/l/h')))),
+            irradiance=dict(init_params=dict(channels=[dict(name='par', k0=15.3)])),
+            ),
+        equations=dict(oxyEqn=dict(transient=['domain.oxy', 1])),
+        )
+
+
+def make_study(method = 'morris', samples = 4):
+    return dict(
+        method=method,
+        samples=samples,
+        seed=3,
+        parameters=[
+            dict(path='model.domain.init_params.porosity', bounds=[0.4, 0.8]),
+            dict(path='model.environment.aero.init_params.params.Vmax', bounds=[0.5, 2],
+                 relative=True, log=True),
+            dict(path='model.environment.irradiance.init_params.channels.0.k0',
+                 bounds=[10, 20]),
+            ],
+        outputs=[dict(name='y', kind='value', path='env.y')],
+        )
+
+
+def fake_run(definition, outputs):
+    porosity = definition['model']['domain']['init_params']['porosity']
+    vmax = definition['model']['environment']['aero']['init_params']['params']['Vmax']
+    y = 10 * porosity + vmax.inUnitsOf('mmol/l/h').value
+    return dict(y=float(y))
+
+
+def make_state():
+    depths = np.linspace(-1, 4, 6) * 1e-3
+    oxy = np.array([0.3, 0.3, 0.2, 0.1, 0.0, 0.0])
+    return dict(
+        domain=dict(depths=dict(data_static=(depths, dict(unit='m')))),
+        env=dict(oxy=dict(data=(oxy, dict(unit='mmol/l')))),
+        equations=dict(oxyEqn=dict(tracked_budget=dict(
+            time_step=dict(data=(2.0, dict(unit='s'))),
+            sources_change=dict(data=(4.0, dict(unit='mol/m**2'))),
+            var_actual=dict(data=(1.5, dict(unit='mol/m**2'))),
+            ))),
+        )
+
+
+def test_definition_paths():
+    defs = dict(model=make_model())
+    assert get_definition_value(defs, 'model.domain.init_params.porosity') == 0.6
+    assert get_definition_value(
+        defs, 'model.environment.irradiance.init_params.channels.0.k0') == 15.3
+
+    set_definition_value(defs, 'model.environment.irradiance.init_params.channels.0.k0', 20)
+    assert defs['model']['environment']['irradiance']['init_params']['channels'][0]['k0'] == 20
+
+    with pytest.raises(KeyError):
+        get_definition_value(defs, 'model.domain.init_params.nope')
+    with pytest.raises(KeyError):
+        set_definition_value(defs, 'model.domain.init_params.nope', 1)
+
+
+def test_snapshot_outputs():
+    outputs = [
+        dict(name='integral', kind='integral', path='env.oxy'),
+        dict(name='integral_all', kind='integral', path='env.oxy', sediment=False),
+        dict(name='penetration', kind='penetration', path='env.oxy',
+             threshold=PhysicalField(50, 'mumol/l')),
+        dict(name='rate', kind='budget', equation='oxyEqn'),
+        dict(name='actual', kind='budget', equation='oxyEqn', field='var_actual'),
+        dict(name='max', kind='value', path='env.oxy', reduce='max'),
+        dict(name='missing', kind='value', path='env.h2s'),
+        ]
+    values = snapshot_outputs(make_state(), outputs)
+
+    assert values['integral'] == pytest.approx(1e-3 * (0.25 + 0.15 + 0.05 + 0.0))
+    assert values['integral_all'] == pytest.approx(values['integral'] + 0.3e-3)
+    assert values['penetration'] == pytest.approx(2.5e-3)
+    assert values['rate'] == pytest.approx(2.0)
+    assert values['actual'] == pytest.approx(1.5)
+    assert values['max'] == pytest.approx(0.3)
+    assert np.isnan(values['missing'])
+
+
+def test_init(tmpdir):
+    runner = SensitivityRunner(make_model(), make_study(), output_dir=str(tmpdir))
+    porosity, vmax, k0 = runner.parameters
+    assert porosity['name'] == 'porosity' and porosity['unit'] is None
+    assert (porosity['low'], porosity['high']) == (0.4, 0.8)
+    assert vmax['unit'] == 'mmol/l/h'
+    assert (vmax['low'], vmax['high']) == (0.5, 2.0)
+
+    values = runner.parameter_values(np.array([0.5, 0.5, 0.0]))
+    assert values == pytest.approx([0.6, 1.0, 10])
+
+    study = make_study()
+    study['parameters'].append(dict(path='model.domain.init_params.nope', bounds=[0, 1]))
+    with pytest.raises(ValueError):
+        SensitivityRunner(make_model(), study)
+
+    study = make_study()
+    study['parameters'][1]['bounds'] = [PhysicalField(1, 'mmol/l/h'), 2]
+    with pytest.raises(ValueError):
+        SensitivityRunner(make_model(), study)
+
+    # a budget output turns on the tracking of the equation
+    study = make_study()
+    study['outputs'].append(dict(name='rate', kind='budget', equation='oxyEqn'))
+    runner = SensitivityRunner(make_model(), study)
+    assert runner.definition['model']['equations']['oxyEqn']['track_budget']
+
+    study['outputs'][-1]['equation'] = 'h2sEqn'
+    with pytest.raises(ValueError):
+        SensitivityRunner(make_model(), study)
+
+
+@pytest.mark.parametrize('method', ['morris', 'saltelli'])
+def test_run(tmpdir, method):
+    runner = SensitivityRunner(make_model(), make_study(method), output_dir=str(tmpdir),
+                               processes=1)
+    with mock.patch.object(sensitivity, 'run_model', side_effect=fake_run) as run:
+        indices = runner.run()
+
+    assert run.call_count == runner.design.num_samples == len(runner.completed())
+    assert sorted(indices['y']) == ['Vmax', 'k0', 'porosity']
+    if method == 'morris':
+        # the output is linear in the porosity, and does not depend on k0
+        assert indices['y']['porosity']['mu'] == pytest.approx(4.0)
+        assert indices['y']['k0']['mu_star'] == 0
+    else:
+        assert indices['y']['porosity']['ST'] > indices['y']['Vmax']['ST'] > 0
+        assert indices['y']['k0']['ST'] == pytest.approx(0)
+
+    with open(runner.run_path(0)) as fp:
+        result = json.load(fp)
+    assert result['error'] is None
+    assert sorted(result['parameters']) == ['Vmax', 'k0', 'porosity']
+
+    # the study is analyzed again from the output directory
+    runner = SensitivityRunner.from_output_dir(str(tmpdir))
+    assert runner.analyze() == indices
+
+
+def test_resume(tmpdir):
+    calls = []
+
+    def interrupted(definition, outputs):
+        calls.append(definition)
+        if len(calls) == 5:
+            raise KeyboardInterrupt
+        return fake_run(definition, outputs)
+
+    runner = SensitivityRunner(make_model(), make_study(), output_dir=str(tmpdir),
+                               processes=1)
+    with mock.patch.object(sensitivity, 'run_model', side_effect=interrupted):
+        with pytest.raises(KeyboardInterrupt):
+            runner.run()
+    assert len(runner.completed()) == 4
+
+    runner = SensitivityRunner(make_model(), make_study(), output_dir=str(tmpdir),
+                               processes=1)
+    with mock.patch.object(sensitivity, 'run_model', side_effect=fake_run) as run:
+        runner.run()
+    assert run.call_count == runner.design.num_samples - 4
+
+    # a different study does not reuse the runs
+    study = make_study(samples=5)
+    with pytest.raises(ValueError):
+        SensitivityRunner(make_model(), study, output_dir=str(tmpdir)).run()
+
+    runner = SensitivityRunner(make_model(), study, output_dir=str(tmpdir), processes=1,
+                               overwrite=True)
+    with mock.patch.object(sensitivity, 'run_model', side_effect=fake_run) as run:
+        runner.run()
+    assert run.call_count == runner.design.num_samples
+
+
+def test_failed_runs(tmpdir):
+
+    def failing(definition, outputs):
+        if definition['model']['domain']['init_params']['porosity'] > 0.7:
+            raise RuntimeError('solver diverged')
+        return fake_run(definition, outputs)
+
+    runner = SensitivityRunner(make_model(), make_study(), output_dir=str(tmpdir),
+                               processes=1)
+    with mock.patch.object(sensitivity, 'run_model', side_effect=failing):
+        runner.run()
+
+    outputs = runner.load_outputs()['y']
+    failed = np.isnan(outputs)
+    assert failed.any() and not failed.all()
+    index = np.flatnonzero(failed)[0]
+    with open(runner.run_path(index)) as fp:
+        assert 'solver diverged' in json.load(fp)['error']
+
+    # the failed samples are run again
+    assert index not in runner.completed()
+    with mock.patch.object(sensitivity, 'run_model', side_effect=fake_run) as run:
+        runner.run()
+    assert run.call_count == failed.sum()
+    assert not np.isnan(runner.load_outputs()['y']).any()
+
+
+@pytest.mark.skipif('fork' not in multiprocessing.get_all_start_methods(),
+                    reason='the patched run is inherited by forking')
+def test_pool(tmpdir):
+    if multiprocessing.get_start_method() != 'fork':
+        pytest.skip('default start method is not fork')
+
+    runner = SensitivityRunner(make_model(), make_study(), output_dir=str(tmpdir),
+                               processes=2)
+    with mock.patch.object(sensitivity, 'run_model', side_effect=fake_run):
+        indices = runner.run()
+
+    assert len(runner.completed()) == runner.design.num_samples
+    assert indices['y']['porosity']['mu'] == pytest.approx(4.0)
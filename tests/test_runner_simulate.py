@@ -89,6 +89,18 @@ class TestSimulationRunner:
         runner.teardown_logfile()
         assert runner._log_fh not in logger.handlers
 
+    def test_quiet_logfile(self):
+        runner = SimulationRunner(output_dir=tempfile.mkdtemp(), quiet=True)
+        logger = logging.getLogger('microbenthos')
+        level = logger.level
+
+        runner.setup_logfile()
+        assert runner._log_fh.level == logging.WARNING
+        assert not logger.isEnabledFor(logging.INFO)
+
+        runner.teardown_logfile()
+        assert logger.level == level
+
     def test_save_definitions(self, model, sim):
         odir = tempfile.mkdtemp()
         runner = SimulationRunner(output_dir=odir)
@@ -157,6 +169,8 @@ class TestSimulationRunner:
         mocked = mock.MagicMock(runner)
 
         mocked.confirm = False
+        mocked.start_run = lambda: SimulationRunner.start_run(mocked)
+        mocked.finish_run = lambda **kw: SimulationRunner.finish_run(mocked, **kw)
 
         print(sim.simtime_lims)
 
@@ -164,6 +178,12 @@ class TestSimulationRunner:
 
         mocked.check_simulation.assert_called_once()
 
+        mocked.spinup_simulation.assert_called_once()
+
+        mocked.warm_start_simulation.assert_called_once()
+
+        mocked.save_warm_start.assert_called_once_with(completed=True)
+
         mocked._create_output_dir.assert_called_once()
 
         mocked.setup_logfile.assert_called_once()
@@ -180,6 +200,85 @@ class TestSimulationRunner:
 
         mocked.teardown_logfile.assert_called_once()
 
+    def test_spinup_simulation(self):
+        runner = SimulationRunner()
+        runner._model = model = mock.Mock()
+        # the model is not yet set in the simulation
+        runner._simulation = mock.Mock(model=None)
+
+        runner.spinup_simulation()
+        model.spinup_from.assert_not_called()
+
+        runner.spinup = 'coarse.h5'
+        with mock.patch('h5py.File') as File:
+            runner.spinup_simulation()
+            File.assert_called_once_with('coarse.h5', 'r')
+        model.spinup_from.assert_called_once_with(File.return_value.__enter__.return_value)
+        assert runner.simulation.simtime_step == 1
+
+    def test_save_warm_start(self):
+        runner = SimulationRunner()
+        runner._model = mock.Mock()
+        runner._simulation = sim = mock.Mock(cycle_tolerance=None, cycle_converged=False)
+        runner.warm_start = 'store'
+
+        # the model of the simulation is saved, as it replaces the model when remeshing
+        sim.model = remeshed = mock.Mock()
+        assert runner.model is remeshed
+
+        with mock.patch('microbenthos.runners.simulate.WarmStartStore') as Store:
+            # an interrupted run is not saved
+            runner.save_warm_start(completed=False)
+            Store.return_value.save.assert_not_called()
+            runner.save_warm_start()
+            Store.return_value.save.assert_called_once_with(remeshed)
+
+            # with the cycle monitor, only a converged run is saved
+            Store.reset_mock()
+            sim.cycle_tolerance = 1e-3
+            runner.save_warm_start()
+            Store.return_value.save.assert_not_called()
+            sim.cycle_converged = True
+            runner.save_warm_start(completed=False)
+            Store.return_value.save.assert_called_once_with(remeshed)
+
+    def test_export_step(self):
+        from microbenthos.utils.timing import PhaseTimer
+
+        runner = SimulationRunner()
+        runner._simulation = sim = mock.Mock(model=None)
+        sim.snapshot_due.return_value = False
+        sim.timer = timer = PhaseTimer(write_interval=1e6)
+        runner.exporters['data'] = data = mock.Mock(is_eager=False)
+        runner.exporters['metrics'] = metrics = mock.Mock(is_eager=True)
+
+        runner.export_step(1, {})
+        data.process.assert_not_called()
+        metrics.process.assert_called_once_with(1, {})
+        assert timer.names() == ['export.metrics']
+
+        # the exporters are not timed with a disabled timer
+        timer.enabled = False
+        with mock.patch.object(timer, 'phase') as phase:
+            runner.export_step(2, {})
+        phase.assert_not_called()
+        assert metrics.process.call_count == 2
+
+    def test_check_simulation(self):
+        runner = SimulationRunner()
+        with pytest.raises(RuntimeError):
+            runner.check_simulation()
+
+        runner._model = mock.Mock()
+        runner._simulation = sim = mock.Mock(remesh_interval=None)
+        runner.exporters['graphic'] = mock.Mock(_exports_='graphic')
+        runner.check_simulation()
+
+        # the graphic exporter plots the profiles on a fixed mesh
+        sim.remesh_interval = PhysicalField(600, 's')
+        with pytest.raises(ValueError):
+            runner.check_simulation()
+
     def test_add_exporter(self):
         runner = SimulationRunner()
         with pytest.raises(ValueError):
@@ -0,0 +1,92 @@
+import h5py as hdf
+import numpy as np
+import pytest
+from fipy import PhysicalField
+
+from microbenthos import Irradiance
+from microbenthos.core.schedule import IrradianceSchedule
+
+
+class TestIrradianceSchedule:
+    def test_init(self):
+        sched = IrradianceSchedule([0, 1, 2], [0, 10, 0])
+        assert not sched.cyclic
+        assert sched.level(0.5) == pytest.approx(5)
+        assert sched.level(PhysicalField(90, 'min')) == pytest.approx(5)
+        # clamped outside the table
+        assert sched.level(5) == pytest.approx(0)
+
+        sched = IrradianceSchedule(PhysicalField([0, 60], 'min'), [1, 3], scale=2)
+        assert np.allclose(sched.times, [0, 1])
+        assert np.allclose(sched.levels, [2, 6])
+
+        with pytest.raises(ValueError):
+            IrradianceSchedule([0], [1])
+
+        with pytest.raises(ValueError):
+            IrradianceSchedule([0, 1, 2], [1, 2])
+
+        with pytest.raises(ValueError):
+            IrradianceSchedule([0, 2, 1], [1, 2, 3])
+
+        with pytest.raises(ValueError):
+            IrradianceSchedule([0, 1], [1, 2], period=0)
+
+        # a record of several days is not wrapped around a diel period
+        with pytest.raises(ValueError):
+            IrradianceSchedule([0, 12, 24, 36], [0, 10, 0, 10], period=24)
+
+    def test_cyclic(self):
+        sched = IrradianceSchedule([0, 6, 12, 18], [0, 10, 20, 10], period=24)
+        assert sched.cyclic
+        assert sched.level(30) == pytest.approx(10)
+        # wraps from the last time to the first
+        assert sched.level(21) == pytest.approx(5)
+        assert np.allclose(sched.level(np.array([3, 27, 51])), 5)
+
+    def test_from_function(self):
+        sched = IrradianceSchedule.from_function(lambda t: np.ones(t.shape), period=24,
+                                                 resolution=PhysicalField(30, 'min'))
+        assert len(sched.times) == 48
+        assert sched.period == 24
+
+        with pytest.raises(ValueError):
+            IrradianceSchedule.from_function(lambda t: t, period=1, resolution=2)
+
+    def test_from_csv(self, tmpdir):
+        path = str(tmpdir.join('light.csv'))
+        with open(path, 'w') as fp:
+            fp.write('minutes,par\n0,0\n30,100\n60,50\n')
+
+        sched = IrradianceSchedule.from_file(path, time_column='minutes', level_column='par',
+                                             time_unit='min')
+        assert np.allclose(sched.times, [0, 0.5, 1])
+        assert sched.level(0.75) == pytest.approx(75)
+
+        with pytest.raises(ValueError):
+            IrradianceSchedule.from_csv(path, level_column='nir')
+
+    def test_from_hdf(self, tmpdir):
+        path = str(tmpdir.join('light.h5'))
+        with hdf.File(path, 'w') as hf:
+            tds = hf.create_dataset('time', data=[0.0, 3600.0, 7200.0])
+            tds.attrs['unit'] = 's'
+            hf.create_dataset('irradiance', data=[0.0, 10.0, 20.0])
+
+        sched = IrradianceSchedule.from_file(path)
+        assert np.allclose(sched.times, [0, 1, 2])
+        assert sched.level(1.5) == pytest.approx(15)
+
+
+def test_irradiance_schedule():
+    irrad = Irradiance(hours_total=24)
+    tabled = Irradiance(hours_total=24, schedule=dict(resolution=PhysicalField(5, 'min')))
+    assert isinstance(tabled.schedule, IrradianceSchedule)
+
+    for hour in (0, 7.5, 12, 13.3, 25):
+        clock = PhysicalField(hour, 'h')
+        assert float(tabled.surface_level(clock)) == pytest.approx(
+            float(irrad.surface_level(clock)), abs=0.1)
+
+    tabled.on_time_updated(PhysicalField(12, 'h'))
+    assert float(tabled.surface_irrad) == pytest.approx(tabled.zenith_level)
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from microbenthos.utils.sensitivity import MorrisDesign, SaltelliDesign, DESIGNS
+
+
+def ishigami(X):
+    x = -np.pi + 2 * np.pi * X
+    return np.sin(x[:, 0]) + 7 * np.sin(x[:, 1]) ** 2 + 0.1 * x[:, 2] ** 4 * np.sin(x[:, 0])
+
+
+def linear(X):
+    return 3 * X[:, 0] - 2 * X[:, 2]
+
+
+def test_designs():
+    assert DESIGNS['morris'] is MorrisDesign
+    assert DESIGNS['saltelli'] is SaltelliDesign
+
+    with pytest.raises(ValueError):
+        MorrisDesign(0)
+    with pytest.raises(ValueError):
+        MorrisDesign(2, trajectories=1)
+    with pytest.raises(ValueError):
+        SaltelliDesign(2, base_samples=1)
+
+
+def test_morris_sample():
+    design = MorrisDesign(3, trajectories=5, levels=4, seed=1)
+    samples = design.sample()
+    assert samples.shape == (design.num_samples, 3) == (20, 3)
+    assert samples.min() >= 0 and samples.max() <= 1
+
+    # each step of a trajectory moves one parameter by delta
+    for t in range(5):
+        steps = np.diff(samples[t * 4:(t + 1) * 4], axis=0)
+        assert np.allclose(np.abs(steps).sum(axis=1), design.delta)
+        assert sorted(np.argmax(np.abs(steps), axis=1)) == [0, 1, 2]
+
+    assert np.array_equal(samples, MorrisDesign(3, trajectories=5, seed=1).sample())
+
+
+def test_morris_analyze():
+    design = MorrisDesign(3, trajectories=20, seed=2)
+    samples = design.sample()
+
+    indices = design.analyze(samples, linear(samples))
+    assert np.allclose(indices['mu'], [3, 0, -2])
+    assert np.allclose(indices['mu_star'], [3, 0, 2])
+    assert np.allclose(indices['sigma'], 0)
+
+    # a failed evaluation leaves out its trajectory
+    outputs = linear(samples)
+    outputs[5] = np.nan
+    assert np.allclose(design.analyze(samples, outputs)['mu_star'], [3, 0, 2])
+
+    indices = design.analyze(samples, ishigami(samples))
+    assert indices['mu_star'][2] > 0 and indices['sigma'][2] > 0
+
+
+def test_saltelli():
+    design = SaltelliDesign(3, base_samples=1024, seed=1)
+    samples = design.sample()
+    assert samples.shape == (design.num_samples, 3) == (5 * 1024, 3)
+
+    # the blocks AB_i are A with the column i from B
+    A, B, AB1 = samples[:1024], samples[1024:2048], samples[2048:3072]
+    assert np.array_equal(AB1[:, 0], B[:, 0])
+    assert np.array_equal(AB1[:, 1:], A[:, 1:])
+
+    # the analytic indices of the Ishigami function
+    indices = design.analyze(samples, ishigami(samples))
+    assert np.allclose(indices['S1'], [0.314, 0.442, 0.0], atol=0.03)
+    assert np.allclose(indices['ST'], [0.558, 0.442, 0.244], atol=0.03)
+
+    outputs = np.ones(len(samples))
+    assert np.isnan(design.analyze(samples, outputs)['S1']).all()
@@ -94,6 +94,41 @@ class TestSimulation:
         assert sMin == PhysicalField(2, 's')
         assert sMax == PhysicalField(3, 's')
 
+    def test_cycle_tolerance(self):
+        sim = Simulation()
+        assert sim.cycle_tolerance is None
+        assert sim.cycle_monitor is None
+        assert not sim.cycle_converged
+
+        sim = Simulation(cycle_tolerance=1e-4, cycle_stop=False)
+        assert sim.cycle_tolerance == 1e-4
+        assert not sim.cycle_stop
+
+        with pytest.raises(ValueError):
+            Simulation(cycle_tolerance=0)
+
+        with pytest.raises(ValueError):
+            Simulation(cycle_tolerance=1.5)
+
+    def test_remesh(self):
+        sim = Simulation()
+        assert sim.remesh_interval is None
+        assert not sim.remesh_due()
+
+        sim = Simulation(remesh_interval=600, remesh_threshold=0.1, remesh_max_cell_size=0.5)
+        assert sim.remesh_interval == PhysicalField(600, 's')
+        assert sim.remesh_max_cell_size == PhysicalField(0.5, 'mm')
+
+        state = dict(domain=dict(depths=dict(data_static=(1, None)), metadata={}))
+        state = sim.get_state(state=state)
+        assert state['domain']['depths'] == dict(data=(1, None))
+
+        with pytest.raises(ValueError):
+            Simulation(remesh_interval=0)
+
+        with pytest.raises(ValueError):
+            Simulation(remesh_threshold=1.5)
+
     def test_residual_target(self):
         sim = Simulation()
         with pytest.raises(AttributeError):
@@ -159,6 +194,8 @@ class TestSimulation:
         feqn.sweep.assert_called_once()
         model.update_vars.assert_called_once()
         model.update_equations.assert_called_once_with(sim.simtime_step)
+        for phase in ('sweep.assemble', 'update_vars', 'update_equations'):
+            assert phase in sim.timer
 
         # now test numerical failure
         feqn.sweep.side_effect = RuntimeError
@@ -192,6 +229,7 @@ class TestSimulation:
         model.clock = clock
         model.full_eqn = feqn = mock.Mock()
         feqn.sweep.return_value = RES = sim.residual_target
+        feqn._vars = []
 
         sim.model = model
 
@@ -208,6 +246,65 @@ class TestSimulation:
         step, state = next(evolution)
         clock.increment_time.assert_called_once_with(sim.simtime_step)
 
+    def test_evolution_numeric_time(self):
+
+        sim = Simulation(numeric_time=True)
+        assert sim.numeric_time
+
+        model = mock.MagicMock(MicroBenthosModel)
+        clock = mock.MagicMock(ModelClock)
+        clock.return_value = PhysicalField(0, 'h')
+        model.clock = clock
+        model.full_eqn = feqn = mock.Mock()
+        feqn.sweep.return_value = sim.residual_target
+        feqn._vars = []
+
+        sim.model = model
+
+        evolution = sim.evolution()
+        step, state = next(evolution)
+        assert step == 1
+
+        for args, kwargs in feqn.sweep.call_args_list:
+            assert isinstance(kwargs['dt'], float)
+            assert state['metrics']['dt']['data'][0] == kwargs['dt']
+        model.update_equations.assert_not_called()
+        assert not sim.snapshot_due()
+
+        step, state = next(evolution)
+        clock.increment_time.assert_not_called()
+        clock.set_seconds.assert_called_once_with(pytest.approx(0.01))
+
+    def test_evolution_cycle_stop(self):
+
+        sim = Simulation(numeric_time=True, cycle_tolerance=1e-3)
+
+        model = mock.MagicMock(MicroBenthosModel)
+        clock = mock.MagicMock(ModelClock)
+        clock.return_value = PhysicalField(0, 'h')
+        model.clock = clock
+        model.full_eqn = feqn = mock.Mock()
+        feqn.sweep.return_value = sim.residual_target
+        feqn._vars = []
+        model.snapshot.return_value = dict(env={})
+
+        sim.model = model
+
+        def create_monitor():
+            sim.cycle_monitor = mock.Mock(residual=1e-4)
+
+        with mock.patch.object(sim, '_create_cycle_monitor', side_effect=create_monitor), \
+                mock.patch.object(sim, '_check_cycle', return_value=True):
+            steps = list(sim.evolution())
+
+        # the evolution stops with a full snapshot, although the snapshot interval has not
+        # elapsed
+        assert len(steps) == 1
+        step, state = steps[0]
+        assert 'env' in state
+        model.snapshot.assert_called_once()
+        assert not sim._snapshot_forced
+
     def test_get_state(self):
         sim = Simulation()
 
@@ -229,7 +326,7 @@ class TestSimulation:
         assert set(state) == sent
 
         V = 30
-        for m in ('calc_time', 'residual', 'num_sweeps'):
+        for m in ('calc_time', 'residual', 'num_sweeps', 'dt'):
             state = sim.get_state(**{m: V})
             assert state['metrics'][m]['data'][0] == V
 
@@ -0,0 +1,72 @@
+import mock
+import pytest
+
+from microbenthos.utils import yaml
+from microbenthos.utils.timing import BIN_EDGES_MS, PhaseTimer
+
+
+def test_add():
+    timer = PhaseTimer()
+    timer.add('solve', 0.002)
+    timer.add('solve', 0.004)
+    timer.add('solve', 1e9)
+
+    assert 'solve' in timer
+    assert timer.total('solve') == pytest.approx(1e9 + 0.006)
+    assert timer.total('missing') == 0
+    assert timer.count('solve') == 3
+    assert timer.count('missing') == 0
+    assert timer.names() == ['solve']
+
+    summary = timer.summary()
+    assert summary['bin_edges_ms'] == list(BIN_EDGES_MS)
+    solve = summary['phases']['solve']
+    assert solve['count'] == 3
+    assert solve['min_ms'] == pytest.approx(2)
+    assert solve['max_ms'] == pytest.approx(1e12)
+    assert len(solve['counts']) == len(BIN_EDGES_MS) + 1
+    assert sum(solve['counts']) == 3
+    # durations beyond the edges are counted in the last bin
+    assert solve['counts'][-1] == 1
+
+    timer.reset()
+    assert 'solve' not in timer
+
+
+def test_phase():
+    timer = PhaseTimer()
+    with timer.phase('a'):
+        pass
+
+    with pytest.raises(ValueError):
+        with timer.phase('b'):
+            raise ValueError
+
+    assert timer.summary()['phases']['a']['count'] == 1
+    assert timer.summary()['phases']['b']['count'] == 1
+
+
+def test_disabled():
+    timer = PhaseTimer(enabled=False)
+    with timer.phase('a'):
+        pass
+    timer.add('b', 1)
+    assert timer.summary()['phases'] == {}
+    assert not timer.write_due()
+
+
+def test_write(tmpdir):
+    timer = PhaseTimer(write_interval=10)
+    timer.add('a', 0.5)
+
+    with mock.patch('microbenthos.utils.timing.default_timer', return_value=1e12):
+        assert timer.write_due()
+
+    path = str(tmpdir.join('timings.yml'))
+    timer.write(path)
+    assert not timer.write_due()
+
+    with open(path) as fp:
+        summary = yaml.safe_load(fp)
+    assert summary['phases']['a']['count'] == 1
+    assert summary['phases']['a']['mean_ms'] == pytest.approx(500)
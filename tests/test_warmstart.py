@@ -0,0 +1,83 @@
+import mock
+import numpy as np
+import pytest
+from fipy import PhysicalField, Variable
+
+from microbenthos import SedimentDBLDomain
+from microbenthos.model.state import StatefulVar
+from microbenthos.model.warmstart import WarmStartStore, model_fingerprint, model_parameters, \
+    parameter_distance
+
+
+def make_model(cell_size = 0.1):
+    model = mock.Mock()
+    model.domain = domain = SedimentDBLDomain(cell_size=cell_size, sediment_length=1,
+                                              dbl_length=0.5)
+    model.clock = Variable(PhysicalField(0, 'h'))
+    oxy = domain.create_var('oxy', value=PhysicalField(0, 'mol/m**3'), hasOld=True)
+    model.stateful_vars = [StatefulVar('env.oxy', oxy, None, None)]
+    model.find_objects.return_value = {}
+    return model
+
+
+def test_parameter_distance():
+    assert parameter_distance([1, 0], [1, 0]) == 0
+    assert parameter_distance([1, 100], [2, 100]) == pytest.approx(0.5)
+    assert parameter_distance([1, 100], [1, 200]) == pytest.approx(0.5)
+
+
+def test_model_parameters():
+    from microbenthos import MicroBenthosModel
+    from microbenthos.core.process import Process
+
+    model = MicroBenthosModel()
+    model.env['aero'] = Process(expr=dict(formula='Km * oxy'),
+                                params=dict(Km=PhysicalField(2, 'mmol/l'), n=3, name='x'))
+    microbe = mock.Mock(spec=['processes'])
+    microbe.processes = dict(resp=Process(expr=dict(formula='k * oxy'), params=dict(k=0.5)))
+    model.microbes['cyano'] = microbe
+    model.reindex()
+
+    # the processes of the environment are included, as well as those of the microbes
+    params = model_parameters(model)
+    assert list(params) == ['env.aero.Km', 'env.aero.n', 'microbes.cyano.processes.resp.k']
+    assert params['env.aero.Km'] == pytest.approx(2)
+    assert params['microbes.cyano.processes.resp.k'] == 0.5
+
+
+def test_fingerprint():
+    model = make_model()
+    fp = model_fingerprint(model, param_names=['k'])
+    assert fp == model_fingerprint(make_model(cell_size=0.05), param_names=['k'])
+    assert fp != model_fingerprint(model, param_names=['k', 'n'])
+
+
+def test_warm_start(tmpdir):
+    store = WarmStartStore(str(tmpdir))
+    assert store.path == str(tmpdir.join('warmstart.h5'))
+    assert len(store) == 0
+
+    target = make_model(cell_size=0.05)
+    assert store.nearest(target, params=dict(k=1.0)) is None
+    assert store.warm_start(target, params=dict(k=1.0)) is None
+
+    for k in (1.0, 2.0, 4.0):
+        source = make_model()
+        source.stateful_vars[0].var.value = PhysicalField(np.ones(15) * k, 'mmol/l')
+        store.save(source, params=dict(k=k))
+    assert len(store) == 3
+
+    entry, distance = store.nearest(target, params=dict(k=1.8))
+    assert entry == '/{}/1'.format(model_fingerprint(target, param_names=['k']))
+    assert distance == pytest.approx(0.1)
+
+    # unknown model structures are not matched
+    assert store.nearest(target, params=dict(n=1.8)) is None
+
+    assert store.warm_start(target, params=dict(k=1.8), max_distance=0.05) is None
+
+    assert store.warm_start(target, params=dict(k=1.8)) == entry
+    oxy = target.stateful_vars[0].var
+    assert oxy.value.value.shape == (30,)
+    assert np.allclose(oxy.value.value, 2)
+    assert np.allclose(oxy.old.value.value, 2)
@@ -44,3 +44,68 @@ def test_exp_notation(inp, num):
     assert val == inp
 
 
+
+
+def test_validate_cached():
+    import mock
+    from microbenthos.utils import loader
+
+    loader.clear_validation_cache()
+    definition = dict(simtime_total=PhysicalField(2, 'h'), max_residual='1e-12')
+
+    validated = loader.validate_dict(definition, key='simulation')
+    assert validated['max_residual'] == 1e-12
+    assert list(loader._LOCAL.validators) == ['simulation']
+    validator = loader._LOCAL.validators['simulation']
+
+    # the same content is not validated again, and a copy is returned
+    with mock.patch.object(validator, 'validated') as mocked:
+        again = loader.validate_dict(dict(definition), key='simulation')
+        assert not mocked.called
+        assert again == validated
+        assert again is not validated
+
+        loader.validate_dict(definition, key='simulation', cached=False)
+        mocked.assert_called_once_with(definition)
+
+    with pytest.raises(ValueError):
+        loader.validate_dict(dict(definition, max_sweeps=1), key='simulation')
+
+    # the cached schema is not changed through get_schema
+    loader.get_schema()['simulation'].clear()
+    assert loader.validate_dict(dict(definition, max_sweeps=20), key='simulation')
+
+
+def test_type_checks_memoized():
+    import mock
+    from microbenthos.utils import loader
+
+    loader.clear_validation_cache()
+    validator = loader.MicroBenthosSchemaValidator()
+    with mock.patch.object(loader, 'sympify', wraps=loader.sympify) as mocked:
+        assert validator._validate_type_sympifyable('a * b')
+        assert validator._validate_type_sympifyable('a * b')
+        assert mocked.call_count == 1
+        assert not validator._validate_type_symbolable(['a'])
+        assert validator._validate_type_symbolable('a')
+    assert not validator._validate_type_sympifyable(['a'])
+
+
+def test_caches_bounded():
+    import mock
+    from microbenthos.utils import loader
+
+    loader.clear_validation_cache()
+    with mock.patch.object(loader, '_TYPE_CHECKS_SIZE', 3):
+        for expr in ('a', 'b', 'c'):
+            loader._memoized_check('sympifyable', loader._is_sympifyable, expr)
+        # a recently used entry is kept, and the least recently used is dropped
+        loader._memoized_check('sympifyable', loader._is_sympifyable, 'a')
+        loader._memoized_check('sympifyable', loader._is_sympifyable, 'd')
+    assert [key[-1] for key in loader._TYPE_CHECKS] == ['c', 'a', 'd']
+
+    with mock.patch.object(loader, '_VALIDATED_SIZE', 2):
+        for hours in range(1, 5):
+            loader.validate_dict(dict(simtime_total=PhysicalField(hours, 'h')), key='simulation')
+    assert len(loader._VALIDATED) == 2
+    loader.clear_validation_cache()